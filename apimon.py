@@ -1,14 +1,23 @@
+import os
+import time
 import logging
 import atexit
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_apscheduler import APScheduler
 from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
 from dotenv import load_dotenv
 
 from app.JTLS import JiraTicketLedStripeList
 from app.gitinfo import GitInfo
+from app.oauth_token_manager import OAuthTokenManager
+from app.jira_client import JiraClient
+from app import count_backend
+from app.startup_report import StartupReport
+from app.render_loop import RenderLoop
+from app.webhook_queue import WebhookQueue, ISSUE_EVENTS, verify_signature
 
 # Versuche QtPixel zu importieren, um zu prüfen ob Qt verwendet wird
 try:
@@ -19,93 +28,152 @@ except (ImportError, ModuleNotFoundError):
 
 LED_COUNT = 40
 
-git_info = GitInfo().load_json()
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Initialisiere die benötigten Komponenten
-jira_tickets_led_stripes = JiraTicketLedStripeList()
-
 
 # Setze Konfigurationswerte für den Scheduler
 class Config:
     SCHEDULER_API_ENABLED = False
 
 
-logging.basicConfig(level=logging.INFO)
-app = Flask(__name__)
-app.config.from_object(Config())
-
-# Initialisiere Scheduler
-scheduler = APScheduler()
-
-
 # Listener, der über den Ausgang der Scheduler-Tasks informiert
 def scheduler_listener(event):
     if event.exception:
         logging.error(f'Scheduler task {event.job_id} failed: {event.exception}')
 
 
-scheduler.add_listener(scheduler_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
-scheduler.init_app(app)
-scheduler.start()
-
-logging.getLogger('apscheduler.executors.default').setLevel(logging.WARNING)
-
-
-@app.route('/', methods=['GET'])
-def get_api_info():
-    return jsonify({
-        'name': __name__,
-        'git_info': {
-            'version': git_info.version,
-            'commit': git_info.commit,
-            'branch': git_info.branch,
-            'description': git_info.description
-        },
-        'led_stripes': jira_tickets_led_stripes.get_info_dict(),
-    })
-
-
-# Scheduler-Task für APIM-Tickets mit erweiterter Exception-Behandlung
-@scheduler.task('cron', id='do_job_update_tickets', minute='*/1')
-def job_update_tickets():
-    jira_tickets_led_stripes.update_tickets()
-
+def create_app() -> Flask:
+    """
+    Startup in stages: configuration, stripes (showing their snapshots) and scheduler come up
+    without any network I/O, the first Jira fetch runs in the background. The init animation is
+    drawn by the render loop, so the HTTP API answers immediately.
+    """
+    startup = StartupReport()
+
+    with startup.phase('config'):
+        # Load environment variables from .env file
+        load_dotenv()
+        logging.basicConfig(level=logging.INFO)
+
+    # git_info wird parallel zu den Stripes geladen, die Stripes bleiben im Hauptthread (Qt)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        git_info_future = executor.submit(load_git_info, startup)
+        with startup.phase('stripes'):
+            jira_tickets_led_stripes = JiraTicketLedStripeList(fetch_on_init=False)
+        git_info = git_info_future.result()
+
+    app = Flask(__name__)
+    app.config.from_object(Config())
+
+    with startup.phase('scheduler'):
+        scheduler = APScheduler()
+        scheduler.add_listener(scheduler_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+        scheduler.init_app(app)
+
+        # Scheduler-Task für APIM-Tickets: prüft jede Sekunde, welche Stripes gemäss ihrem
+        # adaptiven Poll-Intervall fällig sind. Mehrere Instanzen, damit ein langsamer Stripe die anderen nicht blockiert
+        @scheduler.task('interval', id='do_job_update_tickets', seconds=1, max_instances=4, coalesce=True)
+        def job_update_tickets():
+            jira_tickets_led_stripes.update_due_tickets()
+
+        scheduler.start()
+        logging.getLogger('apscheduler.executors.default').setLevel(logging.WARNING)
+
+    # Eigener Thread mit festem Frame-Raster für die LEDs (LED_FPS), im Qt-Modus übernimmt der GUI-Thread.
+    # Im Modus idle (LED_RENDER_MODE) schläft er, solange sich an den LEDs nichts ändert
+    render_loop = RenderLoop(jira_tickets_led_stripes.update_pixels, idle=jira_tickets_led_stripes.idle_time)
+    jira_tickets_led_stripes.set_change_listener(render_loop.wake)
+    render_loop.start()
+
+    @app.route('/', methods=['GET'])
+    def get_api_info():
+        return jsonify({
+            'name': __name__,
+            'git_info': {
+                'version': git_info.version,
+                'commit': git_info.commit,
+                'branch': git_info.branch,
+                'description': git_info.description
+            },
+            'led_stripes': jira_tickets_led_stripes.get_info_dict(),
+            'oauth_tokens': OAuthTokenManager.get_info_dict(),
+            'jira_clients': JiraClient.get_info_dict(),
+            'count_backends': count_backend.get_info_dict(),
+            'query_planner': jira_tickets_led_stripes.query_planner.get_info_dict(),
+            'startup': startup.get_info_dict(),
+            'webhooks': webhook_queue.get_info_dict(),
+            'overdue_deadlines': jira_tickets_led_stripes.deadline_scheduler.get_info_dict(),
+            'render_loop': render_loop.get_info_dict(),
+        })
+
+    # Jira Webhook (issue created/updated/deleted): nur einreihen, angewendet wird im Hintergrund
+    webhook_queue = WebhookQueue(jira_tickets_led_stripes.apply_webhook_events).start()
+    webhook_secret = os.environ.get('WEBHOOK_SECRET')
+    if not webhook_secret:
+        logging.warning('WEBHOOK_SECRET is not set, /webhook/jira refuses all requests')
+
+    @app.route('/webhook/jira', methods=['POST'])
+    def post_jira_webhook():
+        # Ohne Secret könnte jeder die LEDs verändern
+        if not webhook_secret:
+            return jsonify({'error': 'webhooks are disabled, set WEBHOOK_SECRET'}), 403
+        if not verify_signature(webhook_secret, request.get_data(), request.headers.get('X-Hub-Signature')):
+            return jsonify({'error': 'invalid signature'}), 401
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'invalid payload'}), 400
+        event = payload.get('webhookEvent')
+        issue = payload.get('issue')
+        if event not in ISSUE_EVENTS or not isinstance(issue, dict) or not issue.get('key'):
+            return jsonify({'status': 'ignored'}), 202
+        if not webhook_queue.put(event, issue):
+            # Jira wiederholt den Webhook später
+            return jsonify({'error': 'queue full'}), 503
+        return jsonify({'status': 'queued'}), 202
+
+    # Clean-up-Funktion, die beim Beenden der Anwendung ausgeführt wird
+    def cleanup():
+        webhook_queue.stop()
+        render_loop.stop()
+        scheduler.shutdown()
+        jira_tickets_led_stripes.clear()
+
+    atexit.register(cleanup)
+
+    # Initialer Aufruf der Ticket-Updates im Hintergrund, um den aktuellen Status zu erhalten
+    def first_fetch(start):
+        try:
+            jira_tickets_led_stripes.update_tickets()
+        finally:
+            startup.record('first_fetch', start)
+            startup.log()
 
-# Scheduler-Task für das regelmässige Update der LEDs
-@scheduler.task('interval', id='do_job_update_pixels', seconds=0.1)
-def job_update_pixels():
-    try:
-        jira_tickets_led_stripes.update_pixels()
-    except Exception as e:
-        logging.error(f"Error in job_update_pixels: {e}", exc_info=True)
+    threading.Thread(target=first_fetch, args=(time.monotonic(),), name='first_fetch', daemon=True).start()
 
+    app.extensions['apimon'] = {
+        'stripes': jira_tickets_led_stripes,
+        'scheduler': scheduler,
+        'render_loop': render_loop,
+        'cleanup': cleanup,
+    }
+    startup.record('ready', startup.started)
+    return app
 
-# Clean-up-Funktion, die beim Beenden der Anwendung ausgeführt wird
-def cleanup():
-    scheduler.shutdown()
-    jira_tickets_led_stripes.clear()
 
+def load_git_info(startup: StartupReport) -> GitInfo:
+    with startup.phase('git_info'):
+        return GitInfo().load_json()
 
-atexit.register(cleanup)
 
-# Initialer Aufruf der Ticket-Updates, um beim Start den aktuellen Status zu erhalten
-jira_tickets_led_stripes.update_tickets()
+app = create_app()
 
 if __name__ == '__main__':
     if USING_QT:
-        # Wenn Qt verwendet wird, verwende QTimer für LED-Updates (thread-safe)
+        # Wenn Qt verwendet wird, läuft der Render-Loop im GUI-Thread (Qt-Widgets sind nicht thread-safe)
         # und APScheduler nur für Ticket-Updates
-        logging.info("Qt-Modus erkannt - verwende QTimer für LED-Updates")
-
-        from PySide6.QtCore import QTimer
+        logging.info("Qt-Modus erkannt - Render-Loop im Qt-Thread")
 
-        # Erstelle Timer für LED-Updates (100ms = 0.1s)
-        pixel_timer = QTimer()
-        pixel_timer.timeout.connect(lambda: jira_tickets_led_stripes.update_pixels())
-        pixel_timer.start(100)  # 100ms
+        render_loop = app.extensions['apimon']['render_loop']
+        render_loop.stop()
+        render_loop.start_qt()
 
         # Flask in separatem Thread für API
         flask_thread = threading.Thread(target=lambda: app.run(use_reloader=False, threaded=True, host='0.0.0.0'))
@@ -113,19 +181,15 @@ if __name__ == '__main__':
         flask_thread.start()
 
         logging.info("Flask läuft im Hintergrund")
-        logging.info("QTimer aktualisiert LEDs alle 100ms")
+        logging.info(f"Render-Loop aktualisiert LEDs mit {render_loop.fps:g} FPS")
         logging.info("Drücke Ctrl+C zum Beenden")
 
-        # Deaktiviere den Pixel-Update-Job des Schedulers (nur für Qt-Modus)
-        scheduler.remove_job('do_job_update_pixels')
-
         # Starte Qt Event Loop im Hauptthread
         try:
             QtPixel.run_app()
         except KeyboardInterrupt:
             logging.info("Beende Anwendung...")
-            pixel_timer.stop()
-            cleanup()
+            app.extensions['apimon']['cleanup']()
     else:
         # Normaler Modus für Hardware-LEDs oder Console
         app.run()
@@ -0,0 +1,165 @@
+import time
+import logging
+from collections import OrderedDict
+from functools import partial
+from typing import Dict, List, Tuple
+
+from requests.exceptions import ConnectionError
+
+from app.fetch_engine import FetchEngine
+from app.jira_stream_parser import issue_record
+from app.jql import JqlQuery, JqlError
+from .JiraTicketLedStripe import JiraTicketLedStripe
+
+
+class JiraQueryPlanner(object):
+    """
+    Fetches the tickets of several stripes with as few Jira searches as possible. Stripes with
+    identical filters share one search, all filters the local JQL evaluator understands are
+    combined with OR into one search and the issues are split back to the stripes locally.
+    Stripes in incremental mode and filters that cannot be evaluated locally are fetched alone.
+    Count mode is only deduplicated: stripes with identical filters share one set of count
+    queries, a combined issue list would cost more requests and bytes than it saves.
+    """
+
+    GROUPED_MODES: Tuple[str, ...] = ('snapshot',)
+    DEDUPLICATED_MODES: Tuple[str, ...] = ('count',)
+
+    def __init__(self, fetch_engine: FetchEngine) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._fetch_engine: FetchEngine = fetch_engine
+        self._plans: Dict[Tuple[str, ...], List[List[JiraTicketLedStripe]]] = {}
+        self.requests_sent: int = 0
+        self.requests_saved: int = 0
+        self.last_requests_sent: int = 0
+        self.last_requests_saved: int = 0
+
+    def plan(self, stripes: List[JiraTicketLedStripe]) -> List[List[JiraTicketLedStripe]]:
+        """ Split the stripes into fetch units, every unit is fetched with one (paginated) search """
+        key = tuple(stripe.name for stripe in stripes)
+        if key in self._plans:
+            return self._plans[key]
+
+        units: List[List[JiraTicketLedStripe]] = []
+        by_filter: OrderedDict[str, List[JiraTicketLedStripe]] = OrderedDict()
+        duplicates: OrderedDict[str, List[JiraTicketLedStripe]] = OrderedDict()
+        for stripe in stripes:
+            if stripe.ticket_fetcher.fetch_mode in self.GROUPED_MODES:
+                by_filter.setdefault(stripe.jira_filter.strip(), []).append(stripe)
+            elif stripe.ticket_fetcher.fetch_mode in self.DEDUPLICATED_MODES:
+                duplicates.setdefault(stripe.jira_filter.strip(), []).append(stripe)
+            else:
+                units.append([stripe])
+        units += duplicates.values()
+
+        combined: List[JiraTicketLedStripe] = []
+        for jira_filter, group in by_filter.items():
+            try:
+                JqlQuery(jira_filter)
+                combined += group
+            except JqlError as e:
+                self.logger.debug(f'Filter of {group[0].name} is not combined: {e}')
+                units.append(group)
+        if combined:
+            units.append(combined)
+
+        self._plans[key] = units
+        self.logger.info(f'Fetch plan: {[[stripe.name for stripe in unit] for unit in units]}')
+        return units
+
+    def update_tickets(self, stripes: List[JiraTicketLedStripe]) -> Dict[str, Tuple[bool, float]]:
+        """ Update the stripes, returns per stripe whether the update succeeded and how long its fetch took """
+        results = self._fetch_engine.map_stripes(self._update_unit, self.plan(stripes))
+        self.last_requests_sent = sum(sent for sent, _, _ in results)
+        self.last_requests_saved = sum(saved for _, saved, _ in results)
+        self.requests_sent += self.last_requests_sent
+        self.requests_saved += self.last_requests_saved
+        return {name: result for _, _, unit_results in results for name, result in unit_results.items()}
+
+    def _update_unit(self, unit: List[JiraTicketLedStripe]) -> Tuple[int, int, Dict[str, Tuple[bool, float]]]:
+        fetcher = unit[0].ticket_fetcher
+        requests_before = fetcher.requests_sent
+        start = time.monotonic()
+        if len(unit) == 1:
+            ok = unit[0].update_tickets()
+            return fetcher.requests_sent - requests_before, 0, {unit[0].name: (ok, time.monotonic() - start)}
+        if fetcher.fetch_mode in self.DEDUPLICATED_MODES:
+            return self._update_duplicates(unit, requests_before, start)
+
+        filters = list(OrderedDict.fromkeys(stripe.jira_filter.strip() for stripe in unit))
+        # Webhook-Events nach diesem Zeitpunkt sind neuer als die Suche
+        started = time.time()
+        try:
+            records = self._search(fetcher, filters)
+        except Exception as e:
+            # Auch Token-, Parse- und JQL-Fehler betreffen alle Stripes der Einheit, nicht die übrigen Einheiten
+            if not isinstance(e, ConnectionError):
+                self.logger.exception(f'Combined search of {[stripe.name for stripe in unit]} failed: {e}')
+            duration = time.monotonic() - start
+            results = {stripe.name: (stripe.update_tickets(fetch=stripe.ticket_fetcher.fail), duration)
+                       for stripe in unit}
+            return fetcher.requests_sent - requests_before, 0, results
+
+        duration = time.monotonic() - start
+        results = {}
+        for stripe in unit:
+            stripe_records = records[stripe.jira_filter.strip()]
+            ok = stripe.update_tickets(fetch=partial(stripe.ticket_fetcher.apply_records, stripe_records, started))
+            results[stripe.name] = (ok, duration)
+
+        sent = fetcher.requests_sent - requests_before
+        individual = sum(stripe.ticket_fetcher.estimated_requests(len(records[stripe.jira_filter.strip()]))
+                         for stripe in unit)
+        return sent, max(individual - sent, 0), results
+
+    def _update_duplicates(self, unit: List[JiraTicketLedStripe], requests_before: int,
+                           start: float) -> Tuple[int, int, Dict[str, Tuple[bool, float]]]:
+        # Identische Filter: der erste Stripe fragt Jira, die übrigen übernehmen seine Tickets
+        first = unit[0]
+        ok = first.update_tickets()
+        duration = time.monotonic() - start
+        results = {first.name: (ok, duration)}
+        for stripe in unit[1:]:
+            if ok:
+                fetch = partial(stripe.ticket_fetcher.apply_tickets, first.ticket_fetcher.tickets)
+            else:
+                fetch = stripe.ticket_fetcher.fail
+            results[stripe.name] = (stripe.update_tickets(fetch=fetch), duration)
+        sent = first.ticket_fetcher.requests_sent - requests_before
+        return sent, sent * (len(unit) - 1) if ok else 0, results
+
+    def _search(self, fetcher, filters: List[str]) -> Dict[str, list]:
+        records: Dict[str, list] = {jira_filter: [] for jira_filter in filters}
+        fields = ['status', 'created']
+        if len(filters) == 1:
+            # Identische Filter: keine lokale Auswertung nötig
+            queries = {}
+            jql = f'{filters[0]} AND {fetcher.status_clause()}'
+        else:
+            queries = {jira_filter: JqlQuery(jira_filter) for jira_filter in filters}
+            conditions = ' OR '.join(f'({query.condition})' for query in queries.values())
+            jql = f'({conditions}) AND {fetcher.status_clause()}'
+            fields += sorted(set().union(*(query.fields for query in queries.values())) - {'key', *fields})
+
+        now = time.time()
+
+        def split(issue: dict) -> Tuple[tuple, List[str]]:
+            # Läuft beim Parsen jeder Seite, danach wird nur noch der Record behalten
+            if not queries:
+                return issue_record(issue), filters
+            return issue_record(issue), [jira_filter for jira_filter, query in queries.items()
+                                         if query.matches(issue, now)]
+
+        for record, matched in fetcher.search_issues(jql, fields, split):
+            for jira_filter in matched:
+                records[jira_filter].append(record)
+        return records
+
+    def get_info_dict(self) -> dict:
+        return {
+            'plans': [[[stripe.name for stripe in unit] for unit in units] for units in self._plans.values()],
+            'requests_sent': self.requests_sent,
+            'requests_saved': self.requests_saved,
+            'last_requests_sent': self.last_requests_sent,
+            'last_requests_saved': self.last_requests_saved,
+        }
@@ -1,22 +1,44 @@
 import logging
+from threading import Lock
+from typing import Callable, Optional
+
+from requests.exceptions import ConnectionError
 
 from app.jira_ticket_fetcher import JiraTicketFetcher
 from app.ticket_led_mapper import TicketLedMapper
 from app.neopixel_controller import NeoPixelController
+from app.ticket_snapshot import TicketSnapshotStore
 
 
 class JiraTicketLedStripe(object):
 
-    def __init__(self, name: str, jira_filter: str, gpio_pin: int, led_count: int, offset: float):
+    def __init__(self, name: str, jira_filter: str, gpio_pin: int, led_count: int, offset: float,
+                 fetch_mode: str = None, fetch_on_init: bool = True):
         self.name = name
         self.jira_filter = jira_filter
         self.gpio_pin = gpio_pin
         self.led_count = led_count
         self.offset = offset
 
-        self._ticket_fetcher = JiraTicketFetcher(name=name, jira_filter=jira_filter)
+        # Poll und Webhooks aktualisieren den Stripe aus verschiedenen Threads
+        self._render_lock = Lock()
+
+        # Letzten bekannten Stand sofort anzeigen, noch vor dem ersten Jira Request
+        self._snapshot_store = TicketSnapshotStore(name)
+        snapshot = self._snapshot_store.load(jira_filter, max_age=JiraTicketFetcher.TIMEOUT)
         self._ticket_led_mapper = TicketLedMapper(led_count=led_count, name=name)
-        self._neopixel_controller = NeoPixelController(led_count=led_count, gpio_pin=gpio_pin, name=name, offset=offset)
+        self._neopixel_controller = NeoPixelController(led_count=led_count, gpio_pin=gpio_pin, name=name, offset=offset,
+                                                       init_animation=snapshot is None)
+        if snapshot is not None and len(snapshot.leds) == led_count:
+            self._neopixel_controller.publish(leds=snapshot.leds, overflow=snapshot.overflow)
+            self._neopixel_controller.update()
+            logging.info(f'{name}: showing snapshot from {snapshot.saved_at:.0f}')
+        self._ticket_fetcher = JiraTicketFetcher(name=name, jira_filter=jira_filter, fetch_mode=fetch_mode,
+                                                 snapshot=snapshot, fetch_on_init=fetch_on_init)
+
+    @property
+    def ticket_fetcher(self) -> JiraTicketFetcher:
+        return self._ticket_fetcher
 
     @property
     def tickets(self):
@@ -34,16 +56,11 @@ class JiraTicketLedStripe(object):
     def overflow(self):
         return self._neopixel_controller.overflow
 
-    def update_tickets(self):
+    def update_tickets(self, fetch: Optional[Callable[[], None]] = None) -> bool:
+        # fetch ersetzt den eigenen Fetch, z.B. wenn die Tickets aus einer kombinierten Query stammen
         try:
-            self._ticket_fetcher.update_tickets()
-            tickets = self._ticket_fetcher.tickets
-            self._ticket_led_mapper.set_ticket(tickets)
-            leds = self._ticket_led_mapper.leds
-            self._neopixel_controller.set_leds(leds)
-            overflow = self._ticket_led_mapper.overflow
-            self._neopixel_controller.set_overflow(overflow)
-            self._neopixel_controller.set_error(False)
+            (fetch or self._ticket_fetcher.update_tickets)()
+            self._render_tickets()
         except ConnectionError as ce:
             logging.error(f'ConnectionError beim Aktualisieren der {self.name}-Tickets: %s', ce)
             self._neopixel_controller.set_connection_error(True)
@@ -51,8 +68,44 @@ class JiraTicketLedStripe(object):
             logging.exception(f'Unerwarteter Fehler beim Aktualisieren der {self.name}-Tickets: %s', exc)
             self._neopixel_controller.set_error(True)
         else:
-            self._neopixel_controller.set_connection_error(False)
-            self._neopixel_controller.set_error(False)
+            self._neopixel_controller.publish(error=False, connection_error=False)
+            self._save_snapshot()
+            return True
+        return False
+
+    def apply_webhook_events(self, events) -> int:
+        """ Update the tickets from webhook events without a Jira request, returns the number of events for this stripe """
+        consumed, changed = self._ticket_fetcher.apply_events(events)
+        if changed:
+            self._render_tickets()
+            self._save_snapshot()
+        return consumed
+
+    def refresh_overdue(self) -> bool:
+        """ Re-render when tickets became overdue since the last update, without a Jira request """
+        if not self._ticket_fetcher.refresh_overdue():
+            return False
+        self._render_tickets()
+        return True
+
+    def _render_tickets(self):
+        with self._render_lock:
+            tickets = self._ticket_fetcher.tickets
+            self._ticket_led_mapper.set_ticket(tickets)
+            # Layout, Overflow und Fehlerstatus als ein Zustand, der Render-Loop sieht nie eine Mischung
+            self._neopixel_controller.publish(leds=self._ticket_led_mapper.leds,
+                                              overflow=self._ticket_led_mapper.overflow, error=False)
+
+    def _save_snapshot(self):
+        try:
+            with self._render_lock:
+                self._snapshot_store.save(self.jira_filter, self._ticket_fetcher.tickets,
+                                          self._ticket_led_mapper.leds, self._ticket_led_mapper.overflow)
+        except OSError as e:
+            logging.warning(f'Snapshot der {self.name}-Tickets konnte nicht gespeichert werden: %s', e)
+
+    def ticket_counts(self) -> tuple:
+        return tuple((ticket.get('count'), ticket.get('overdue')) for ticket in self.tickets.values())
 
     def update_pixels(self):
         try:
@@ -62,6 +115,12 @@ class JiraTicketLedStripe(object):
             # Set error state but don't crash
             self._neopixel_controller.set_error(True)
 
+    def idle_time(self) -> float:
+        return self._neopixel_controller.idle_time()
+
+    def set_change_listener(self, callback: Optional[Callable[[], None]]):
+        self._neopixel_controller.on_change = callback
+
     def clear(self):
         self._neopixel_controller.clear()
 
@@ -71,6 +130,7 @@ class JiraTicketLedStripe(object):
                 'tickets': self.tickets,
                 'leds': [str(color) for color in self.leds],
                 'status': self.status.name,
-                'overflow': self.overflow
+                'overflow': self.overflow,
+                'effects': self._neopixel_controller.effects.get_info_dict()
             }
         }
@@ -1,13 +1,20 @@
 import json
+import time
 
+from app.fetch_engine import FetchEngine
+from app.poll_scheduler import AdaptivePollScheduler
+from app.deadline_scheduler import DeadlineScheduler
 from .JiraTicketLedStripe import JiraTicketLedStripe
+from .JiraQueryPlanner import JiraQueryPlanner
 
 
 class JiraTicketLedStripeList(list):
 
-    def __init__(self):
+    def __init__(self, fetch_on_init: bool = True):
         super().__init__()
         self._jira_tickets_led_stripes = list()
+        self._fetch_engine = FetchEngine.get_instance()
+        self.query_planner = JiraQueryPlanner(self._fetch_engine)
         with open('config.json', 'r') as f:
             config = json.load(f)
             for led_stripe in config:
@@ -17,18 +24,74 @@ class JiraTicketLedStripeList(list):
                         jira_filter=led_stripe.get('jira_filter'),
                         gpio_pin=led_stripe.get('gpio_pin'),
                         led_count=led_stripe.get('led_count'),
-                        offset=led_stripe.get('offset')
+                        offset=led_stripe.get('offset'),
+                        fetch_mode=led_stripe.get('fetch_mode'),
+                        fetch_on_init=fetch_on_init
                     )
                 )
+        self.poll_scheduler = AdaptivePollScheduler([stripe.name for stripe in self])
+        # Überfällige Tickets lokal nachführen, sobald ihre Deadline abläuft
+        self.deadline_scheduler = DeadlineScheduler(self._deadline_passed).start()
 
     def get_info_dict(self):
-        return [_.get_info_dict() for _ in self]
+        info = [_.get_info_dict() for _ in self]
+        for stripe, stripe_info in zip(self, info):
+            stripe_info[stripe.name]['polling'] = self.poll_scheduler.get_info_dict(stripe.name)
+        return info
 
     def clear(self):
+        self.deadline_scheduler.stop()
         [_.clear() for _ in self]
 
-    def update_tickets(self):
-        [_.update_tickets() for _ in self]
+    def update_tickets(self, stripes=None):
+        # Alle Stripes parallel mit möglichst wenigen Queries, jeder Stripe behandelt seine Fehler selbst
+        if stripes is None:
+            # Stripes, die gerade vom Poll-Job aktualisiert werden, nicht doppelt holen
+            claimed = self.poll_scheduler.claim([stripe.name for stripe in self])
+            stripes = [stripe for stripe in self if stripe.name in claimed]
+        counts = {stripe.name: stripe.ticket_counts() for stripe in stripes}
+        results = {}
+        try:
+            results = self.query_planner.update_tickets(stripes)
+        finally:
+            # Auch bei unerwarteten Fehlern freigeben, sonst wird der Stripe nie wieder gepollt
+            for stripe in stripes:
+                ok, latency = results.get(stripe.name, (False, 0))
+                changed = stripe.ticket_counts() != counts[stripe.name]
+                self.poll_scheduler.record(stripe.name, ok=ok, changed=changed, latency=latency)
+                self._schedule_deadline(stripe)
+
+    def update_due_tickets(self):
+        # Nur die Stripes, deren adaptives Poll-Intervall abgelaufen ist
+        due = self.poll_scheduler.due(time.time())
+        if due:
+            self.update_tickets([stripe for stripe in self if stripe.name in due])
+
+    def apply_webhook_events(self, events):
+        # Stripes mit lokalem Index direkt aktualisieren, die anderen so bald wie möglich pollen
+        for stripe in self:
+            if stripe.ticket_fetcher.can_apply_events:
+                # Nur Stripes, die wirklich Events bekommen, auf den langsamen Abgleich umstellen
+                if stripe.apply_webhook_events(events):
+                    self.poll_scheduler.webhook_applied(stripe.name)
+                    self._schedule_deadline(stripe)
+            else:
+                self.poll_scheduler.trigger(stripe.name)
+
+    def _schedule_deadline(self, stripe):
+        self.deadline_scheduler.schedule(stripe.name, stripe.ticket_fetcher.next_overdue_deadline())
+
+    def _deadline_passed(self, name):
+        stripe = next(stripe for stripe in self if stripe.name == name)
+        stripe.refresh_overdue()
+        self._schedule_deadline(stripe)
 
     def update_pixels(self):
         [_.update_pixels() for _ in self]
+
+    def idle_time(self):
+        # Bis zur nächsten Änderung irgendeines Stripes
+        return min((_.idle_time() for _ in self), default=0)
+
+    def set_change_listener(self, callback):
+        [_.set_change_listener(callback) for _ in self]
@@ -0,0 +1,124 @@
+import os
+import time
+import logging
+from collections import deque
+from threading import Lock
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from .exceptions import JiraResponseError
+
+# Sendet einen Request an Jira und liefert die dekodierte JSON-Antwort
+PostJson = Callable[[str, dict], dict]
+
+
+class CountBackend(object):
+    """ Counts the issues matching a JQL on one Jira instance and records the latency of every count """
+
+    name: str = ''
+    LATENCY_SAMPLES: int = 100
+
+    def __init__(self, base_url: str) -> None:
+        self.logger = logging.getLogger(f'{__name__}.{self.name}')
+        self.base_url: str = base_url
+        self._lock: Lock = Lock()
+        self._latencies: Deque[float] = deque(maxlen=self.LATENCY_SAMPLES)
+        self.requests: int = 0
+
+    def count(self, jql: str, post_json: PostJson) -> int:
+        start = time.monotonic()
+        total = self._count(jql, post_json)
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(time.monotonic() - start)
+        return total
+
+    def _count(self, jql: str, post_json: PostJson) -> int:
+        raise NotImplementedError
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        stats = {'backend': self.name, 'base_url': self.base_url, 'requests': self.requests}
+        if latencies:
+            stats['p50_ms'] = round(latencies[len(latencies) // 2] * 1000)
+            stats['p95_ms'] = round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000)
+        return stats
+
+
+class SearchCountBackend(CountBackend):
+    """ The general search endpoint with maxResults 0, available on every Jira """
+
+    name = 'search'
+
+    def _count(self, jql: str, post_json: PostJson) -> int:
+        data = {
+            'jql': jql,
+            'maxResults': 0,
+            'fields': ['key']
+        }
+        return post_json(f'{self.base_url}/search', data).get('total')
+
+
+class ApproximateCountBackend(CountBackend):
+    """ Jira Cloud's dedicated count endpoint, it does not load any issue """
+
+    name = 'approximate'
+
+    def _count(self, jql: str, post_json: PostJson) -> int:
+        return post_json(f'{self.base_url}/search/approximate-count', {'jql': jql}).get('count')
+
+
+class AutoCountBackend(CountBackend):
+    """ Uses the count endpoint and falls back to search for good once the server does not know it """
+
+    name = 'auto'
+    # Statuscodes, mit denen ein Jira ohne Count-Endpunkt antwortet
+    UNSUPPORTED_STATUS: Tuple[int, ...] = (404, 405, 501)
+
+    def __init__(self, base_url: str) -> None:
+        super().__init__(base_url)
+        self.primary: CountBackend = ApproximateCountBackend(base_url)
+        self.fallback: CountBackend = SearchCountBackend(base_url)
+        self.supported: Optional[bool] = None
+
+    def _count(self, jql: str, post_json: PostJson) -> int:
+        if self.supported is not False:
+            try:
+                total = self.primary.count(jql, post_json)
+                self.supported = True
+                return total
+            except JiraResponseError as e:
+                if e.status_code not in self.UNSUPPORTED_STATUS:
+                    raise
+                self.logger.info(f'{self.base_url} has no count endpoint ({e.status_code}), using search')
+                self.supported = False
+        return self.fallback.count(jql, post_json)
+
+    @property
+    def stats(self) -> dict:
+        return dict(super().stats, supported=self.supported, backends=[self.primary.stats, self.fallback.stats])
+
+
+COUNT_BACKENDS: Dict[str, type] = {
+    backend.name: backend for backend in (SearchCountBackend, ApproximateCountBackend, AutoCountBackend)
+}
+
+_instances: Dict[Tuple[str, str], CountBackend] = {}
+_instances_lock: Lock = Lock()
+
+
+def get_count_backend(base_url: str, name: Optional[str] = None) -> CountBackend:
+    """ The shared backend of a Jira instance, by default selected by JIRA_COUNT_BACKEND (auto) """
+    name = name or os.environ.get('JIRA_COUNT_BACKEND') or AutoCountBackend.name
+    if name not in COUNT_BACKENDS:
+        raise ValueError(f'Unknown count backend: {name}')
+    with _instances_lock:
+        if (base_url, name) not in _instances:
+            _instances[(base_url, name)] = COUNT_BACKENDS[name](base_url)
+        return _instances[(base_url, name)]
+
+
+def get_info_dict() -> list:
+    with _instances_lock:
+        return [backend.stats for backend in _instances.values()]
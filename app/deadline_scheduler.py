@@ -0,0 +1,95 @@
+import time
+import heapq
+import logging
+from threading import Condition, Thread
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class DeadlineScheduler(object):
+    """
+    Calls callback(name) the moment the next deadline of a stripe has passed. Every stripe has
+    at most one deadline; the heap keeps superseded entries and skips them when they come up.
+    """
+
+    # Etwas nach der Deadline feuern, damit das Ticket sicher als überfällig zählt
+    GRACE: float = 0.05
+
+    def __init__(self, callback: Callable[[str], None]) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._callback: Callable[[str], None] = callback
+        self._condition: Condition = Condition()
+        self._heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, float] = {}
+        self._thread: Optional[Thread] = None
+        self._stopped: bool = False
+        self.fired: int = 0
+
+    def schedule(self, name: str, deadline: Optional[float]) -> None:
+        """ Set (or with None remove) the next deadline of a stripe """
+        with self._condition:
+            if deadline is None:
+                self._deadlines.pop(name, None)
+                return
+            if self._deadlines.get(name) == deadline:
+                return
+            self._deadlines[name] = deadline
+            heapq.heappush(self._heap, (deadline, name))
+            self._condition.notify()
+
+    def next_deadline(self) -> Optional[float]:
+        with self._condition:
+            self._drop_superseded()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """ Remove and return the stripes whose deadline has passed """
+        now = time.time() if now is None else now
+        names = []
+        with self._condition:
+            self._drop_superseded()
+            while self._heap and self._heap[0][0] + self.GRACE <= now:
+                _, name = heapq.heappop(self._heap)
+                del self._deadlines[name]
+                names.append(name)
+                self._drop_superseded()
+        return names
+
+    def _drop_superseded(self) -> None:
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def start(self) -> 'DeadlineScheduler':
+        self._thread = Thread(target=self._run, name='deadline-scheduler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                deadline = self.next_deadline()
+                timeout = None if deadline is None else max(deadline + self.GRACE - time.time(), 0)
+                if timeout is None or timeout > 0:
+                    # Wacht bei der Deadline auf oder wenn eine frühere dazukommt
+                    self._condition.wait(timeout)
+                    continue
+            for name in self.pop_due():
+                self.fired += 1
+                try:
+                    self._callback(name)
+                except Exception as e:
+                    self.logger.exception(f'Deadline callback for {name} failed: {e}')
+
+    def get_info_dict(self) -> dict:
+        deadline = self.next_deadline()
+        return {
+            'scheduled': len(self._deadlines),
+            'fired': self.fired,
+            'next_deadline_in': round(deadline - time.time(), 1) if deadline is not None else None,
+        }
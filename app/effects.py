@@ -0,0 +1,317 @@
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .models.color import Color, ColorEffects, brightness_lut
+from .models.color_array import ColorArray, np
+from .status import STATUS
+
+Rgb = Tuple[int, int, int]
+
+
+class Effect(object):
+    """
+    One animated layer. select() picks the pixels once per layout, render() computes their values
+    for a whole frame from the values of the layers below, so pixels without the effect cost nothing.
+    All periodic effects repeat within cycle seconds (the PULSING_PERIOD of the controller).
+    """
+
+    name: str = ''
+    # Einmalige Effekte (False) laufen nach einem Layoutwechsel ab und sind nicht Teil des Zyklus
+    periodic: bool = True
+
+    def __init__(self, cycle: float) -> None:
+        self.cycle: float = cycle
+        self.indices: List[int] = []
+        self.calls: int = 0
+        self.seconds: float = 0.0
+
+    @property
+    def period(self) -> Optional[float]:
+        return self.cycle
+
+    def select(self, leds: List[Color], status: STATUS, overflow: bool,
+               previous: Optional[List[Color]]) -> List[int]:
+        raise NotImplementedError
+
+    def render(self, values: List[Rgb], cycle_time: float, since: float) -> List[Rgb]:
+        raise NotImplementedError
+
+    def idle_time(self, cycle_time: float, since: float) -> float:
+        """ Seconds the values stay unchanged, 0 if not known """
+        return 0
+
+    def running(self, since: float) -> bool:
+        return True
+
+
+class OverduePulse(Effect):
+    """ Pixels of overdue tickets pulse between 1/4 and full brightness, twice per cycle """
+
+    name = 'overdue'
+    # Ab so vielen pulsierenden LEDs wird die Helligkeit mit NumPy für alle auf einmal berechnet. Aus, da
+    # die Lookup-Tabelle laut demo/bench_color_array.py bei jeder Stripe-Länge schneller ist (nur für Vergleiche)
+    VECTORIZE_MIN_LEDS: Optional[int] = None
+
+    @property
+    def period(self) -> float:
+        return self.cycle / 2
+
+    def __init__(self, cycle: float) -> None:
+        super().__init__(cycle)
+        self._layout: List[Rgb] = []
+        self._array: Optional[ColorArray] = None
+
+    def select(self, leds, status, overflow, previous):
+        # Die Status-LED pulsiert schon selbst
+        indices = [i for i, led in enumerate(leds) if i != 0 and led.effect == ColorEffects.overdue]
+        # Layoutfarben einmal als Array, solange keine Ebene darunter sie ändert
+        self._layout = [leds[i].tuple for i in indices]
+        self._array = None
+        if np is not None and self.VECTORIZE_MIN_LEDS is not None and len(indices) >= self.VECTORIZE_MIN_LEDS:
+            self._array = ColorArray.from_colors(leds[i] for i in indices)
+        return indices
+
+    def brightness(self, cycle_time: float) -> int:
+        return min(max(int(math.sin(cycle_time * self.cycle*2 * math.pi / 2) * 128)+192, 0), 255)
+
+    def render(self, values, cycle_time, since):
+        brightness = self.brightness(cycle_time)
+        if self._array is not None:
+            array = self._array if values == self._layout else ColorArray(np.array(values, dtype=np.uint8))
+            return array.adjust_brightness(brightness).tuples()
+        lut = brightness_lut(brightness)
+        return [(lut[r], lut[g], lut[b]) for r, g, b in values]
+
+    def idle_time(self, cycle_time, since):
+        # Bei voller Helligkeit bleibt es stehen, solange sin * 128 >= 63 ist
+        full = math.asin(63 / 128)
+        return _time_left(cycle_time, self.cycle * math.pi, full, math.pi - full)
+
+
+class StatusPulse(Effect):
+    """ The first pixel pulses in the color of the controller status, added to the layout color """
+
+    name = 'status'
+    COLORS: Dict[STATUS, Color] = {
+        STATUS.INIT: Color.black,
+        STATUS.WORKING: Color.white,
+        STATUS.CONNECTION_ERROR: Color.orange,
+        STATUS.ERROR: Color.red,
+    }
+
+    def __init__(self, cycle: float) -> None:
+        super().__init__(cycle)
+        self.color: Color = Color.black
+
+    def select(self, leds, status, overflow, previous):
+        self.color = self.COLORS.get(status, Color.black)
+        return [0]
+
+    def brightness(self, cycle_time: float) -> int:
+        return max(int(math.sin(cycle_time * self.cycle * math.pi / 2) * 255), 0)
+
+    def render(self, values, cycle_time, since):
+        pulse = self.color.adjust_brightness(self.brightness(cycle_time)).tuple
+        return [_add(value, pulse) for value in values]
+
+    def idle_time(self, cycle_time, since):
+        # Dunkel, solange sin * 255 < 1 ist
+        dark = math.asin(1 / 255)
+        return _time_left(cycle_time, self.cycle * math.pi / 2, math.pi - dark, 2 * math.pi + dark)
+
+
+class OverflowPulse(StatusPulse):
+    """ The last pixel pulses white while there are more tickets than LEDs """
+
+    name = 'overflow'
+
+    def select(self, leds, status, overflow, previous):
+        self.color = Color.white
+        return [len(leds) - 1] if overflow else []
+
+
+class Blink(Effect):
+    """ Pixels with the blink effect are on for the first half of every second and off for the other """
+
+    name = 'blink'
+
+    @property
+    def period(self) -> float:
+        return self.cycle / 2
+
+    def select(self, leds, status, overflow, previous):
+        return [i for i, led in enumerate(leds) if led.effect == ColorEffects.blink]
+
+    def render(self, values, cycle_time, since):
+        if cycle_time % self.period < self.period / 2:
+            return values
+        return [Color.black.tuple] * len(values)
+
+    def idle_time(self, cycle_time, since):
+        half = self.period / 2
+        return max(half - cycle_time % half - 0.001, 0)
+
+
+class Chase(Effect):
+    """ A bright pixel runs once per cycle through the pixels with the chase effect, the others are dimmed """
+
+    name = 'chase'
+    DIMMED: int = 64
+
+    def select(self, leds, status, overflow, previous):
+        return [i for i, led in enumerate(leds) if led.effect == ColorEffects.chase]
+
+    def _step(self) -> float:
+        return self.cycle / max(len(self.indices), 1)
+
+    def render(self, values, cycle_time, since):
+        position = int(cycle_time % self.cycle / self._step()) % len(values)
+        lut = brightness_lut(self.DIMMED)
+        dimmed = [(lut[r], lut[g], lut[b]) for r, g, b in values]
+        dimmed[position] = values[position]
+        return dimmed
+
+    def idle_time(self, cycle_time, since):
+        step = self._step()
+        return max(step - cycle_time % step - 0.001, 0)
+
+
+class FadeIn(Effect):
+    """ Pixels that got a new color with the last layout fade in from black (not on the first layout) """
+
+    name = 'fade_in'
+    periodic = False
+    DURATION: float = 1.0
+
+    @property
+    def period(self) -> None:
+        return None
+
+    def select(self, leds, status, overflow, previous):
+        if previous is None or len(previous) != len(leds):
+            return []
+        return [i for i, (led, old) in enumerate(zip(leds, previous)) if led != old and led != Color.black]
+
+    def render(self, values, cycle_time, since):
+        lut = brightness_lut(min(int(since / self.DURATION * 255), 255))
+        return [(lut[r], lut[g], lut[b]) for r, g, b in values]
+
+    def running(self, since: float) -> bool:
+        return since < self.DURATION
+
+
+EFFECTS: Dict[str, type] = {
+    effect.name: effect for effect in (OverduePulse, Blink, Chase, StatusPulse, OverflowPulse, FadeIn)
+}
+# fade_in ist optional, ohne LED_EFFECTS sieht der Streifen aus wie bisher
+DEFAULT_EFFECTS: Tuple[str, ...] = tuple(name for name in EFFECTS if name != FadeIn.name)
+
+
+class EffectEngine(object):
+    """
+    Composites the effect layers in order. prepare() selects the pixels of every layer when the
+    layout, status or overflow changes; frame() then only touches the selected pixels and records
+    the compute time of every effect.
+    """
+
+    def __init__(self, names: Iterable[str], cycle: float, clock: Callable[[], float] = time.monotonic) -> None:
+        unknown = [name for name in names if name not in EFFECTS]
+        if unknown:
+            raise ValueError(f'Unknown effects: {unknown}, available are {list(EFFECTS)}')
+        self.layers: List[Effect] = [EFFECTS[name](cycle) for name in names]
+        self._clock: Callable[[], float] = clock
+        self._active: List[Effect] = []
+        self._inputs: List[Tuple[List[Rgb], bool]] = []
+        self._overlapping: bool = False
+        self._leds: Optional[List[Color]] = None
+        self._layout_time: float = clock()
+        self.key: Optional[tuple] = None
+        self.indices: List[int] = []
+
+    def prepare(self, leds: List[Color], status: STATUS, overflow: bool) -> None:
+        previous = self._leds
+        if leds is not previous:
+            self._leds = leds
+            self._layout_time = self._clock()
+        for layer in self.layers:
+            # Einmalige Effekte wählen ihre Pixel nur bei einem neuen Layout
+            if layer.periodic or leds is not previous:
+                layer.indices = layer.select(leds, status, overflow, previous)
+        self._active = [layer for layer in self.layers if layer.indices]
+        # Layoutwerte je Ebene; nur Ebenen über einer anderen lesen die Werte darunter aus dem Frame
+        self._inputs = []
+        seen = set()
+        for layer in self._active:
+            self._inputs.append(([leds[i].tuple for i in layer.indices], not seen.isdisjoint(layer.indices)))
+            seen.update(layer.indices)
+        self.indices = sorted(seen)
+        self._overlapping = any(overlaps for _, overlaps in self._inputs)
+        self.key = (leds, status, overflow)
+
+    def is_prepared(self, leds: List[Color], status: STATUS, overflow: bool) -> bool:
+        """ True if prepare() already ran for this layout (the same list), status and overflow """
+        # Color.__eq__ ignoriert den Effekt, deshalb das Layout über die Identität vergleichen
+        return self.key is not None and self.key[0] is leds and self.key[1:] == (status, overflow)
+
+    def since(self) -> float:
+        """ Seconds since the current layout was prepared """
+        return self._clock() - self._layout_time
+
+    def transient(self, since: float) -> bool:
+        """ True while a one-off effect is running """
+        return any(not layer.periodic and layer.running(since) for layer in self._active)
+
+    def frame(self, cycle_time: float, since: float = math.inf) -> List[Tuple[int, Rgb]]:
+        """ Index and value of every animated pixel; finished one-off effects pass the values below through """
+        values: Dict[int, Rgb] = {}
+        pixels: List[Tuple[int, Rgb]] = []
+        for layer, (layout, overlaps) in zip(self._active, self._inputs):
+            indices = layer.indices
+            inputs = [values.get(i, value) for i, value in zip(indices, layout)] if overlaps else layout
+            if not layer.periodic and not layer.running(since):
+                rendered = inputs
+            else:
+                start = time.perf_counter()
+                rendered = layer.render(inputs, cycle_time, since)
+                layer.seconds += time.perf_counter() - start
+                layer.calls += 1
+            # Ohne Überlappung reicht eine Liste, sonst überschreibt die obere Ebene die untere
+            if self._overlapping:
+                values.update(zip(indices, rendered))
+            else:
+                pixels.extend(zip(indices, rendered))
+        return list(values.items()) if self._overlapping else pixels
+
+    def idle_time(self, cycle_time: float, since: float) -> float:
+        if self.transient(since):
+            return 0
+        return min((layer.idle_time(cycle_time, since) for layer in self._active if layer.periodic), default=math.inf)
+
+    def get_info_dict(self) -> dict:
+        return {
+            layer.name: {
+                'pixels': len(layer.indices),
+                'period': layer.period,
+                'calls': layer.calls,
+                'total_ms': round(layer.seconds * 1000, 1),
+                'avg_us': round(layer.seconds / layer.calls * 1e6, 1) if layer.calls else None,
+            } for layer in self.layers
+        }
+
+
+def _add(a: Rgb, b: Rgb) -> Rgb:
+    return min(a[0] + b[0], 255), min(a[1] + b[1], 255), min(a[2] + b[2], 255)
+
+
+def _time_left(phase: float, omega: float, start: float, end: float) -> float:
+    """
+    Time until the angle phase * omega leaves [start, end] (0 <= start < 2 pi, end may pass 2 pi),
+    0 if it is outside now. A small margin keeps the result before the actual change.
+    """
+    angle = (phase * omega) % (2 * math.pi)
+    if angle < start:
+        angle += 2 * math.pi
+    if angle > end:
+        return 0
+    return max((end - angle) / omega - 0.001, 0)
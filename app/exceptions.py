@@ -1,6 +1,24 @@
+from requests.exceptions import ConnectionError
+
+
 class ConnectionException(Exception):
     """Custom exception class for connection-related errors."""
 
     def __init__(self, message: str = "A connection error occurred"):
         super().__init__(message)
 
+
+class HostUnavailable(ConnectionError):
+    """The request was not sent: the host is rate limited or its circuit breaker is open."""
+
+
+class JiraResponseError(ConnectionError):
+    """Jira answered with a non-2xx status."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class JiraTimeout(ConnectionError):
+    """Jira did not answer within the read timeout; sending the request again would only add load."""
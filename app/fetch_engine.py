@@ -0,0 +1,59 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Lock
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class FetchEngine(object):
+    """
+    Runs the stripe updates and their Jira queries concurrently. The stripes run in their own
+    pool, the queries share a second pool whose size is the global limit of concurrent requests.
+    Because the stripe threads only wait on queries and the query threads never wait on anything,
+    the two pools cannot deadlock each other.
+    """
+
+    MAX_CONCURRENCY: int = 4  # entspricht JiraClient.POOL_SIZE
+    STRIPE_WORKERS: int = 16
+
+    _instance: Optional['FetchEngine'] = None
+    _instance_lock: Lock = Lock()
+
+    def __init__(self, max_concurrency: Optional[int] = None) -> None:
+        self.max_concurrency: int = max_concurrency or int(os.environ.get('JIRA_MAX_CONCURRENCY')
+                                                           or self.MAX_CONCURRENCY)
+        self._query_executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                  thread_name_prefix='jira-query')
+        self._stripe_executor = ThreadPoolExecutor(max_workers=self.STRIPE_WORKERS,
+                                                   thread_name_prefix='jira-stripe')
+
+    @classmethod
+    def get_instance(cls) -> 'FetchEngine':
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def map_queries(self, fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        """ Run fn for all items in the query pool, results keep the order of items """
+        return self._collect([self._query_executor.submit(fn, item) for item in items])
+
+    def map_stripes(self, fn: Callable[[T], R], stripes: Iterable[T]) -> List[R]:
+        """ Run fn for all stripes in parallel and wait until the slowest one is done """
+        return self._collect([self._stripe_executor.submit(fn, stripe) for stripe in stripes])
+
+    @staticmethod
+    def _collect(futures: List[Future]) -> list:
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            # Beim ersten Fehler die noch nicht gestarteten Queries verwerfen
+            for future in futures:
+                future.cancel()
+            raise
+
+    def shutdown(self) -> None:
+        self._stripe_executor.shutdown(wait=False, cancel_futures=True)
+        self._query_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,66 @@
+import math
+from typing import Callable, Iterator, List, Optional, Tuple
+
+Pixel = Tuple[int, Tuple[int, int, int]]
+
+
+class FrameCycle(object):
+    """
+    One period of the pulsing pixels of a stripe, sampled at a fixed rate. Every frame holds the
+    values of the animated pixels only, packed as bytes (3 per pixel); the static pixels stay as
+    written by the layout. Replaying is a lookup of the frame index from the cycle time.
+    """
+
+    __slots__ = ('indices', 'frames', 'period', 'frame_time', '_hold')
+
+    def __init__(self, indices: List[int], frames: List[bytes], period: float) -> None:
+        self.indices: List[int] = indices
+        self.frames: List[bytes] = frames
+        self.period: float = period
+        self.frame_time: float = period / len(frames)
+        # Anzahl folgender Frames mit denselben Werten, für idle_time()
+        count = len(frames)
+        self._hold: List[int] = [0] * count
+        for k in range(2 * count - 2, -1, -1):
+            following = self._hold[(k + 1) % count]
+            same = frames[k % count] == frames[(k + 1) % count]
+            self._hold[k % count] = min(following + 1, count - 1) if same else 0
+
+    @classmethod
+    def build(cls, period: float, rate: int, render: Callable[[float], List[Pixel]]) -> 'FrameCycle':
+        """ Sample render(cycle_time) rate times per second over one period """
+        count = max(int(round(period * rate)), 1)
+        samples = [dict(render(k * period / count)) for k in range(count)]
+        indices = sorted(samples[0])
+        frames = [bytes(channel for index in indices for channel in sample[index]) for sample in samples]
+        return cls(indices, frames, period)
+
+    def index(self, cycle_time: float) -> int:
+        return int(cycle_time % self.period / self.frame_time) % len(self.frames)
+
+    def changes(self, index: int, previous: Optional[int]) -> Iterator[Pixel]:
+        """ The pixels of frame index that differ from frame previous (all with None) """
+        values = _unpack(self.frames[index])
+        if previous is None:
+            return zip(self.indices, values)
+        if self.frames[previous] == self.frames[index]:
+            return iter(())
+        return ((pixel, value) for pixel, value, last in zip(self.indices, values, _unpack(self.frames[previous]))
+                if value != last)
+
+    def idle_time(self, cycle_time: float) -> float:
+        """ Seconds until the replayed frame differs from the current one """
+        position = cycle_time % self.period
+        index = self.index(cycle_time)
+        if self._hold[index] >= len(self.frames) - 1:
+            return math.inf
+        # Etwas vor dem Wechsel, damit Rundungsfehler nicht schon den nächsten Frame treffen
+        return max((index + 1 + self._hold[index]) * self.frame_time - position - 0.001, 0)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(frame) for frame in self.frames)
+
+
+def _unpack(frame: bytes) -> Iterator[Tuple[int, int, int]]:
+    return zip(frame[0::3], frame[1::3], frame[2::3])
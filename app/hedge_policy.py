@@ -0,0 +1,96 @@
+import os
+from collections import deque
+from threading import Lock
+from typing import Deque, Dict, Optional
+
+
+class HedgePolicy(object):
+    """
+    Decides when a duplicate (hedge) request is sent: once a request is slower than the recent
+    p95 latency of its URL. Every request earns `ratio` hedges, so hedges never exceed that share
+    of all requests, no matter how slow Jira gets. Shared by all Jira clients of the process.
+    """
+
+    RATIO: float = 0  # Anteil zusätzlicher Requests, 0 = kein Hedging
+    PERCENTILE: float = 0.95
+    SAMPLES: int = 200  # Latenzen pro URL, aus denen die Verzögerung berechnet wird
+    MIN_SAMPLES: int = 20  # vorher wird nicht gehedgt
+    MIN_DELAY: float = 0.01
+    MAX_BUDGET: float = 5  # so viele Hedges dürfen direkt nacheinander gesendet werden
+
+    _instance: Optional['HedgePolicy'] = None
+    _instance_lock: Lock = Lock()
+
+    def __init__(self, ratio: Optional[float] = None) -> None:
+        self.ratio: float = float(os.environ.get('JIRA_HEDGE_RATIO') or self.RATIO) if ratio is None else ratio
+        self._lock: Lock = Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._budget: float = 0
+        self.requests: int = 0
+        self.hedges: int = 0
+        self.wins: int = 0
+        self.denied: int = 0
+
+    @classmethod
+    def get_instance(cls) -> 'HedgePolicy':
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @property
+    def enabled(self) -> bool:
+        return self.ratio > 0
+
+    def record_latency(self, key: str, seconds: float) -> None:
+        with self._lock:
+            if key not in self._latencies:
+                self._latencies[key] = deque(maxlen=self.SAMPLES)
+            self._latencies[key].append(seconds)
+
+    def delay(self, key: str) -> Optional[float]:
+        """ Seconds after which a request to key is hedged, None while there are too few samples """
+        with self._lock:
+            latencies = sorted(self._latencies.get(key, ()))
+        if len(latencies) < self.MIN_SAMPLES:
+            return None
+        return max(latencies[min(int(len(latencies) * self.PERCENTILE), len(latencies) - 1)], self.MIN_DELAY)
+
+    def request(self) -> None:
+        """ A primary request is sent, it adds ratio to the hedge budget """
+        with self._lock:
+            self.requests += 1
+            # Gerundet, damit 10 x 0.1 auch wirklich einen Hedge ergibt
+            self._budget = min(round(self._budget + self.ratio, 9), self.MAX_BUDGET)
+
+    def try_hedge(self) -> bool:
+        """ Take a hedge from the budget, False if the cap is reached """
+        with self._lock:
+            if self._budget < 1:
+                self.denied += 1
+                return False
+            self._budget -= 1
+            self.hedges += 1
+            return True
+
+    def refund(self) -> None:
+        """ The hedge was not sent (e.g. the rate limit has no slot) """
+        with self._lock:
+            self._budget = min(self._budget + 1, self.MAX_BUDGET)
+            self.hedges -= 1
+
+    def record_win(self) -> None:
+        with self._lock:
+            self.wins += 1
+
+    @property
+    def stats(self) -> dict:
+        delays = {key: self.delay(key) for key in list(self._latencies)}
+        return {
+            'ratio': self.ratio,
+            'requests': self.requests,
+            'hedges': self.hedges,
+            'wins': self.wins,
+            'denied': self.denied,
+            'delay_ms': {key: round(delay * 1000) for key, delay in delays.items() if delay is not None},
+        }
@@ -0,0 +1,207 @@
+import os
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ReadTimeout
+from urllib3.util.retry import Retry
+
+from .oauth_token_manager import OAuthTokenManager
+from .request_governor import RequestGovernor
+from .hedge_policy import HedgePolicy
+from .exceptions import HostUnavailable, JiraResponseError, JiraTimeout
+
+
+class JiraClient(object):
+    """
+    Long-lived, pooled HTTP session for one Jira host. The TCP/TLS connections are kept
+    alive across the poll cycles and shared by all stripes fetching from the same host.
+    Every request passes the host's RequestGovernor (rate limit, Retry-After, circuit breaker).
+    With hedging enabled a request slower than the recent p95 is sent a second time and the
+    first answer wins.
+    """
+
+    POOL_SIZE: int = 4
+    CONNECT_TIMEOUT: float = 5
+    READ_TIMEOUT: float = 30
+    RETRIES: int = 2
+
+    _instances: Dict[str, 'JiraClient'] = {}
+    _instances_lock: Lock = Lock()
+
+    def __init__(self, host: str, pool_size: Optional[int] = None,
+                 timeout: Optional[Tuple[float, float]] = None, hedging: Optional[HedgePolicy] = None) -> None:
+        self.logger = logging.getLogger(f'{__name__}.{host}')
+        self.host: str = host
+        self.pool_size: int = pool_size or int(os.environ.get('JIRA_POOL_SIZE') or self.POOL_SIZE)
+        self.timeout: Tuple[float, float] = timeout or (
+            float(os.environ.get('JIRA_CONNECT_TIMEOUT') or self.CONNECT_TIMEOUT),
+            float(os.environ.get('JIRA_READ_TIMEOUT') or self.READ_TIMEOUT)
+        )
+        self.hedging: HedgePolicy = hedging or HedgePolicy.get_instance()
+        self._session_lock: Lock = Lock()
+        self._session: requests.Session = self._new_session()
+        self.governor: RequestGovernor = RequestGovernor(host)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if self.hedging.enabled:
+            # Original und Hedge laufen in eigenen Threads, der Aufrufer wartet auf die erste Antwort
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size * 2, thread_name_prefix='jira-hedge')
+        self.requests: int = 0
+        self.reconnects: int = 0
+        self.hedge_wins: int = 0
+
+    @classmethod
+    def get_instance(cls, base_url: str) -> 'JiraClient':
+        host = cls.host_of(base_url)
+        with cls._instances_lock:
+            if host not in cls._instances:
+                cls._instances[host] = cls(host)
+            return cls._instances[host]
+
+    @classmethod
+    def get_info_dict(cls) -> list:
+        with cls._instances_lock:
+            return [client.stats for client in cls._instances.values()]
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        parts = urlsplit(url or '')
+        return f'{parts.scheme}://{parts.netloc}'
+
+    def _new_session(self) -> requests.Session:
+        # Only failed connects are retried here; stale sockets are handled by post() with a
+        # reconnect, and a slow Jira is not asked a second time (read timeouts are not retried)
+        retry = Retry(
+            total=self.RETRIES,
+            connect=self.RETRIES,
+            read=False,
+            status=0,
+            allowed_methods=frozenset(['GET', 'POST']),
+            backoff_factor=0.2,
+            raise_on_status=False,
+        )
+        # Hedges brauchen eigene Verbindungen, sonst würden sie nach der Antwort verworfen
+        pool_maxsize = self.pool_size * 2 if self.hedging.enabled else self.pool_size
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def reconnect(self) -> None:
+        """ Drop all pooled connections, the next request opens a fresh one """
+        with self._session_lock:
+            old_session, self._session = self._session, self._new_session()
+            self.reconnects += 1
+        old_session.close()
+
+    def post(self, url: str, json: dict, token_manager: OAuthTokenManager, stream: bool = False,
+             hedge: bool = False) -> requests.Response:
+        """
+        With stream the body is not read yet, the caller has to consume or close the response.
+        hedge allows a second request for small answers (counts), never for streamed searches.
+        """
+        token = token_manager.get_token()
+        self.requests += 1
+        hedge = hedge and not stream
+        try:
+            response = self._send(url, json, token, stream, hedge)
+        except (HostUnavailable, JiraTimeout):
+            raise
+        except ConnectionError:
+            # Der Pool kann nach langen Pausen tote Sockets enthalten: einmal neu verbinden
+            self.logger.debug(f'Connection to {self.host} failed, reconnecting')
+            self.reconnect()
+            response = self._send(url, json, token, stream, hedge)
+
+        if response.status_code == 401:
+            # Token wurde serverseitig widerrufen: neues Token holen und einmal wiederholen
+            token_manager.invalidate()
+            response.close()
+            response = self._send(url, json, token_manager.get_token(), stream, hedge)
+        if response.status_code == 429:
+            # Der Governor wartet die Retry-After Pause ab (oder bricht ab, wenn sie zu lang ist)
+            response.close()
+            response = self._send(url, json, token_manager.get_token(), stream, hedge)
+
+        if not response.ok:
+            # 429, 5xx und Fehlerseiten sind keine Suchergebnisse
+            self.logger.debug(f'Jira answered {response.status_code}: {response.text[:200]}')
+            response.close()
+            raise JiraResponseError(f'Jira answered {response.status_code} {response.reason} for {url}',
+                                    response.status_code)
+        return response
+
+    def _send(self, url: str, json: dict, token: dict, stream: bool = False, hedge: bool = False) -> requests.Response:
+        if self._executor is None or not hedge:
+            return self._send_once(url, json, token, stream)
+        self.hedging.request()
+        delay = self.hedging.delay(url)
+        if delay is None:
+            return self._send_once(url, json, token, stream)
+
+        primary = self._executor.submit(self._send_once, url, json, token, stream)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self.hedging.try_hedge():
+            return primary.result()
+        if not self.governor.try_acquire():
+            # Hedges warten nie auf das Rate-Limit
+            self.hedging.refund()
+            return primary.result()
+
+        hedge = self._executor.submit(self._send_once, url, json, token, stream, True)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self.hedge_wins += 1
+                        self.hedging.record_win()
+                    # Der langsamere Request läuft im Hintergrund zu Ende und liefert noch eine Latenz,
+                    # seine Antwort wird verworfen und gibt die Verbindung frei
+                    other = hedge if future is primary else primary
+                    other.add_done_callback(self._close_response)
+                    return future.result()
+        return primary.result()
+
+    @staticmethod
+    def _close_response(future: Future) -> None:
+        if future.exception() is None:
+            future.result().close()
+
+    def _send_once(self, url: str, json: dict, token: dict, stream: bool = False,
+                   admitted: bool = False) -> requests.Response:
+        headers = {'Authorization': f'Bearer {token.get("access_token")}'}
+        if not admitted:
+            self.governor.acquire()
+        start = time.monotonic()
+        try:
+            response = self._session.post(url=url, json=json, headers=headers, timeout=self.timeout, stream=stream)
+        except ReadTimeout:
+            self.governor.record_failure()
+            raise JiraTimeout(f'Timeout while accessing {url}')
+        except ConnectionError:
+            self.governor.record_failure()
+            raise
+        self.governor.record_response(response.status_code, response.headers)
+        self.hedging.record_latency(url, time.monotonic() - start)
+        return response
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'host': self.host,
+            'pool_size': self.pool_size,
+            'timeout': list(self.timeout),
+            'requests': self.requests,
+            'reconnects': self.reconnects,
+            'hedge_wins': self.hedge_wins,
+            'hedging': self.hedging.stats,
+            'governor': self.governor.stats,
+        }
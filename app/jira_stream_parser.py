@@ -0,0 +1,136 @@
+import re
+import codecs
+import json
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+from .jql import parse_jira_datetime
+
+# (key, status, created) eines Tickets
+TicketRecord = Tuple[str, str, float]
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def issue_record(issue: dict) -> TicketRecord:
+    fields = issue['fields']
+    return issue.get('key'), fields['status']['name'], parse_jira_datetime(fields['created'])
+
+
+class SearchPageParser(object):
+    """
+    Incremental parser for one Jira search response. The body is fed in chunks of raw bytes and
+    every issue is decoded on its own as soon as it is complete, so at most one issue and one
+    chunk are held in memory instead of the whole document. The other top-level members
+    (startAt, total, nextPageToken, isLast, ...) are collected in `page`.
+    """
+
+    # Zustände des Top-Level Objekts
+    START, KEY, COLON, VALUE, ISSUES_START, ISSUES, DONE = range(7)
+    # Rückgabe von _decode, solange der Wert noch nicht vollständig ist
+    INCOMPLETE = object()
+
+    def __init__(self) -> None:
+        self._decoder: codecs.IncrementalDecoder = codecs.getincrementaldecoder('utf-8')()
+        self._json: json.JSONDecoder = json.JSONDecoder()
+        self._buffer: str = ''
+        self._pos: int = 0
+        self._state: int = self.START
+        self._key: Optional[str] = None
+        self.page: dict = {}
+        self.issue_count: int = 0
+
+    def feed(self, chunk: bytes) -> Iterator[dict]:
+        """ Add the next chunk of the body, yields the issues completed by it """
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(chunk)
+        self._pos = 0
+        return self._parse(eof=False)
+
+    def close(self) -> Iterator[dict]:
+        """ The body is complete, yields the remaining issues and raises if the document is incomplete """
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(b'', final=True)
+        self._pos = 0
+        yield from self._parse(eof=True)
+        if self._state != self.DONE or self._pos < len(self._buffer):
+            raise json.JSONDecodeError('Incomplete or invalid Jira search response', self._buffer, self._pos)
+
+    def _parse(self, eof: bool) -> Iterator[dict]:
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos >= len(self._buffer) or self._state == self.DONE:
+                return
+            char = self._buffer[self._pos]
+
+            if self._state == self.START:
+                self._expect(char, '{', self.KEY)
+            elif self._state == self.KEY:
+                if char == ',':
+                    self._pos += 1
+                elif char == '}':
+                    self._expect(char, '}', self.DONE)
+                else:
+                    key = self._decode(eof)
+                    if key is self.INCOMPLETE:
+                        return
+                    if not isinstance(key, str):
+                        raise json.JSONDecodeError('Expecting property name', self._buffer, self._pos)
+                    self._key = key
+                    self._state = self.COLON
+            elif self._state == self.COLON:
+                # Die Issues einzeln statt als ganze Liste dekodieren
+                self._expect(char, ':', self.ISSUES_START if self._key == 'issues' else self.VALUE)
+            elif self._state == self.ISSUES_START:
+                self._expect(char, '[', self.ISSUES)
+            elif self._state == self.VALUE:
+                value = self._decode(eof)
+                if value is self.INCOMPLETE:
+                    return
+                self.page[self._key] = value
+                self._state = self.KEY
+            elif char == ',':
+                self._pos += 1
+            elif char == ']':
+                self._expect(char, ']', self.KEY)
+            else:
+                issue = self._decode(eof)
+                if issue is self.INCOMPLETE:
+                    return
+                if not isinstance(issue, dict):
+                    raise json.JSONDecodeError('Expecting issue object', self._buffer, self._pos)
+                self.issue_count += 1
+                yield issue
+
+    def _expect(self, char: str, expected: str, state: int) -> None:
+        if char != expected:
+            raise json.JSONDecodeError(f'Expecting {expected!r}', self._buffer, self._pos)
+        self._pos += 1
+        self._state = state
+
+    def _decode(self, eof: bool):
+        """ Decode the value at the current position, INCOMPLETE if more data is needed """
+        try:
+            value, end = self._json.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            return self.INCOMPLETE
+        if end >= len(self._buffer) and not eof:
+            # Eine Zahl oder ein Literal am Ende des Puffers kann noch weitergehen
+            return self.INCOMPLETE
+        self._pos = end
+        return value
+
+
+def parse_search_page(chunks: Iterable[bytes], page: Optional[dict] = None,
+                      transform: Callable[[dict], object] = issue_record) -> Iterator:
+    """
+    Stream the issues of a search response body given as byte chunks, by default as
+    (key, status, created) records. The top-level members are copied to page once the body is read.
+    """
+    parser = SearchPageParser()
+    for chunk in chunks:
+        for issue in parser.feed(chunk):
+            yield transform(issue)
+    for issue in parser.close():
+        yield transform(issue)
+    if page is not None:
+        page.update(parser.page)
@@ -1,19 +1,32 @@
 import time
-from typing import Dict
+import math
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import logging
 import os
 import json
 from collections import OrderedDict
+from threading import Lock
 
-from requests.exceptions import ConnectionError
-from requests.auth import HTTPBasicAuth
-from oauthlib.oauth2 import BackendApplicationClient
-from requests_oauthlib import OAuth2Session
+from requests.exceptions import ChunkedEncodingError, ConnectionError
+
+from .oauth_token_manager import OAuthTokenManager
+from .jira_client import JiraClient
+from .fetch_engine import FetchEngine
+from .count_backend import CountBackend, get_count_backend
+from .ticket_index import TicketIndex
+from .ticket_snapshot import TicketSnapshot
+from .jira_stream_parser import issue_record, parse_search_page
+from .jql import JqlQuery, JqlError, parse_jira_duration, parse_jira_datetime
 
 
 class JiraTicketFetcher:
 
     TIMEOUT: int = 60*60  # 1h
+    PAGE_SIZE: int = 100
+    CHUNK_SIZE: int = 16 * 1024  # Suchergebnisse werden in Stücken dieser Grösse gelesen und geparst
+    FETCH_MODES = ('count', 'snapshot', 'incremental')
+    RECONCILE_INTERVAL: int = 60*60  # vollständiger Abgleich im incremental Modus (findet gelöschte Tickets)
+    WATERMARK_OVERLAP: int = 60  # relative JQL Datumsangaben sind minutengenau
     STATUS_MAP: Dict[str, Dict[str, str]] = {
         'Open': {
             'color': '(255, 0, 0)',
@@ -33,96 +46,302 @@ class JiraTicketFetcher:
         },
     }
 
-    def __init__(self, name: str, jira_filter: str) -> None:
+    def __init__(self, name: str, jira_filter: str, fetch_mode: Optional[str] = None,
+                 snapshot: Optional[TicketSnapshot] = None, fetch_on_init: bool = True) -> None:
         self.logger = logging.getLogger(f'{__name__}.{name}')
         self._token_url: str = os.environ.get('ACCESS_TOKEN_URL')
         self._client_id: str = os.environ.get('CLIENT_ID')
         self._client_secret: str = os.environ.get('CLIENT_SECRET')
         self.scope: str = os.environ.get('SCOPE')
         self._base_url: str = os.environ.get('BASE_URL')
+        self._client: JiraClient = JiraClient.get_instance(self._base_url)
+        self._token_manager: OAuthTokenManager = OAuthTokenManager.get_instance(
+            token_url=self._token_url,
+            client_id=self._client_id,
+            client_secret=self._client_secret,
+            scope=self.scope,
+            timeout=self._client.timeout
+        )
+        self._fetch_engine: FetchEngine = FetchEngine.get_instance()
+        self._count_backend: CountBackend = get_count_backend(self._base_url)
+        self._search_url: str = f'{self._base_url}/search'
+        self.requests_sent: int = 0
 
         self.name = name
         self.jira_filter = jira_filter
+        self.fetch_mode: str = fetch_mode or 'count'
+        if self.fetch_mode not in self.FETCH_MODES:
+            raise ValueError(f'Unknown fetch mode for {name}: {self.fetch_mode}')
 
         self._tickets: OrderedDict[str, dict] = OrderedDict()
         self._last_update: float = time.time()
-
+        self._index: TicketIndex = TicketIndex(self.STATUS_MAP.keys())
+        self._timeouts: Dict[str, int] = {status: parse_jira_duration(ticket.get('timeout'))
+                                          for status, ticket in self.STATUS_MAP.items()}
+        # Poll und Webhooks ändern den Index aus verschiedenen Threads
+        self._index_lock: Lock = Lock()
+        self._index_loaded: bool = False
         try:
-            self.update_tickets()
-        except ConnectionError as e:
-            self.logger.error(e)
+            self._filter_query: Optional[JqlQuery] = JqlQuery(jira_filter)
+        except JqlError as e:
+            self.logger.info(f'Webhook events cannot be applied locally: {e}')
+            self._filter_query = None
+        self._watermark: Optional[float] = None
+        self._last_reconcile: float = 0
+        # Per Webhook geänderte Tickets: key -> (Zeitpunkt, Record oder None für entfernt), damit ein Poll,
+        # der vor dem Event gestartet ist, den neueren Stand nicht überschreibt
+        self._webhook_changes: Dict[str, Tuple[float, Optional[Tuple[str, str, float]]]] = {}
+        if snapshot is not None:
+            # Letzter bekannter Stand, gültig bis TIMEOUT nach dem Speichern, falls Jira nicht erreichbar ist
+            self._tickets = OrderedDict((status, dict(ticket)) for status, ticket in snapshot.tickets.items())
+            self._last_update = snapshot.saved_at
 
-    def _get_oauth_token(self) -> OAuth2Session:
+        if fetch_on_init:
+            try:
+                self.update_tickets()
+            except ConnectionError as e:
+                self.logger.error(e)
+
+    def update_tickets(self):
+        url: str = self._search_url
 
-        client = BackendApplicationClient(client_id=self._client_id)
-        oauth = OAuth2Session(client=client)
         try:
-            oauth.fetch_token(
-                token_url=self._token_url,
-                auth=HTTPBasicAuth(self._client_id, self._client_secret),
-                scope=self.scope
-            )
+            if self.fetch_mode == 'snapshot':
+                tickets = self._fetch_snapshot(url)
+            elif self.fetch_mode == 'incremental':
+                tickets = self._fetch_incremental(url)
+            else:
+                tickets = self._fetch_counts(url)
         except ConnectionError:
-            self.logger.debug(f'Could not get OAuth token for client_id: {self._client_id}')
-            if not self.data_still_valid:
-                self._tickets = OrderedDict()
-                self._colors = OrderedDict()
-            raise ConnectionError('Could not get OAuth token.')
-        return oauth
+            self.fail()
 
-    def update_tickets(self):
-        oauth: OAuth2Session = self._get_oauth_token()
-        path: str = 'search'
-        url: str = f'{self._base_url}/{path}'
+        self._tickets = tickets
+        self._last_update = time.time()
 
-        try:
-            for status in self.STATUS_MAP.keys():
-                self._tickets[status] = self.STATUS_MAP.get(status)
-                jql_status = f'{self.jira_filter} AND status = "{status}"'
-                data = {
-                    'jql': jql_status,
-                    'maxResults': 0,
-                    'fields': ['key']
-                }
-                response_status = oauth.post(url=url, json=data)
-                try:
-                    response_status_json = json.JSONDecoder().decode(response_status.text)
-                except json.decoder.JSONDecodeError:
-                    self.logger.debug(f'Could not decode JSON response from Jira: {response_status.text}')
-                    if not self.data_still_valid:
-                        self._tickets = OrderedDict()
-                    raise ConnectionError('Could not decode JSON response from Jira.')
-                total_status = response_status_json.get('total')
-                self.logger.debug(f'Total Jira tickets {status}: {total_status}')
-                self._tickets[status]['count'] = total_status
-
-                timeout = self._tickets[status].get('timeout')
-                jql_timeout = f'{jql_status} AND created <= -{timeout}'
-                data = {
-                    'jql': jql_timeout,
-                    'maxResults': 0,
-                    'fields': ['key']
-                }
-                response_timeout = oauth.post(url=url, json=data)
-                try:
-                    response_timeout_json = json.JSONDecoder().decode(response_timeout.text)
-                except json.decoder.JSONDecodeError:
-                    self.logger.debug(f'Could not decode JSON response from Jira: {response_timeout.text}')
-                    if not self.data_still_valid:
-                        self._tickets = OrderedDict()
-                    raise ConnectionError('Could not decode JSON response from Jira.')
-                total_timeout = response_timeout_json.get('total')
-                self.logger.debug(f'Overdue Jira tickets {status}: {total_timeout}')
-                self._tickets[status]['overdue'] = total_timeout
+    def fail(self):
+        """ Handle a failed fetch: drop outdated tickets and raise ConnectionError """
+        self.logger.debug(f'Could not access {self.name} Jira at: {self._search_url}')
+        if not self.data_still_valid:
+            self._tickets = OrderedDict()
+        raise ConnectionError(f'Could not access Jira: {self._search_url}')
 
-        except ConnectionError:
-            self.logger.debug(f'Could not access {self.name} Jira at: {url}')
-            if not self.data_still_valid:
-                self._tickets = OrderedDict()
-            raise ConnectionError(f'Could not access Jira: {url}')
+    def search_issues(self, jql: str, fields: List[str],
+                      transform: Callable[[dict], object] = issue_record) -> Iterator:
+        """ Paginated search over all issues matching jql, yields transform(issue) for every issue """
+        data = {
+            'jql': jql,
+            'maxResults': self.PAGE_SIZE,
+            'fields': fields
+        }
+        return self._search_issues(self._search_url, data, transform)
 
+    def apply_records(self, records: Iterable[Tuple[str, str, float]], started: float) -> None:
+        """ Replace the tickets by (key, status, created) records of a search started elsewhere at started """
+        self._tickets = self._replace_index(list(records), started)
         self._last_update = time.time()
 
+    def apply_tickets(self, tickets: OrderedDict) -> None:
+        """ Take over the tickets of another fetcher with the same filter """
+        self._tickets = OrderedDict((status, dict(ticket)) for status, ticket in tickets.items())
+        self._last_update = time.time()
+
+    @property
+    def can_apply_events(self) -> bool:
+        """ Whether webhook events can update the tickets locally (needs a loaded index and a local filter) """
+        return self.fetch_mode != 'count' and self._filter_query is not None and self._index_loaded
+
+    def apply_events(self, events: Iterable[Tuple[str, dict]]) -> Tuple[int, bool]:
+        """
+        Apply Jira webhook events (webhookEvent, issue) to the index. Returns the number of events
+        concerning this filter (matching issues and issues leaving the index) and whether the tickets changed.
+        """
+        now = time.time()
+        consumed = 0
+        changed = False
+        with self._index_lock:
+            for event, issue in events:
+                key = issue.get('key')
+                try:
+                    if event == 'jira:issue_deleted' or not self._filter_query.matches(issue, now):
+                        if key in self._index:
+                            consumed += 1
+                            changed |= self._index.remove(key)
+                            self._webhook_changes[key] = (now, None)
+                    else:
+                        consumed += 1
+                        fields = issue['fields']
+                        record = (key, fields['status']['name'], parse_jira_datetime(fields['created']))
+                        changed |= self._index.upsert(*record)
+                        self._webhook_changes[key] = (now, record)
+                except (KeyError, TypeError, ValueError) as e:
+                    self.logger.warning(f'Ignoring malformed webhook event {event} for {key}: {e}')
+            if changed:
+                self._tickets = self._tickets_from_index(now)
+        if consumed:
+            # Events zu fremden Issues sagen nichts darüber, ob die Tickets dieses Filters aktuell sind
+            self._last_update = now
+        return consumed, changed
+
+    def estimated_requests(self, ticket_count: int) -> int:
+        """ Requests a fetch of this stripe alone would need for ticket_count tickets """
+        if self.fetch_mode == 'count':
+            # Overdue-Queries nur für Status mit Tickets
+            return len(self.STATUS_MAP) + min(ticket_count, len(self.STATUS_MAP))
+        return max(math.ceil(ticket_count / self.PAGE_SIZE), 1)
+
+    def next_overdue_deadline(self, now: Optional[float] = None) -> Optional[float]:
+        """ When the next ticket becomes overdue, None without a loaded index (count mode) """
+        if not self._index_loaded:
+            return None
+        with self._index_lock:
+            return self._index.next_deadline(self._timeouts, time.time() if now is None else now)
+
+    def refresh_overdue(self, now: Optional[float] = None) -> bool:
+        """ Recompute the overdue counts from the index, returns True if they changed """
+        if not self._index_loaded:
+            return False
+        with self._index_lock:
+            tickets = self._tickets_from_index(time.time() if now is None else now)
+            changed = tickets != self._tickets
+            self._tickets = tickets
+        return changed
+
+    def _post_json(self, url: str, data: dict) -> dict:
+        self.requests_sent += 1
+        # Nur Count-Queries werden gehedged, ihre Antworten sind klein
+        response = self._client.post(url=url, json=data, token_manager=self._token_manager, hedge=True)
+        try:
+            return json.JSONDecoder().decode(response.text)
+        except json.decoder.JSONDecodeError:
+            self.logger.debug(f'Could not decode JSON response from Jira: {response.text}')
+            raise ConnectionError('Could not decode JSON response from Jira.')
+
+    def _post_search(self, url: str, data: dict, transform: Callable[[dict], object]) -> Tuple[dict, list]:
+        """ One search page, parsed while it is read: returns the top-level members and transform(issue) per issue """
+        self.requests_sent += 1
+        response = self._client.post(url=url, json=data, token_manager=self._token_manager, stream=True)
+        page = {}
+        try:
+            with response:
+                items = list(parse_search_page(response.iter_content(self.CHUNK_SIZE), page, transform))
+        except (ValueError, ChunkedEncodingError) as e:
+            self.logger.debug(f'Could not decode JSON response from Jira: {e}')
+            raise ConnectionError('Could not decode JSON response from Jira.')
+        return page, items
+
+    def _post_search_pooled(self, url: str, data: dict, transform: Callable[[dict], object]) -> Tuple[dict, list]:
+        # Auch einzelne Seiten laufen im Query-Pool, sonst hätten Stripes und Queries mehr Verbindungen offen als der Pool
+        return self._fetch_engine.map_queries(lambda page_data: self._post_search(url, page_data, transform), [data])[0]
+
+    def _new_tickets(self) -> OrderedDict:
+        # Kopien der STATUS_MAP Einträge, damit sich die Stripes die Zähler nicht teilen
+        return OrderedDict((status, dict(values)) for status, values in self.STATUS_MAP.items())
+
+    def _fetch_counts(self, url: str) -> OrderedDict:
+        # Count-Query pro Status parallel, danach die Overdue-Queries nur für Status mit Tickets
+        tickets = self._new_tickets()
+        jql_status = {status: f'{self.jira_filter} AND status = "{status}"' for status in tickets.keys()}
+        counts = self._fetch_engine.map_queries(self._count, jql_status.values())
+        for status, count in zip(tickets.keys(), counts):
+            tickets[status]['count'] = count
+            tickets[status]['overdue'] = 0
+
+        statuses = [status for status, count in zip(tickets.keys(), counts) if count]
+        jql_overdue = [f'{jql_status[status]} AND created <= -{tickets[status].get("timeout")}' for status in statuses]
+        for status, overdue in zip(statuses, self._fetch_engine.map_queries(self._count, jql_overdue)):
+            tickets[status]['overdue'] = overdue
+        for status, ticket in tickets.items():
+            self.logger.debug(f'Jira tickets {status}: {ticket["count"]} (overdue: {ticket["overdue"]})')
+        return tickets
+
+    def _count(self, jql: str) -> int:
+        return self._count_backend.count(jql, self._post_json)
+
+    def _fetch_snapshot(self, url: str) -> OrderedDict:
+        # Eine paginierte Query über alle Status, Zählung erfolgt lokal
+        started = time.time()
+        return self._replace_index(list(self._search_records(url, self._status_jql())), started)
+
+    def _replace_index(self, records: List[Tuple[str, str, float]], started: float) -> OrderedDict:
+        with self._index_lock:
+            newer = self._newer_webhook_changes(started)
+            if newer:
+                records = [record for record in records if record[0] not in newer]
+                records += [record for record in newer.values() if record is not None]
+            removed = self._index.replace(records)
+            self._index_loaded = True
+            self.logger.debug(f'Full load: {len(self._index)} tickets, {removed} removed')
+            return self._tickets_from_index(now=time.time())
+
+    def _fetch_incremental(self, url: str) -> OrderedDict:
+        sync_start = time.time()
+        if self._watermark is None or sync_start - self._last_reconcile >= self.RECONCILE_INTERVAL:
+            tickets = self._replace_index(list(self._search_records(url, self._status_jql())), sync_start)
+            self._last_reconcile = sync_start
+        else:
+            # Nur die seit dem letzten Sync geänderten Tickets holen
+            minutes = math.ceil((sync_start - self._watermark + self.WATERMARK_OVERLAP) / 60)
+            jql = f'{self.jira_filter} AND updated >= -{minutes}m'
+            records = list(self._search_records(url, jql))
+            with self._index_lock:
+                newer = self._newer_webhook_changes(sync_start)
+                changes = sum(self._index.upsert(*record) for record in records if record[0] not in newer)
+                tickets = self._tickets_from_index(now=time.time())
+            self.logger.debug(f'Incremental sync: {changes} changes')
+        self._watermark = sync_start
+        return tickets
+
+    def _newer_webhook_changes(self, started: float) -> Dict[str, Optional[Tuple[str, str, float]]]:
+        # Mit gehaltenem Index-Lock: ältere Webhook-Änderungen sind im Poll enthalten und werden vergessen
+        self._webhook_changes = {key: change for key, change in self._webhook_changes.items() if change[0] >= started}
+        return {key: record for key, (_, record) in self._webhook_changes.items()}
+
+    def _status_jql(self) -> str:
+        return f'{self.jira_filter} AND {self.status_clause()}'
+
+    @classmethod
+    def status_clause(cls) -> str:
+        statuses = ', '.join(f'"{status}"' for status in cls.STATUS_MAP.keys())
+        return f'status in ({statuses})'
+
+    def _search_records(self, url: str, jql: str) -> Iterator[Tuple[str, str, float]]:
+        data = {
+            'jql': jql,
+            'maxResults': self.PAGE_SIZE,
+            'fields': ['status', 'created']
+        }
+        return self._search_issues(url, data, issue_record)
+
+    def _search_issues(self, url: str, data: dict, transform: Callable[[dict], object]) -> Iterator:
+        # Die Issues werden beim Lesen geparst und sofort umgewandelt, keine Seite liegt komplett im Speicher
+        page, items = self._post_search_pooled(url, dict(data, startAt=0), transform)
+        page_size = len(items)
+        yield from items
+
+        # nextPageToken Paginierung (search/jql) geht nur sequentiell
+        while page.get('nextPageToken') and not page.get('isLast'):
+            page, items = self._post_search_pooled(url, dict(data, nextPageToken=page.get('nextPageToken')),
+                                                   transform)
+            yield from items
+        if 'nextPageToken' in page or not page_size:
+            return
+
+        # startAt/total Paginierung: die restlichen Seiten parallel holen
+        start_ats = range(page.get('startAt', 0) + page_size, page.get('total', 0), page_size)
+        pages = self._fetch_engine.map_queries(
+            lambda start_at: self._post_search(url, dict(data, startAt=start_at), transform)[1], start_ats)
+        for items in pages:
+            yield from items
+
+    def _tickets_from_index(self, now: float) -> OrderedDict:
+        tickets = self._new_tickets()
+        for status, ticket in tickets.items():
+            deadline = now - self._timeouts[status]
+            ticket['count'] = self._index.count(status)
+            ticket['overdue'] = self._index.overdue(status, deadline)
+            self.logger.debug(f'Jira tickets {status}: {ticket["count"]} (overdue: {ticket["overdue"]})')
+        return tickets
+
     @property
     def tickets(self) -> OrderedDict:
         return self._tickets
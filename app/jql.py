@@ -0,0 +1,291 @@
+import re
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Einheiten der relativen JQL-Datumsangaben (z.B. '3h', '4w') in Sekunden
+JIRA_DURATION_UNITS: Dict[str, int] = {
+    'm': 60,
+    'h': 60*60,
+    'd': 24*60*60,
+    'w': 7*24*60*60,
+}
+
+# JQL Feldnamen, die anders heissen als die Felder der Issues
+FIELD_ALIASES: Dict[str, str] = {
+    'type': 'issuetype',
+    'component': 'components',
+    'fixversion': 'fixVersions',
+    'affectedversion': 'versions',
+    'createddate': 'created',
+    'updateddate': 'updated',
+    'resolved': 'resolutiondate',
+    'due': 'duedate',
+    'issuekey': 'key',
+    'issue': 'key',
+    'id': 'key',
+}
+DATE_FIELDS: Set[str] = {'created', 'updated', 'resolutiondate', 'duedate'}
+# Attribute von Objekt-Feldern (project, status, assignee...), gegen die verglichen wird
+OBJECT_ATTRIBUTES: Tuple[str, ...] = ('key', 'name', 'value', 'id', 'displayName', 'accountId', 'emailAddress')
+
+TOKEN_REGEX = re.compile(r'''\s*(?:
+    (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<op>!=|<=|>=|!~|=|<|>|~)
+  | (?P<punct>[(),])
+  | (?P<word>[^\s"'(),=!<>~]+)
+)''', re.VERBOSE)
+
+
+class JqlError(ValueError):
+    """ The JQL uses syntax this module cannot parse or evaluate locally """
+
+
+def parse_jira_duration(duration: str) -> int:
+    """ Convert a relative JQL duration like '3h' or '4w' into seconds """
+    match = re.fullmatch(r'\s*(\d+)\s*([mhdw])\s*', duration)
+    if not match:
+        raise ValueError(f'Invalid Jira duration: {duration}')
+    return int(match.group(1)) * JIRA_DURATION_UNITS[match.group(2)]
+
+
+def parse_jira_datetime(value: str) -> float:
+    """ Convert a Jira timestamp like '2024-03-05T09:12:33.000+0100' into epoch seconds """
+    try:
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f%z').timestamp()
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def issue_field(name: str) -> str:
+    """ Map a JQL field name to the field id in the issue JSON """
+    match = re.fullmatch(r'cf\[(\d+)\]', name, re.IGNORECASE)
+    if match:
+        return f'customfield_{match.group(1)}'
+    return FIELD_ALIASES.get(name.lower(), name if name.startswith('customfield_') else name.lower())
+
+
+class Clause(object):
+
+    def __init__(self, field: str, operator: str, values: List[str]) -> None:
+        self.field: str = issue_field(field)
+        self.operator: str = operator
+        self.values: List[str] = values
+        if self.field in DATE_FIELDS:
+            if operator not in ('<', '<=', '>', '>=', 'is', 'is not'):
+                raise JqlError(f'Operator {operator} is not supported for date field {field}')
+        elif operator in ('<', '<=', '>', '>='):
+            raise JqlError(f'Operator {operator} is only supported for date fields')
+        self._lower_values: Set[str] = {value.lower() for value in values}
+        # 'resolution = Unresolved' meint in Jira ein leeres Feld, nicht eine Resolution dieses Namens
+        self._matches_empty: bool = self.field == 'resolution' and 'unresolved' in self._lower_values
+
+    def matches(self, issue: dict, now: float) -> bool:
+        if self.field in DATE_FIELDS:
+            return self._matches_date(issue, now)
+        values = field_values(issue, self.field)
+        if self.operator == 'is':
+            return not values
+        if self.operator == 'is not':
+            return bool(values)
+        hit = any(value in self._lower_values for value in values) or (self._matches_empty and not values)
+        if self.operator in ('=', 'in'):
+            return hit
+        return bool(values) and not hit  # '!=' und 'not in' matchen keine leeren Felder
+
+    def _matches_date(self, issue: dict, now: float) -> bool:
+        raw = (issue.get('fields') or {}).get(self.field)
+        if self.operator in ('is', 'is not'):
+            return (raw is None) == (self.operator == 'is')
+        if raw is None:
+            return False
+        value = parse_jira_datetime(raw)
+        limit = jql_date(self.values[0], now)
+        return {
+            '<': value < limit,
+            '<=': value <= limit,
+            '>': value > limit,
+            '>=': value >= limit,
+        }[self.operator]
+
+
+class Node(object):
+
+    def __init__(self, operator: str, children: List[object]) -> None:
+        self.operator: str = operator
+        self.children: List[object] = children
+
+    def matches(self, issue: dict, now: float) -> bool:
+        if self.operator == 'and':
+            return all(child.matches(issue, now) for child in self.children)
+        if self.operator == 'or':
+            return any(child.matches(issue, now) for child in self.children)
+        return not self.children[0].matches(issue, now)
+
+
+class JqlQuery(object):
+    """
+    Parser and local evaluator for the subset of JQL used in stripe filters: clauses with
+    =, !=, in, not in, is (not) empty and date comparisons against relative or absolute dates,
+    combined with AND, OR, NOT and parentheses. Everything else raises JqlError.
+    """
+
+    def __init__(self, jql: str) -> None:
+        self.jql: str = jql
+        self._tokens: List[Tuple[str, str, int]] = self._tokenize(jql)
+        self._pos: int = 0
+        self.condition: str = jql.strip()
+        self.fields: Set[str] = set()
+        self._root = self._parse_or()
+        if self._peek_keyword('order'):
+            self.condition = jql[:self._tokens[self._pos][2]].strip()
+        elif self._pos < len(self._tokens):
+            raise JqlError(f'Unexpected token {self._tokens[self._pos][1]!r} in JQL: {jql}')
+
+    def matches(self, issue: dict, now: Optional[float] = None) -> bool:
+        return self._root.matches(issue, time.time() if now is None else now)
+
+    @staticmethod
+    def _tokenize(jql: str) -> List[Tuple[str, str, int]]:
+        tokens = []
+        pos = 0
+        jql = jql.rstrip()
+        while pos < len(jql):
+            match = TOKEN_REGEX.match(jql, pos)
+            if not match or match.end() == pos:
+                raise JqlError(f'Cannot tokenize JQL: {jql}')
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == 'string':
+                value = re.sub(r'\\(.)', r'\1', value[1:-1])
+            tokens.append((kind, value, match.start(kind)))
+            pos = match.end()
+        return tokens
+
+    def _next(self) -> Tuple[str, str, int]:
+        if self._pos >= len(self._tokens):
+            raise JqlError(f'Unexpected end of JQL: {self.jql}')
+        token = self._tokens[self._pos]
+        self._pos += 1
+        return token
+
+    def _peek_keyword(self, *keywords: str) -> bool:
+        if self._pos >= len(self._tokens):
+            return False
+        kind, value, _ = self._tokens[self._pos]
+        return kind == 'word' and value.lower() in keywords
+
+    def _peek_punct(self, punct: str) -> bool:
+        return self._pos < len(self._tokens) and self._tokens[self._pos][:2] == ('punct', punct)
+
+    def _parse_or(self):
+        children = [self._parse_and()]
+        while self._peek_keyword('or'):
+            self._pos += 1
+            children.append(self._parse_and())
+        return children[0] if len(children) == 1 else Node('or', children)
+
+    def _parse_and(self):
+        children = [self._parse_not()]
+        while self._peek_keyword('and'):
+            self._pos += 1
+            children.append(self._parse_not())
+        return children[0] if len(children) == 1 else Node('and', children)
+
+    def _parse_not(self):
+        if self._peek_keyword('not'):
+            self._pos += 1
+            return Node('not', [self._parse_not()])
+        if self._peek_punct('('):
+            self._pos += 1
+            node = self._parse_or()
+            if self._next()[:2] != ('punct', ')'):
+                raise JqlError(f'Missing closing parenthesis in JQL: {self.jql}')
+            return node
+        return self._parse_clause()
+
+    def _parse_clause(self) -> Clause:
+        kind, field, _ = self._next()
+        if kind not in ('word', 'string'):
+            raise JqlError(f'Expected field name, got {field!r} in JQL: {self.jql}')
+        kind, operator, _ = self._next()
+        operator = operator.lower()
+        if kind == 'op' and operator in ('=', '!=', '<', '<=', '>', '>='):
+            values = [self._parse_value()]
+        elif kind == 'word' and operator == 'in':
+            values = self._parse_list()
+        elif kind == 'word' and operator == 'not' and self._peek_keyword('in'):
+            self._pos += 1
+            operator = 'not in'
+            values = self._parse_list()
+        elif kind == 'word' and operator == 'is':
+            if self._peek_keyword('not'):
+                self._pos += 1
+                operator = 'is not'
+            if not self._peek_keyword('empty', 'null'):
+                raise JqlError(f'Only EMPTY and NULL are supported after IS in JQL: {self.jql}')
+            self._pos += 1
+            values = []
+        else:
+            raise JqlError(f'Operator {operator!r} is not supported in JQL: {self.jql}')
+        clause = Clause(field, operator, values)
+        self.fields.add(clause.field)
+        return clause
+
+    def _parse_value(self) -> str:
+        kind, value, _ = self._next()
+        if kind not in ('word', 'string'):
+            raise JqlError(f'Expected value, got {value!r} in JQL: {self.jql}')
+        if kind == 'word' and self._peek_punct('('):
+            raise JqlError(f'Function {value}() is not supported in JQL: {self.jql}')
+        if kind == 'word' and value.lower() in ('empty', 'null'):
+            raise JqlError(f'Use IS EMPTY instead of = EMPTY in JQL: {self.jql}')
+        return value
+
+    def _parse_list(self) -> List[str]:
+        if self._next()[:2] != ('punct', '('):
+            raise JqlError(f'Expected list after IN in JQL: {self.jql}')
+        values = [self._parse_value()]
+        while self._peek_punct(','):
+            self._pos += 1
+            values.append(self._parse_value())
+        if self._next()[:2] != ('punct', ')'):
+            raise JqlError(f'Missing closing parenthesis in JQL: {self.jql}')
+        return values
+
+
+def field_values(issue: dict, field: str) -> List[str]:
+    """ All comparable (lower case) values of a field of an issue """
+    if field == 'key':
+        return [issue.get('key', '').lower()]
+    return list(_flatten((issue.get('fields') or {}).get(field)))
+
+
+def _flatten(raw) -> Iterable[str]:
+    if raw is None or raw == '':
+        return
+    if isinstance(raw, list):
+        for item in raw:
+            yield from _flatten(item)
+    elif isinstance(raw, dict):
+        for attribute in OBJECT_ATTRIBUTES:
+            if raw.get(attribute) is not None:
+                yield str(raw[attribute]).lower()
+    else:
+        yield str(raw).lower()
+
+
+def jql_date(value: str, now: float) -> float:
+    """ Evaluate a relative ('-3h', '2d') or absolute ('2024-03-05 14:00') JQL date """
+    match = re.fullmatch(r'([+-]?)(\d+)([mhdw])', value.strip())
+    if match:
+        seconds = int(match.group(2)) * JIRA_DURATION_UNITS[match.group(3)]
+        return now - seconds if match.group(1) == '-' else now + seconds
+    for date_format in ('%Y-%m-%d %H:%M', '%Y/%m/%d %H:%M', '%Y-%m-%d', '%Y/%m/%d'):
+        try:
+            # Absolute Daten interpretiert Jira in der Zeitzone des Benutzers, hier lokale Zeit
+            return datetime.strptime(value.strip(), date_format).timestamp()
+        except ValueError:
+            pass
+    raise JqlError(f'Unsupported JQL date: {value}')
@@ -1,4 +1,5 @@
-from typing import Tuple, Any
+from typing import List, Tuple, Any, Optional
+from functools import lru_cache
 from enum import Enum, auto
 import random
 import re
@@ -6,6 +7,30 @@ import re
 
 class ColorEffects(Enum):
     overdue = auto()
+    blink = auto()
+    chase = auto()
+
+
+# Helligkeitstabellen, pro Stufe beim ersten Gebrauch berechnet
+_BRIGHTNESS_LUTS: List[Optional[bytes]] = [None] * 256
+
+
+def brightness_lut(brightness: int) -> bytes:
+    """ Channel values scaled to brightness (0-255): lut[c] == int(brightness / 255 * c) """
+    lut = _BRIGHTNESS_LUTS[brightness]
+    if lut is None:
+        lut = _BRIGHTNESS_LUTS[brightness] = bytes(int((brightness / 255) * c) for c in range(256))
+    return lut
+
+
+@lru_cache(maxsize=8)
+def gamma_lut(gamma: float) -> bytes:
+    """ Gamma correction table, with about 2.8 the perceived brightness of WS2812 LEDs is linear """
+    return bytes(int((c / 255) ** gamma * 255 + 0.5) for c in range(256))
+
+
+def apply_lut(rgb: Tuple[int, int, int], lut: bytes) -> Tuple[int, int, int]:
+    return lut[rgb[0]], lut[rgb[1]], lut[rgb[2]]
 
 
 class classproperty(property):
@@ -14,15 +39,44 @@ class classproperty(property):
 
 
 class Color(object):
+    """
+    Immutable RGB value with an optional effect. The named colors, parsed tuple strings and effect
+    variants are shared instances, so the render loop does not create new objects for them.
+    """
+
+    __slots__ = ('r', 'g', 'b', 'effect', '_char')
 
     # Regex für ein Tuple mit 3 Integer
     TUPLE_REGEX = r'\(\s*(-?\d+)\s*,\s*(-?\d+)\s*,\s*(-?\d+)\s*\)'
-
-    def __init__(self, r:int, g:int, b:int):
-        self.r = min(r, 255)
-        self.g = min(g, 255)
-        self.b = min(b, 255)
-        self._effect = None
+    _TUPLE_PATTERN = re.compile(TUPLE_REGEX)
+
+    # Benannte Farben, nach der Klasse als gemeinsame Instanzen gesetzt
+    white: 'Color'
+    black: 'Color'
+    blue: 'Color'
+    red: 'Color'
+    green: 'Color'
+    yellow: 'Color'
+    magenta: 'Color'
+    cyan: 'Color'
+    orange: 'Color'
+
+    def __init__(self, r: int, g: int, b: int, effect: Optional['ColorEffects'] = None):
+        init = object.__setattr__
+        init(self, 'r', min(r, 255))
+        init(self, 'g', min(g, 255))
+        init(self, 'b', min(b, 255))
+        init(self, 'effect', effect)
+        init(self, '_char', None)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f'Color is immutable, cannot set {name}')
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f'Color is immutable, cannot delete {name}')
+
+    def __reduce__(self):
+        return Color, (self.r, self.g, self.b, self.effect)
 
     @classmethod
     def from_hex(cls, hex:int) -> 'Color':
@@ -32,60 +86,31 @@ class Color(object):
     def from_rgb(cls, r:int, g:int, b:int) -> 'Color':
         return cls(r, g, b)
 
-    @classmethod
-    def from_tuple(cls, color_tuple: Tuple[int, int, int]) -> 'Color':
-        return cls(*color_tuple)
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def from_tuple(color_tuple: Tuple[int, int, int]) -> 'Color':
+        return Color(*color_tuple)
 
-    @classmethod
-    def from_tuple_str(cls, color_tuple: str) -> 'Color':
-        match = re.fullmatch(cls.TUPLE_REGEX, color_tuple)
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def from_tuple_str(color_tuple: str) -> 'Color':
+        match = Color._TUPLE_PATTERN.fullmatch(color_tuple)
         if match:
             elements = match.groups()
-            return cls.from_tuple((int(elements[0]), int(elements[1]), int(elements[2])))
+            return Color.from_tuple((int(elements[0]), int(elements[1]), int(elements[2])))
         else:
             raise ValueError
 
+    def with_effect(self, effect: Optional['ColorEffects']) -> 'Color':
+        """ The shared variant of this color with the given effect (None: without effect) """
+        if effect == self.effect:
+            return self
+        return _variant(self.r, self.g, self.b, effect)
 
     @classproperty
     def random(cls) -> 'Color':
         return cls.from_rgb(random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
 
-    @classproperty
-    def white(cls) -> 'Color':
-        return cls.from_rgb(255, 255, 255)
-
-    @classproperty
-    def black(cls) -> 'Color':
-        return cls.from_rgb(0, 0, 0)
-
-    @classproperty
-    def blue(cls) -> 'Color':
-        return cls.from_rgb(0, 0, 255)
-
-    @classproperty
-    def red(cls) -> 'Color':
-        return cls.from_rgb(255, 0, 0)
-
-    @classproperty
-    def green(cls) -> 'Color':
-        return cls.from_rgb(0, 255, 0)
-
-    @classproperty
-    def yellow(cls) -> 'Color':
-        return cls.from_rgb(255, 255, 0)
-
-    @classproperty
-    def magenta(cls) -> 'Color':
-        return cls.from_rgb(255, 0, 255)
-
-    @classproperty
-    def cyan(cls) -> 'Color':
-        return cls.from_rgb(0, 255, 255)
-
-    @classproperty
-    def orange(cls) -> 'Color':
-        return cls.from_rgb(255, 128, 0)
-
     @classmethod
     def grey(cls, percent) -> 'Color':
         return cls.from_rgb(int(percent * 255 / 100), int(percent * 255 / 100), int(percent * 255 / 100))
@@ -96,30 +121,27 @@ class Color(object):
             raise ValueError(f'The brightness value must be between 0 and 255. Given value was {brightness}.')
 
         # Calculate the new color values based on the brightness
-        new_r = min(int((brightness / 255) * self.r), 255)
-        new_g = min(int((brightness / 255) * self.g), 255)
-        new_b = min(int((brightness / 255) * self.b), 255)
-
-        return Color(new_r, new_g, new_b)
-
-    def set_effect(self, effect: ColorEffects):
-        self._effect = effect
+        lut = brightness_lut(brightness)
+        return Color.from_tuple((lut[self.r], lut[self.g], lut[self.b]))
 
     def __add__(self, other: 'Color') -> 'Color':
-        return Color(
+        return Color.from_tuple((
             min(self.r + other.r, 255),
             min(self.g + other.g, 255),
             min(self.b + other.b, 255)
-        )
+        ))
 
     def __sub__(self, other: 'Color') -> 'Color':
-        return Color(
+        return Color.from_tuple((
             max(self.r - other.r, 0),
             max(self.g - other.g, 0),
             max(self.b - other.b, 0)
-        )
+        ))
 
     def __eq__(self, other: 'Color') -> bool:
+        # Der Effekt zählt nicht zum Farbwert
+        if not isinstance(other, Color):
+            return NotImplemented
         return self.r == other.r and self.g == other.g and self.b == other.b
 
     def __hash__(self) -> int:
@@ -139,14 +161,30 @@ class Color(object):
 
     @property
     def char(self) -> str:
-        return f'\033[38;2;{self.r};{self.g};{self.b}m■'
-
-    @property
-    def effect(self) -> str:
-        return self._effect
+        if self._char is None:
+            object.__setattr__(self, '_char', f'\033[38;2;{self.r};{self.g};{self.b}m■')
+        return self._char
 
     def __str__(self):
-        if self._effect:
-            return f'{self.tuple_str} {self._effect.name}'
+        if self.effect:
+            return f'{self.tuple_str} {self.effect.name}'
         else:
             return self.tuple_str
+
+
+@lru_cache(maxsize=1024)
+def _variant(r: int, g: int, b: int, effect: Optional[ColorEffects]) -> Color:
+    if effect is None:
+        return Color.from_tuple((r, g, b))
+    return Color(r, g, b, effect)
+
+
+Color.white = Color.from_tuple((255, 255, 255))
+Color.black = Color.from_tuple((0, 0, 0))
+Color.blue = Color.from_tuple((0, 0, 255))
+Color.red = Color.from_tuple((255, 0, 0))
+Color.green = Color.from_tuple((0, 255, 0))
+Color.yellow = Color.from_tuple((255, 255, 0))
+Color.magenta = Color.from_tuple((255, 0, 255))
+Color.cyan = Color.from_tuple((0, 255, 255))
+Color.orange = Color.from_tuple((255, 128, 0))
@@ -0,0 +1,83 @@
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    # Ohne NumPy rechnet der Controller weiter mit einzelnen Color-Objekten
+    np = None
+
+from .color import Color, ColorEffects, brightness_lut
+
+# Code 0 im Effekt-Array: kein Effekt
+_EFFECTS: Tuple[Optional[ColorEffects], ...] = (None, *ColorEffects)
+
+
+class ColorArray(object):
+    """
+    The colors of a strip as one (n, 3) uint8 array plus an array of effect codes, so that
+    brightness, add and sub are computed for the whole strip with a few NumPy operations.
+    The results match the Color methods exactly; arithmetic keeps the effects of the left operand.
+    """
+
+    __slots__ = ('rgb', 'effects')
+
+    def __init__(self, rgb: 'np.ndarray', effects: Optional['np.ndarray'] = None) -> None:
+        if np is None:
+            raise ModuleNotFoundError('ColorArray requires numpy')
+        self.rgb: np.ndarray = np.asarray(rgb, dtype=np.uint8).reshape(-1, 3)
+        self.effects: np.ndarray = (np.zeros(len(self.rgb), dtype=np.uint8) if effects is None
+                                    else np.asarray(effects, dtype=np.uint8))
+
+    @classmethod
+    def from_colors(cls, colors: Iterable[Color]) -> 'ColorArray':
+        colors = list(colors)
+        rgb = np.array([color.tuple for color in colors], dtype=np.uint8).reshape(-1, 3)
+        effects = np.array([_EFFECTS.index(color.effect) for color in colors], dtype=np.uint8)
+        return cls(rgb, effects)
+
+    @classmethod
+    def black(cls, n: int) -> 'ColorArray':
+        return cls(np.zeros((n, 3), dtype=np.uint8))
+
+    def to_colors(self) -> List[Color]:
+        return [Color.from_tuple(rgb).with_effect(_EFFECTS[effect])
+                for rgb, effect in zip(self.tuples(), self.effects.tolist())]
+
+    def tuples(self) -> List[Tuple[int, int, int]]:
+        """ The pixel values in the form the pixel backends expect """
+        return list(map(tuple, self.rgb.tolist()))
+
+    def mask(self, effect: Optional[ColorEffects]) -> 'np.ndarray':
+        return self.effects == _EFFECTS.index(effect)
+
+    def __len__(self) -> int:
+        return len(self.rgb)
+
+    def __getitem__(self, index) -> 'ColorArray':
+        return ColorArray(self.rgb[index], self.effects[index])
+
+    def __add__(self, other: 'ColorArray') -> 'ColorArray':
+        return ColorArray(np.minimum(self.rgb.astype(np.uint16) + other.rgb, 255), self.effects)
+
+    def __sub__(self, other: 'ColorArray') -> 'ColorArray':
+        return ColorArray(np.maximum(self.rgb.astype(np.int16) - other.rgb, 0), self.effects)
+
+    def adjust_brightness(self, brightness: int, where: Optional['np.ndarray'] = None) -> 'ColorArray':
+        """ Color.adjust_brightness for every pixel, or only for the pixels selected by the mask where """
+        if not (0 <= brightness <= 255):
+            raise ValueError(f'The brightness value must be between 0 and 255. Given value was {brightness}.')
+        scaled = self._lookup(brightness_lut(brightness))
+        if where is not None:
+            scaled = np.where(where[:, None], scaled, self.rgb)
+        return ColorArray(scaled, self.effects)
+
+    def apply_lut(self, lut: bytes) -> 'ColorArray':
+        """ Map every channel through a 256 entry table, e.g. gamma_lut() """
+        return ColorArray(self._lookup(lut), self.effects)
+
+    def _lookup(self, lut: bytes) -> 'np.ndarray':
+        return np.frombuffer(lut, dtype=np.uint8)[self.rgb]
+
+    def apply_effect(self, effect: ColorEffects, brightness: int) -> 'ColorArray':
+        """ Scale only the pixels carrying effect, the others stay unchanged """
+        return self.adjust_brightness(brightness, where=self.mask(effect))
@@ -1,4 +1,5 @@
-from typing import List
+import os
+from typing import Callable, Iterable, List, Optional, Tuple
 from threading import Lock
 import time
 import math
@@ -19,16 +20,61 @@ except NotImplementedError:
     except (ModuleNotFoundError, ImportError):
         from .consolepixel import ConsolePixel as Pixel
 
-from .models.color import Color, ColorEffects
+from .models.color import Color, apply_lut, gamma_lut
+from .effects import DEFAULT_EFFECTS, EffectEngine
+from .frame_cycle import FrameCycle
 from .status import STATUS
 
 
+class LedState(object):
+    """
+    Immutable input of a controller as published by the fetch side. Every change is a new
+    instance with a higher version; the renderer compares versions to see what is new.
+    """
+
+    __slots__ = ('version', 'leds', 'error', 'connection_error', 'overflow', 'init')
+
+    def __init__(self, version: int, leds: List[Color], error: bool = False, connection_error: bool = False,
+                 overflow: bool = False, init: bool = False) -> None:
+        set_field = object.__setattr__
+        set_field(self, 'version', version)
+        # Die Liste wird nach set_leds nicht mehr verändert
+        set_field(self, 'leds', leds)
+        set_field(self, 'error', error)
+        set_field(self, 'connection_error', connection_error)
+        set_field(self, 'overflow', overflow)
+        set_field(self, 'init', init)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f'LedState is immutable, cannot set {name}')
+
+    def replace(self, **changes) -> 'LedState':
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes, version=self.version + 1)
+        return LedState(**fields)
+
+
 class NeoPixelController(object):
+    """
+    Drives one stripe. Setters publish a new LedState by swapping one reference; update() runs in
+    the render loop, reads the latest state at the start of the frame and owns everything that
+    is written to the pixels, so neither side waits for the other (in particular not for show()).
+    """
 
     PULSING_PERIOD: float = 2.0
+    INIT_RANDOM_TIME: float = 0.2
+    INIT_SWEEP_TIME: float = 0.5
+    # Abtastrate des vorberechneten Pulsier-Zyklus, feiner als der Render-Loop
+    FRAME_CYCLE_RATE: int = 50
 
-    def __init__(self, led_count: int, gpio_pin: int, name: str, offset: float = 0) -> None:
-        self._lock: Lock = Lock()
+    def __init__(self, led_count: int, gpio_pin: int, name: str, offset: float = 0,
+                 init_animation: bool = True, gamma: Optional[float] = None,
+                 frame_cycle: Optional[bool] = None, effects: Optional[Iterable[str]] = None) -> None:
+        # Nur Schreiber untereinander, der Render-Loop nimmt ihn nie
+        self._write_lock: Lock = Lock()
+        # Gamma-Korrektur der Ausgabe für WS2812 (z.B. 2.8), ohne LED_GAMMA unverändert
+        gamma = float(os.environ.get('LED_GAMMA') or 1) if gamma is None else gamma
+        self._gamma: Optional[bytes] = gamma_lut(gamma) if gamma > 0 and gamma != 1 else None
         self._pixels: Pixel = Pixel(gpio_pin, led_count, name)
         self.name: str = name
         self._cycle_time_offset: float = offset
@@ -40,13 +86,31 @@ class NeoPixelController(object):
         self._pixels.fill(Color.black.tuple)
         self._pixels.show()
         self._pixel_array: List[Color] = [Color.black] * led_count
-        self._led_array: List[Color] = [Color.black] * led_count
-        self._status: STATUS = STATUS.INIT
-        self._connection_error: bool = False
-        self._error: bool = False
+        self._state: LedState = LedState(0, [Color.black] * led_count, init=init_animation)
+        # Ab hier gehört alles dem Render-Loop: der zuletzt gezeichnete Zustand und die Pixel
+        self._frame_state: LedState = self._state
+        self._led_array: List[Color] = self._state.leds
         self._overflow: bool = False
-        self._init()
-        self._status = STATUS.WORKING
+        # Die Init-Animation wird von update() gezeichnet und blockiert weder den Start noch set_leds()
+        self._status: STATUS = STATUS.INIT if init_animation else STATUS.WORKING
+        self._init_started: Optional[float] = None
+        self._init_random_step: int = -1
+        self._init_random_frame: List[Color] = []
+        # Zuletzt in die Pixel geschriebenes Layout
+        self._synced_leds: Optional[List[Color]] = None
+        # Effekt-Ebenen in dieser Reihenfolge (LED_EFFECTS, z.B. overdue,status,overflow)
+        if effects is None:
+            effects = os.environ.get('LED_EFFECTS')
+            effects = [name.strip() for name in effects.split(',')] if effects else DEFAULT_EFFECTS
+        self._effects: EffectEngine = EffectEngine(effects, self.PULSING_PERIOD)
+        self._transient: bool = False
+        # Wird bei jeder Zustandsänderung aufgerufen, damit ein ruhender Render-Loop aufwacht
+        self.on_change: Optional[Callable[[], None]] = None
+        # Pulsieren aus einem vorberechneten Zyklus abspielen (LED_FRAME_CYCLE=0 rechnet jeden Frame neu)
+        self._use_frame_cycle: bool = (os.environ.get('LED_FRAME_CYCLE', '1') != '0'
+                                       if frame_cycle is None else frame_cycle)
+        self._frame_cycle: Optional[FrameCycle] = None
+        self._frame_index: Optional[int] = None
 
     def __del__(self) -> None:
         self.clear()
@@ -55,103 +119,166 @@ class NeoPixelController(object):
         self._pixels.fill(Color.black.tuple)
         self._pixels.show()
 
-    def _init(self) -> None:
-        with self._lock:
-            for _ in range(2):
-                for i in range(self._pixels.n):
-                    self._led_array[i] = Color.random - Color.grey(50)
-                self._update()
-                time.sleep(0.1)
-            for i in range(self._pixels.n - 1):
-                self._led_array = [Color.black] * self._pixels.n
-                self._led_array[i] = Color.white
-                self._update()
-                time.sleep(0.5 / self._pixels.n)
-            for i in reversed(range(self._pixels.n)):
-                self._led_array = [Color.black] * self._pixels.n
-                self._led_array[i] = Color.white
-                self._update()
-                time.sleep(0.5 / self._pixels.n)
-            self._led_array = [Color.black] * self._pixels.n
-            self._update()
+    def _init_frame(self, elapsed: float) -> Optional[List[Color]]:
+        # Frame der Init-Animation nach elapsed Sekunden, None wenn sie fertig ist
+        n = self._pixels.n
+        if elapsed < self.INIT_RANDOM_TIME:
+            step = int(elapsed / self.INIT_RANDOM_TIME * 2)
+            if step != self._init_random_step:
+                self._init_random_step = step
+                self._init_random_frame = [Color.random - Color.grey(50) for _ in range(n)]
+            return self._init_random_frame
+        elapsed -= self.INIT_RANDOM_TIME
+        if elapsed < 2 * self.INIT_SWEEP_TIME:
+            # Weisser Punkt läuft hoch und wieder runter
+            position = int(elapsed / self.INIT_SWEEP_TIME * (n - 1))
+            if position >= n - 1:
+                position = max(2 * (n - 1) - position, 0)
+            frame = [Color.black] * n
+            frame[position] = Color.white
+            return frame
+        return None
+
+    def publish(self, leds: Optional[List[Color]] = None, overflow: Optional[bool] = None,
+                error: Optional[bool] = None, connection_error: Optional[bool] = None) -> None:
+        """ Set several values as one state version, so a frame never shows only part of them """
+        changes = {}
+        if leds is not None:
+            # Echte Daten beenden die Init-Animation
+            changes.update(leds=leds, init=False)
+        for name, value in (('overflow', overflow), ('error', error), ('connection_error', connection_error)):
+            if value is not None:
+                changes[name] = bool(value)
+        if changes:
+            self._publish(**changes)
 
     def set_leds(self, leds: List[Color]) -> None:
-        with self._lock:
-            self._led_array = leds
+        # Echte Daten beenden die Init-Animation
+        self._publish(leds=leds, init=False)
 
     def set_connection_error(self, status: bool) -> None:
-        with self._lock:
-            self._connection_error = status
+        self._publish(connection_error=bool(status))
 
     def set_error(self, status: bool) -> None:
-        with self._lock:
-            self._error = status
+        self._publish(error=bool(status))
 
     def set_overflow(self, status: bool) -> None:
-        with self._lock:
-            self._overflow = status
+        self._publish(overflow=bool(status))
+
+    def _publish(self, **changes) -> None:
+        """ Swap in a new state if anything changed and wake the render loop """
+        with self._write_lock:
+            state = self._state
+            if all(getattr(state, name) is value for name, value in changes.items()):
+                return
+            self._state = state.replace(**changes)
+        if self.on_change is not None:
+            self.on_change()
+
+    def idle_time(self) -> float:
+        """ Seconds the output stays unchanged unless the state changes, 0 while anything is animating """
+        if self._status == STATUS.INIT or self._state is not self._frame_state:
+            return 0
+        if self._transient:
+            return 0
+        phase = self._cycle_time()
+        if self._use_frame_cycle:
+            # Der Zyklus kennt die Frames, in denen sich nichts ändert
+            if self._frame_cycle is None:
+                return 0
+            return self._frame_cycle.idle_time(phase)
+        return self._effects.idle_time(phase, self._effects.since())
 
     def update(self) -> None:
-        if self._status == STATUS.INIT:
+        """ Render one frame, called by one render thread at a time """
+        # Einmal pro Frame den neuesten Zustand übernehmen, er ändert sich danach nicht mehr
+        state = self._state
+        if self._status == STATUS.INIT and state.init:
+            # Die Animation startet mit dem ersten Frame des Render-Loops
+            if self._init_started is None:
+                self._init_started = time.monotonic()
+            frame = self._init_frame(time.monotonic() - self._init_started)
+            if frame is not None:
+                self._show_frame(frame)
+                return
+        self._finish_init()
+        self._update(state)
+
+    def _finish_init(self) -> None:
+        if self._status != STATUS.INIT:
             return
-        with self._lock:
-            self._update()
+        self._status = STATUS.WORKING
+        # Die Animation hat direkt in die Pixel geschrieben, alles neu zeichnen
+        self._pixels.fill(Color.black.tuple)
+        self._pixel_array = [Color.black] * self._pixels.n
+        self._synced_leds = None
 
-    def _update(self) -> None:
+    def _show_frame(self, frame: List[Color]) -> None:
+        for index, color in enumerate(frame):
+            self._pixels[index] = self._output(color.tuple)
+        self._pixels.show()
+
+    def _sync_leds(self) -> bool:
+        """ Write a new LED layout to the pixels, returns True if a pixel changed """
+        # set_leds bekommt für jedes neue Layout eine neue Liste, sonst ist nichts zu tun
+        if self._synced_leds is self._led_array:
+            return False
         needs_update = False
 
         # update LED array to pixel array
+        # Farben sind gemeinsame, unveränderliche Instanzen: die Identität erkennt auch einen geänderten Effekt
         for index, status_color in enumerate(self._led_array):
-            if self._pixel_array[index] != status_color:
+            if self._pixel_array[index] is not status_color:
                 self._pixel_array[index] = status_color
-                self._pixels[index] = status_color.tuple
+                self._pixels[index] = self._output(status_color.tuple)
                 needs_update = True
 
-        # update status
-        if self._error:
-            self._status = STATUS.ERROR
-        elif self._connection_error:
-            self._status = STATUS.CONNECTION_ERROR
-        else:
-            self._status = STATUS.WORKING
-
-        # update status LED (index 0)
-        if self._status == STATUS.INIT:
-            status_color = Color.black
-        elif self._status == STATUS.WORKING:
-            status_color = Color.white
-        elif self._status == STATUS.CONNECTION_ERROR:
-            status_color = Color.orange
-        elif self._status == STATUS.ERROR:
-            status_color = Color.red
+        self._synced_leds = self._led_array
+        return needs_update
+
+    def _update(self, state: LedState) -> None:
+        self._frame_state = state
+        self._led_array = state.leds
+        self._overflow = state.overflow
+        needs_update = self._sync_leds()
+
+        self._status = self._next_status(state)
+
+        # Effekt-Ebenen neu wählen, wenn sich Layout, Status oder Overflow geändert haben
+        if not self._effects.is_prepared(self._led_array, self._status, self._overflow):
+            self._effects.prepare(self._led_array, self._status, self._overflow)
+            self._frame_cycle = None
+
+        cycle_time = self._cycle_time()
+        since = self._effects.since()
+        transient = self._effects.transient(since)
+        # Solange ein einmaliger Effekt läuft (und für einen letzten Frame danach) jeden Frame rechnen
+        if self._use_frame_cycle and not transient and not self._transient:
+            # Vorberechneten Frame des Zyklus abspielen
+            if self._frame_cycle is None:
+                self._frame_cycle = FrameCycle.build(self.PULSING_PERIOD, self.FRAME_CYCLE_RATE, self._animated)
+                self._frame_index = None
+            index = self._frame_cycle.index(cycle_time)
+            if self._frame_index is not None:
+                # Nur die Unterschiede zum zuletzt gezeigten Frame schreiben
+                if index != self._frame_index:
+                    for i, new_color in self._frame_cycle.changes(index, self._frame_index):
+                        self._pixels[i] = new_color
+                        needs_update = True
+                    self._frame_index = index
+                changes = []
+            else:
+                changes = self._frame_cycle.changes(index, None)
+                self._frame_index = index
         else:
-            status_color = Color.black
-
-        cycle_time = time.time() % self.PULSING_PERIOD + self._cycle_time_offset
-        pulsing_brightness = int(math.sin(cycle_time * self.PULSING_PERIOD * math.pi / 2) * 255)
-        color_status = status_color.adjust_brightness(max(pulsing_brightness, 0))
-        new_status_color = (color_status + self._led_array[0]).tuple
-        if self._pixels[0] != new_status_color:
-            self._pixels[0] = new_status_color
-            needs_update = True
-
-        if self._overflow:
-            color_overflow = Color.white.adjust_brightness(max(pulsing_brightness, 0))
-            new_overflow_color = (color_overflow + self._led_array[-1]).tuple
-            if self._pixels[-1] != new_overflow_color:
-                self._pixels[-1] = new_overflow_color
-                needs_update = True
+            changes = self._animated(cycle_time, since)
+            self._frame_index = None
+        self._transient = transient
 
-        # handle pixel effects
-        pulsing_brightness_overdue = min(max(int(math.sin(cycle_time * self.PULSING_PERIOD*2 * math.pi / 2) * 128)+192, 0), 255)
-        for i, pixel in enumerate(self._pixel_array):
-            if i == 0:
-                continue  # skip status pixel
-            if pixel.effect == ColorEffects.overdue:
-                new_color = self._led_array[i].adjust_brightness(pulsing_brightness_overdue).tuple
-                if self._pixels[i] != new_color:
-                    self._pixels[i] = new_color
-                    needs_update = True
+        for i, new_color in changes:
+            if self._pixels[i] != new_color:
+                self._pixels[i] = new_color
+                needs_update = True
 
         # Only call show() if something actually changed
         if needs_update:
@@ -161,14 +288,47 @@ class NeoPixelController(object):
                 import logging
                 logging.error(f"Error updating pixels for {self.name}: {e}")
 
+    @staticmethod
+    def _next_status(state: LedState) -> STATUS:
+        # update status
+        if state.error:
+            return STATUS.ERROR
+        elif state.connection_error:
+            return STATUS.CONNECTION_ERROR
+        else:
+            return STATUS.WORKING
+
+    def _animated(self, cycle_time: float, since: float = math.inf) -> List[Tuple[int, Tuple[int, int, int]]]:
+        """ Index and output value of every animated pixel at cycle_time """
+        pixels = self._effects.frame(cycle_time, since)
+        if self._gamma is None:
+            return pixels
+        return [(i, apply_lut(value, self._gamma)) for i, value in pixels]
+
+    def _cycle_time(self) -> float:
+        return time.monotonic() % self.PULSING_PERIOD + self._cycle_time_offset
+
+    def _output(self, rgb: Tuple[int, int, int]) -> Tuple[int, int, int]:
+        """ The value written to a pixel """
+        return rgb if self._gamma is None else apply_lut(rgb, self._gamma)
+
     @property
     def leds(self) -> List[Color]:
-        return self._led_array
+        return self._state.leds
+
+    @property
+    def version(self) -> int:
+        return self._state.version
 
     @property
     def status(self) -> STATUS:
         return self._status
 
+    @property
+    def effects(self) -> EffectEngine:
+        return self._effects
+
     @property
     def overflow(self) -> bool:
-        return self._overflow
+        return self._state.overflow
+
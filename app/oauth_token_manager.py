@@ -0,0 +1,145 @@
+import time
+import logging
+from concurrent.futures import Future
+from threading import Lock, Timer
+from typing import Dict, Optional, Tuple
+
+from requests.exceptions import ConnectionError, Timeout
+from requests.auth import HTTPBasicAuth
+from oauthlib.oauth2 import BackendApplicationClient
+from requests_oauthlib import OAuth2Session
+
+
+class OAuthTokenManager(object):
+    """
+    Caches the client credentials token of one OAuth client until shortly before it expires
+    and refreshes it in the background. One instance is shared per (token_url, client_id).
+    Only one token request runs at a time and no lock is held during it: callers without a
+    valid token wait for the running request, callers with a valid token are not blocked.
+    """
+
+    EXPIRY_MARGIN: int = 30  # Token gilt 30s vor Ablauf als abgelaufen
+    REFRESH_AHEAD: int = 120  # Hintergrund-Refresh 2min vor Ablauf
+    DEFAULT_EXPIRES_IN: int = 5*60  # falls der Server kein expires_in liefert
+    TIMEOUT: Tuple[float, float] = (5, 30)  # (connect, read), wie JiraClient
+
+    _instances: Dict[Tuple[str, str], 'OAuthTokenManager'] = {}
+    _instances_lock: Lock = Lock()
+
+    def __init__(self, token_url: str, client_id: str, client_secret: str, scope: str,
+                 timeout: Optional[Tuple[float, float]] = None) -> None:
+        self.logger = logging.getLogger(f'{__name__}.{client_id}')
+        self._token_url: str = token_url
+        self._client_id: str = client_id
+        self._client_secret: str = client_secret
+        self.scope: str = scope
+        self.timeout: Tuple[float, float] = timeout or self.TIMEOUT
+
+        self._lock: Lock = Lock()
+        self._token: Optional[dict] = None
+        self._expires_at: float = 0
+        self._expiry_margin: float = self.EXPIRY_MARGIN
+        self._refresh_timer: Optional[Timer] = None
+        self._fetch: Optional[Future] = None
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.refreshes: int = 0
+
+    @classmethod
+    def get_instance(cls, token_url: str, client_id: str, client_secret: str, scope: str,
+                     timeout: Optional[Tuple[float, float]] = None) -> 'OAuthTokenManager':
+        with cls._instances_lock:
+            key = (token_url, client_id)
+            if key not in cls._instances:
+                cls._instances[key] = cls(token_url, client_id, client_secret, scope, timeout)
+            return cls._instances[key]
+
+    @classmethod
+    def get_info_dict(cls) -> list:
+        with cls._instances_lock:
+            return [manager.stats for manager in cls._instances.values()]
+
+    def get_token(self) -> dict:
+        with self._lock:
+            if self._token is not None and time.time() < self._expires_at - self._expiry_margin:
+                self.hits += 1
+                return self._token
+            self.misses += 1
+        return self._fetch_token()
+
+    def invalidate(self) -> None:
+        """ Drop the cached token, e.g. after the API answered with 401 """
+        with self._lock:
+            self._token = None
+
+    def _fetch_token(self) -> dict:
+        # Läuft bereits ein Token-Request, wird auf dessen Ergebnis gewartet statt einen zweiten zu senden
+        with self._lock:
+            running = self._fetch
+            if running is None:
+                fetch = self._fetch = Future()
+        if running is not None:
+            return running.result()
+
+        try:
+            token = self._request_token()
+        except Exception as e:
+            fetch.set_exception(e)
+            raise
+        else:
+            fetch.set_result(token)
+            return token
+        finally:
+            with self._lock:
+                self._fetch = None
+
+    def _request_token(self) -> dict:
+        client = BackendApplicationClient(client_id=self._client_id)
+        oauth = OAuth2Session(client=client)
+        try:
+            token = oauth.fetch_token(
+                token_url=self._token_url,
+                auth=HTTPBasicAuth(self._client_id, self._client_secret),
+                scope=self.scope,
+                timeout=self.timeout
+            )
+        except (ConnectionError, Timeout):
+            self.logger.debug(f'Could not get OAuth token for client_id: {self._client_id}')
+            raise ConnectionError('Could not get OAuth token.')
+
+        expires_in = float(token.get('expires_in') or self.DEFAULT_EXPIRES_IN)
+        with self._lock:
+            self._token = token
+            self._expires_at = time.time() + expires_in
+            # Kurzlebige Tokens sollen trotzdem die Hälfte ihrer Laufzeit gültig sein
+            self._expiry_margin = min(self.EXPIRY_MARGIN, expires_in / 2)
+        self._schedule_refresh(expires_in)
+        return token
+
+    def _schedule_refresh(self, expires_in: float) -> None:
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+        self._refresh_timer = Timer(max(expires_in - self.REFRESH_AHEAD, self._expiry_margin), self._refresh)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _refresh(self) -> None:
+        with self._lock:
+            self.refreshes += 1
+        try:
+            self._fetch_token()
+        except Exception as e:
+            # Beim nächsten get_token() wird es erneut versucht
+            self.logger.warning(f'Background refresh of OAuth token failed: {e}')
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'token_url': self._token_url,
+            'client_id': self._client_id,
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'expires_in': max(int(self._expires_at - time.time()), 0) if self._token else None,
+        }
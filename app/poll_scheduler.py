@@ -0,0 +1,124 @@
+import time
+import random
+from collections import deque
+from datetime import datetime
+from threading import Lock
+from typing import Callable, Deque, Dict, Iterable, List, Optional
+
+
+class PollState(object):
+
+    def __init__(self, name: str, interval: float, next_run: float) -> None:
+        self.name: str = name
+        self.interval: float = interval
+        self.next_run: float = next_run
+        self.failures: int = 0
+        self.running: bool = False
+        self.last_run: float = 0
+        self.webhook_until: float = 0
+        self.latencies: Deque[float] = deque(maxlen=10)
+
+
+class AdaptivePollScheduler(object):
+    """
+    Decides per stripe when the next poll is due. The interval shrinks while the ticket counts
+    change and grows while they are stable, connection errors back off exponentially and every
+    next run gets some jitter so the stripes don't hit Jira at the same moment. A stripe that is
+    still running is never due again, so overlapping runs are coalesced into one. Stripes kept
+    up to date by webhooks are only reconciled every RECONCILE_INTERVAL.
+    """
+
+    MIN_INTERVAL: float = 30
+    DEFAULT_INTERVAL: float = 60
+    MAX_INTERVAL: float = 5*60
+    MAX_BACKOFF: float = 15*60
+    SHRINK_FACTOR: float = 0.5
+    GROW_FACTOR: float = 1.25
+    JITTER: float = 0.1  # +-10% vom Intervall
+    # Solange Webhooks den Stripe aktuell halten, braucht es nur noch einen langsamen Abgleich
+    RECONCILE_INTERVAL: float = 15*60
+    WEBHOOK_TIMEOUT: float = 30*60
+    TRIGGER_SPACING: float = 10  # Mindestabstand von durch Webhooks ausgelösten Polls
+
+    def __init__(self, names: Iterable[str], now: Optional[float] = None,
+                 rng: Callable[[], float] = random.random) -> None:
+        self._lock: Lock = Lock()
+        self._rng: Callable[[], float] = rng
+        now = time.time() if now is None else now
+        # Erste Läufe über das erste Intervall verteilen
+        self._states: Dict[str, PollState] = {
+            name: PollState(name, self.DEFAULT_INTERVAL, now + self._rng() * self.DEFAULT_INTERVAL)
+            for name in names
+        }
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """ Names of the stripes due for a poll, they are marked as running """
+        now = time.time() if now is None else now
+        with self._lock:
+            names = [state.name for state in self._states.values() if not state.running and state.next_run <= now]
+            for name in names:
+                self._states[name].running = True
+            return names
+
+    def claim(self, names: Iterable[str]) -> List[str]:
+        """ Mark the stripes as running regardless of their schedule, returns those not already running """
+        with self._lock:
+            names = [name for name in names if not self._states[name].running]
+            for name in names:
+                self._states[name].running = True
+            return names
+
+    def record(self, name: str, ok: bool, changed: bool, latency: float, now: Optional[float] = None) -> None:
+        """ Record the result of a poll and schedule the next one """
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._states[name]
+            state.running = False
+            state.last_run = now
+            state.latencies.append(latency)
+            if not ok:
+                state.failures += 1
+                delay = min(state.interval * 2 ** state.failures, self.MAX_BACKOFF)
+            elif state.webhook_until > now:
+                state.failures = 0
+                delay = self.RECONCILE_INTERVAL
+            else:
+                state.failures = 0
+                factor = self.SHRINK_FACTOR if changed else self.GROW_FACTOR
+                state.interval = min(max(state.interval * factor, self.MIN_INTERVAL), self.MAX_INTERVAL)
+                delay = state.interval
+            state.next_run = now + delay * (1 + self.JITTER * (2 * self._rng() - 1))
+
+    def webhook_applied(self, name: str, now: Optional[float] = None) -> None:
+        """ Webhooks keep the stripe up to date, poll it only at the reconcile interval """
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._states[name]
+            if state.webhook_until <= now:
+                state.next_run = max(state.next_run, now + self.RECONCILE_INTERVAL)
+            state.webhook_until = now + self.WEBHOOK_TIMEOUT
+
+    def trigger(self, name: str, now: Optional[float] = None) -> None:
+        """ Poll the stripe as soon as possible, but not more often than every TRIGGER_SPACING seconds """
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._states[name]
+            state.next_run = min(state.next_run, max(now, state.last_run + self.TRIGGER_SPACING))
+
+    def interval(self, name: str) -> float:
+        return self._states[name].interval
+
+    def next_run(self, name: str) -> float:
+        return self._states[name].next_run
+
+    def get_info_dict(self, name: str) -> dict:
+        with self._lock:
+            state = self._states[name]
+            return {
+                'interval': round(state.interval, 1),
+                'next_run': datetime.fromtimestamp(state.next_run).isoformat(timespec='seconds'),
+                'failures': state.failures,
+                'running': state.running,
+                'webhook': state.webhook_until > time.time(),
+                'latencies_ms': [round(latency * 1000) for latency in state.latencies],
+            }
@@ -0,0 +1,200 @@
+import os
+import math
+import time
+import bisect
+import logging
+from threading import Event, Lock, Thread
+from typing import Callable, List, Optional, Tuple
+
+
+class Histogram(object):
+    """ Counts durations in fixed millisecond buckets, the last bucket takes everything above """
+
+    BOUNDS_MS: List[float] = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+    def __init__(self) -> None:
+        self._lock: Lock = Lock()
+        self.counts: List[int] = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count: int = 0
+        self.max: float = 0
+
+    def record(self, seconds: float) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+            self.count += 1
+            self.max = max(self.max, ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """ Upper bound in ms of the bucket holding the q-th value (the maximum for the last bucket) """
+        with self._lock:
+            if not self.count:
+                return None
+            rank = math.ceil(q * self.count)
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    bound = self.BOUNDS_MS[index] if index < len(self.BOUNDS_MS) else self.max
+                    return round(min(bound, self.max), 1)
+            return round(self.max, 1)
+
+    def get_info_dict(self) -> dict:
+        labels = [f'<={bound:g}' for bound in self.BOUNDS_MS] + [f'>{self.BOUNDS_MS[-1]:g}']
+        return {
+            'count': self.count,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': round(self.max, 1),
+            'buckets': {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+
+class RenderLoop(object):
+    """
+    Owns the frame clock of all stripes. Frames are due on a fixed grid of monotonic deadlines
+    (start + n / fps), so late wake-ups do not shift the following frames. When a frame overruns
+    the deadlines it missed are dropped instead of being rendered back to back. The same tick()
+    is driven by a thread (hardware, console) or by single-shot Qt timers in the GUI thread.
+
+    In idle mode idle() tells after every frame how long the output stays unchanged; the loop
+    skips the frames in that time and wake() brings the next frame forward on a state change.
+    """
+
+    DEFAULT_FPS: float = 10
+    MODES: Tuple[str, ...] = ('idle', 'fixed')
+    # Auch ohne Benachrichtigung spätestens nach so vielen Sekunden neu zeichnen (Qt kann wake() nicht sehen)
+    MAX_IDLE: float = 1.0
+
+    def __init__(self, render: Callable[[], None], fps: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, idle: Optional[Callable[[], float]] = None,
+                 mode: Optional[str] = None) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._render: Callable[[], None] = render
+        self.fps: float = fps or float(os.environ.get('LED_FPS') or self.DEFAULT_FPS)
+        self.period: float = 1 / self.fps
+        self._clock: Callable[[], float] = clock
+        self.mode: str = mode or os.environ.get('LED_RENDER_MODE') or 'idle'
+        if self.mode not in self.MODES:
+            raise ValueError(f'Unknown render mode {self.mode}, expected one of {self.MODES}')
+        self._idle: Optional[Callable[[], float]] = idle if self.mode == 'idle' else None
+        self._lock: Lock = Lock()
+        self._wake: Event = Event()
+        self._woken: bool = False
+        # Deadline n liegt bei origin + n * period, ohne aufsummierte Rundungsfehler
+        self._origin: float = clock()
+        self._slot: int = 0
+        self._stopped: Event = Event()
+        self._thread: Optional[Thread] = None
+        self.frames: int = 0
+        self.dropped: int = 0
+        self.overruns: int = 0
+        self.errors: int = 0
+        self.wakeups: int = 0
+        self.idle_skipped: int = 0
+        # Dauer von render() und Verspätung des Frame-Starts gegenüber der Deadline
+        self.frame_time: Histogram = Histogram()
+        self.jitter: Histogram = Histogram()
+
+    def tick(self, now: Optional[float] = None) -> Optional[float]:
+        """ Render the frame if it is due, returns the seconds until the next one (None when stopped) """
+        if self._stopped.is_set():
+            return None
+        now = self._clock() if now is None else now
+        self.wakeups += 1
+        deadline = self._deadline
+        if now < deadline:
+            return deadline - now
+        self.jitter.record(now - deadline)
+        try:
+            self._render()
+        except Exception as e:
+            self.errors += 1
+            self.logger.error(f'Render loop frame failed: {e}', exc_info=True)
+        end = self._clock()
+        self.frame_time.record(end - now)
+        self.frames += 1
+        if end - now > self.period:
+            self.overruns += 1
+        # Nächste Deadline auf dem Raster, verpasste Frames werden ausgelassen
+        missed = int((end - deadline) // self.period)
+        self.dropped += missed
+        idle = min(self._idle(), self.MAX_IDLE) if self._idle is not None else 0
+        with self._lock:
+            # Frames, die nichts ändern würden, überspringen (ausser wake() kam während des Frames)
+            skip = 0 if self._woken else max(math.ceil((end + idle - deadline) / self.period) - missed - 1, 0)
+            self._woken = False
+            self.idle_skipped += skip
+            self._slot += missed + 1 + skip
+            return max(self._deadline - end, 0)
+
+    def wake(self) -> None:
+        """ The output changes: render the next frame on the grid instead of sleeping until the idle end """
+        if self._idle is None:
+            return
+        with self._lock:
+            now = self._clock()
+            self._slot = min(self._slot, max(math.ceil((now - self._origin) / self.period), 0))
+            self._woken = True
+        self._wake.set()
+
+    def start(self) -> 'RenderLoop':
+        """ Render in a background thread """
+        self._reset()
+        self._thread = Thread(target=self._run, name='render-loop', daemon=True)
+        self._thread.start()
+        return self
+
+    def start_qt(self) -> 'RenderLoop':
+        """ Render in the Qt GUI thread, every frame schedules the next with a single-shot timer """
+        from PySide6.QtCore import Qt, QTimer
+
+        def frame():
+            delay = self.tick()
+            if delay is not None:
+                QTimer.singleShot(math.ceil(delay * 1000), Qt.TimerType.PreciseTimer, frame)
+
+        self._reset()
+        frame()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    @property
+    def _deadline(self) -> float:
+        return self._origin + self._slot * self.period
+
+    def _reset(self) -> None:
+        self._stopped.clear()
+        self._origin = self._clock()
+        self._slot = 0
+        self._woken = False
+
+    def _run(self) -> None:
+        while True:
+            delay = self.tick()
+            if delay is None:
+                return
+            if delay > 0:
+                # stop() und wake() wecken den Thread sofort
+                self._wake.wait(delay)
+                self._wake.clear()
+
+    def get_info_dict(self) -> dict:
+        return {
+            'fps': self.fps,
+            'mode': self.mode,
+            'frames': self.frames,
+            'wakeups': self.wakeups,
+            'idle_skipped': self.idle_skipped,
+            'dropped': self.dropped,
+            'overruns': self.overruns,
+            'errors': self.errors,
+            'frame_time': self.frame_time.get_info_dict(),
+            'jitter': self.jitter.get_info_dict(),
+        }
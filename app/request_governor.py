@@ -0,0 +1,216 @@
+import os
+import time
+import logging
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Callable, Mapping, Optional
+
+from .exceptions import HostUnavailable
+
+
+class TokenBucket(object):
+    """ Token bucket with an adjustable rate and a pause (e.g. from Retry-After) """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock: Callable[[], float] = clock
+        self.rate: float = rate
+        self.burst: float = burst
+        self._tokens: float = burst
+        self._updated: float = clock()
+        self.paused_until: float = 0
+
+    def reserve(self) -> float:
+        """ Take a token, returns how many seconds the caller has to wait before using it """
+        now = self._clock()
+        self._tokens = min(self._tokens + (now - self._updated) * self.rate, self.burst)
+        self._updated = now
+        self._tokens -= 1
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        return max(wait, self.paused_until - now)
+
+    def refund(self) -> None:
+        """ Return a reserved token that was not used """
+        self._tokens = min(self._tokens + 1, self.burst)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, self._clock() + seconds)
+
+
+class CircuitBreaker(object):
+    """ Opens after consecutive failures, after reset_timeout a single probe request may pass (half-open) """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, reset_timeout: float,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock: Callable[[], float] = clock
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.state: str = self.CLOSED
+        self.failures: int = 0
+        self.opened_at: float = 0
+        self._probing: bool = False
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            # Nur ein Probe-Request gleichzeitig
+            if self._probing:
+                return False
+            self._probing = True
+        return self.state != self.OPEN
+
+    def release(self) -> None:
+        """ The allowed request was not sent, let the next one probe """
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = self._clock()
+
+
+class RequestGovernor(object):
+    """
+    Admission control for all requests to one Jira host: a token bucket limits the request rate
+    (halved on 429, slowly raised again while requests succeed), Retry-After and exhausted
+    X-RateLimit-* headers pause the host, and a circuit breaker fails fast while it is down.
+    """
+
+    RATE: float = 10  # Requests pro Sekunde
+    BURST: float = 10
+    MIN_RATE: float = 0.5
+    RATE_STEP: float = 0.1  # additive Erhöhung pro erfolgreichem Request
+    MAX_WAIT: float = 30  # länger wird nicht gewartet, der Request schlägt fehl
+    FAILURE_THRESHOLD: int = 5
+    RESET_TIMEOUT: float = 30
+    DEFAULT_RETRY_AFTER: float = 10
+
+    def __init__(self, host: str, rate: Optional[float] = None, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep) -> None:
+        self.logger = logging.getLogger(f'{__name__}.{host}')
+        self.host: str = host
+        self._lock: Lock = Lock()
+        self._clock: Callable[[], float] = clock
+        self._sleep: Callable[[float], None] = sleep
+        self.max_rate: float = rate or float(os.environ.get('JIRA_RATE_LIMIT') or self.RATE)
+        self._bucket: TokenBucket = TokenBucket(self.max_rate, burst or float(os.environ.get('JIRA_BURST')
+                                                                              or self.BURST), clock)
+        self._breaker: CircuitBreaker = CircuitBreaker(self.FAILURE_THRESHOLD, self.RESET_TIMEOUT, clock)
+        self.throttled: int = 0
+        self.rejected: int = 0
+        self.waited: float = 0
+        self.rate_limit_remaining: Optional[int] = None
+
+    def acquire(self) -> None:
+        """ Wait for a request slot, raises HostUnavailable if the host is unavailable or the wait too long """
+        with self._lock:
+            if not self._breaker.allow():
+                self.rejected += 1
+                raise HostUnavailable(f'Circuit breaker for {self.host} is open')
+            wait = self._bucket.reserve()
+            if wait > self.MAX_WAIT:
+                # Der Request findet nicht statt
+                self._bucket.refund()
+                self._breaker.release()
+                self.rejected += 1
+                raise HostUnavailable(f'Rate limit for {self.host}: next request in {wait:.0f}s')
+            self.waited += wait
+        if wait > 0:
+            self._sleep(wait)
+
+    def try_acquire(self) -> bool:
+        """ Take a request slot only if it is free right now (for optional requests such as hedges) """
+        with self._lock:
+            if self._breaker.state != CircuitBreaker.CLOSED:
+                return False
+            if self._bucket.reserve() > 0:
+                self._bucket.refund()
+                return False
+            return True
+
+    def record_response(self, status_code: int, headers: Mapping[str, str]) -> None:
+        with self._lock:
+            self._apply_rate_limit_headers(headers)
+            if status_code == 429 or (status_code == 503 and 'Retry-After' in headers):
+                self.throttled += 1
+                retry_after = self._retry_after(headers)
+                self._bucket.pause(retry_after)
+                self._bucket.rate = max(self._bucket.rate / 2, self.MIN_RATE)
+                # Drosselung ist kein Ausfall, der Circuit Breaker bleibt unverändert
+                self._breaker.release()
+                self.logger.warning(f'Throttled by {self.host} ({status_code}), pausing {retry_after:.0f}s, '
+                                    f'rate {self._bucket.rate:.1f}/s')
+            elif status_code >= 500:
+                self._breaker.record_failure()
+            else:
+                self._breaker.record_success()
+                self._bucket.rate = min(self._bucket.rate + self.RATE_STEP, self.max_rate)
+
+    def record_failure(self) -> None:
+        """ The request failed without a response (connection error, timeout) """
+        with self._lock:
+            self._breaker.record_failure()
+
+    def _apply_rate_limit_headers(self, headers: Mapping[str, str]) -> None:
+        remaining = headers.get('X-RateLimit-Remaining')
+        if remaining is None or not remaining.strip().lstrip('-').isdigit():
+            return
+        self.rate_limit_remaining = int(remaining)
+        reset = self._seconds_until(headers.get('X-RateLimit-Reset'))
+        if self.rate_limit_remaining <= 0 and reset is not None:
+            self._bucket.pause(reset)
+        elif headers.get('X-RateLimit-NearLimit', '').lower() == 'true':
+            self._bucket.rate = max(self._bucket.rate / 2, self.MIN_RATE)
+
+    def _retry_after(self, headers: Mapping[str, str]) -> float:
+        value = headers.get('Retry-After')
+        if value is not None:
+            value = value.strip()
+            if value.replace('.', '', 1).isdigit():
+                return float(value)
+            seconds = self._seconds_until(value)
+            if seconds is not None:
+                return seconds
+        return self._seconds_until(headers.get('X-RateLimit-Reset')) or self.DEFAULT_RETRY_AFTER
+
+    @staticmethod
+    def _seconds_until(value: Optional[str]) -> Optional[float]:
+        """ Seconds until an ISO 8601 or HTTP date, None if it cannot be parsed """
+        if not value:
+            return None
+        try:
+            moment = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+        except ValueError:
+            try:
+                moment = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+        return max(moment.timestamp() - time.time(), 0)
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            now = self._clock()
+            return {
+                'rate': round(self._bucket.rate, 2),
+                'max_rate': self.max_rate,
+                'paused_for': round(max(self._bucket.paused_until - now, 0), 1),
+                'circuit': self._breaker.state,
+                'consecutive_failures': self._breaker.failures,
+                'throttled': self.throttled,
+                'rejected': self.rejected,
+                'waited': round(self.waited, 1),
+                'rate_limit_remaining': self.rate_limit_remaining,
+            }
@@ -0,0 +1,49 @@
+import time
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from typing import Iterator
+
+
+class StartupReport(object):
+    """ Duration of every startup phase, measured from the creation of the report """
+
+    def __init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._lock: Lock = Lock()
+        self._started: float = time.monotonic()
+        self._phases: OrderedDict[str, dict] = OrderedDict()
+
+    @property
+    def started(self) -> float:
+        return self._started
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def record(self, name: str, start: float) -> None:
+        """ Record a phase that started at start (time.monotonic) and ends now """
+        end = time.monotonic()
+        with self._lock:
+            self._phases[name] = {
+                'duration': end - start,
+                'finished_after': end - self._started,
+            }
+        self.logger.info(f'Startup phase {name}: {(end - start) * 1000:.0f}ms '
+                         f'(after {(end - self._started) * 1000:.0f}ms)')
+
+    def log(self) -> None:
+        with self._lock:
+            phases = ', '.join(f'{name} {phase["duration"] * 1000:.0f}ms' for name, phase in self._phases.items())
+        self.logger.info(f'Startup finished after {(time.monotonic() - self._started) * 1000:.0f}ms: {phases}')
+
+    def get_info_dict(self) -> dict:
+        with self._lock:
+            return {name: {f'{key}_ms': round(value * 1000) for key, value in phase.items()}
+                    for name, phase in self._phases.items()}
@@ -0,0 +1,95 @@
+from bisect import bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class IndexedTicket(object):
+    __slots__ = ('key', 'status', 'created')
+
+    def __init__(self, key: str, status: str, created: float) -> None:
+        self.key: str = key
+        self.status: str = status
+        self.created: float = created
+
+
+class TicketIndex(object):
+    """
+    Compact in-memory index of the tickets of one filter. Per status the created times are kept
+    sorted, so count and overdue count are O(1) and O(log n) and every change is a single insort.
+    Tickets whose status is not tracked are not kept in the index.
+    """
+
+    def __init__(self, statuses: Iterable[str]) -> None:
+        self._status_lookup: Dict[str, str] = {status.lower(): status for status in statuses}
+        self._tickets: Dict[str, IndexedTicket] = {}
+        self._created: Dict[str, List[float]] = {status: [] for status in self._status_lookup.values()}
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._tickets
+
+    def get(self, key: str) -> Optional[IndexedTicket]:
+        return self._tickets.get(key)
+
+    def upsert(self, key: str, status_name: str, created: float) -> bool:
+        """ Insert, update or (for untracked statuses) remove a ticket. Returns True if the index changed """
+        status = self._status_lookup.get(status_name.lower())
+        if status is None:
+            return self.remove(key)
+        ticket = self._tickets.get(key)
+        if ticket is not None:
+            if ticket.status == status and ticket.created == created:
+                return False
+            self._remove_created(ticket)
+            ticket.status = status
+            ticket.created = created
+        else:
+            ticket = self._tickets[key] = IndexedTicket(key, status, created)
+        insort(self._created[status], created)
+        return True
+
+    def remove(self, key: str) -> bool:
+        ticket = self._tickets.pop(key, None)
+        if ticket is None:
+            return False
+        self._remove_created(ticket)
+        return True
+
+    def replace(self, records: Iterable[Tuple[str, str, float]]) -> int:
+        """ Replace the whole index by a full load, returns the number of tickets that disappeared """
+        tickets: Dict[str, IndexedTicket] = {}
+        created_by_status: Dict[str, List[float]] = {status: [] for status in self._created.keys()}
+        for key, status_name, created in records:
+            status = self._status_lookup.get(status_name.lower())
+            if status is not None and key not in tickets:
+                tickets[key] = IndexedTicket(key, status, created)
+                created_by_status[status].append(created)
+        for created in created_by_status.values():
+            created.sort()
+        # Erst am Schluss tauschen, damit ein abgebrochener Load den alten Stand nicht zerstört
+        removed = len(self._tickets.keys() - tickets.keys())
+        self._tickets, self._created = tickets, created_by_status
+        return removed
+
+    def count(self, status: str) -> int:
+        return len(self._created[status])
+
+    def overdue(self, status: str, deadline: float) -> int:
+        """ Number of tickets in status created at or before deadline """
+        return bisect_right(self._created[status], deadline)
+
+    def next_deadline(self, timeouts: Dict[str, float], now: float) -> Optional[float]:
+        """ Earliest time a ticket that is not yet overdue becomes overdue, timeouts per status in seconds """
+        deadlines = []
+        for status, timeout in timeouts.items():
+            created = self._created[status]
+            # Der älteste noch nicht überfällige Ticket bestimmt die nächste Deadline
+            index = bisect_right(created, now - timeout)
+            if index < len(created):
+                deadlines.append(created[index] + timeout)
+        return min(deadlines, default=None)
+
+    def _remove_created(self, ticket: IndexedTicket) -> None:
+        created = self._created[ticket.status]
+        del created[bisect_right(created, ticket.created) - 1]
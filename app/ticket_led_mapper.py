@@ -1,9 +1,60 @@
-from typing import List
-import math
+from typing import List, Sequence, Tuple
 from collections import OrderedDict
+from functools import lru_cache
 
 from .models.color import Color, ColorEffects
 
+# (color, count, overdue) pro Status, in der Reihenfolge der STATUS_MAP
+LayoutKey = Tuple[Tuple[str, int, int], ...]
+
+
+def apportion(counts: Sequence[int], seats: int) -> List[int]:
+    """
+    Largest remainder (Hamilton) apportionment of seats to counts: every entry gets the integer
+    part of its quota, the remaining seats go to the largest remainders, on equal remainders to the
+    later entry. Every non-zero count gets at least one seat as long as there are enough seats.
+    """
+    total = sum(counts)
+    if total == 0:
+        return [0] * len(counts)
+    # Ganzzahlig gerechnet, damit gleiche Reste auch wirklich gleich sind
+    result = [count * seats // total for count in counts]
+    remainders = [count * seats % total for count in counts]
+    by_remainder = sorted(range(len(counts)), key=lambda i: (remainders[i], i), reverse=True)
+    for i in by_remainder[:seats - sum(result)]:
+        result[i] += 1
+
+    if sum(1 for count in counts if count) <= seats:
+        for i, count in enumerate(counts):
+            if count and not result[i]:
+                # Die LED kommt vom Eintrag, der über seiner Quote am meisten bekommen hat
+                donor = max((j for j in range(len(counts)) if result[j] > 1),
+                            key=lambda j: (result[j] * total - counts[j] * seats, -j))
+                result[donor] -= 1
+                result[i] = 1
+    return result
+
+
+@lru_cache(maxsize=256)
+def _layout(led_count: int, key: LayoutKey) -> Tuple[List[Color], bool]:
+    """ The LEDs of a layout are shared by every caller with the same counts and must not be modified """
+    counts = [count for _, count, _ in key]
+    total_count = sum(counts)
+    overflow = total_count > led_count
+    if overflow:
+        counts = apportion(counts, led_count)
+
+    leds = []
+    for (color_str, _, overdue), count in zip(reversed(key), reversed(counts)):
+        color = Color.from_tuple_str(color_str)
+        color_overdue = color.with_effect(ColorEffects.overdue)
+        overdue_count = min(overdue, count)
+        leds += [color] * (count - overdue_count) + [color_overdue] * overdue_count
+
+    if not overflow:
+        leds += [Color.black] * (led_count - total_count)
+    return leds, overflow
+
 
 class TicketLedMapper(object):
 
@@ -14,39 +65,13 @@ class TicketLedMapper(object):
         self._overflow: bool = False
 
     def set_ticket(self, tickets: OrderedDict[str, dict]) -> None:
+        # Gleiche Zählerstände ergeben das gleiche Layout, es wird nur einmal berechnet
+        key = tuple((item.get('color'), item.get('count'), item.get('overdue')) for item in tickets.values())
+        self._leds, self._overflow = _layout(self._led_count, key)
 
-        color_counts: OrderedDict[str, int] = OrderedDict()
-        color_counts_overdue: OrderedDict[str, int] = OrderedDict()
-        for item in tickets.values():
-            color_counts[item.get('color')] = item.get('count')
-            color_counts_overdue[item.get('color')] = item.get('overdue')
-
-        total_count = sum(color_counts.values())
-        if total_count > self._led_count:
-            self._overflow = True
-            # scale color count to led_count
-            for color, count in color_counts.items():
-                color_counts[color] = math.ceil(count * self._led_count / total_count)
-            # reduce the color with the most of the leds by one as long as we have more than led_count
-            while sum(color_counts.values()) > self._led_count:
-                color_with_max_count = max(color_counts, key=lambda k: color_counts[k])
-                color_counts[color_with_max_count] -= 1
-        else:
-            self._overflow = False
-
-        leds = []
-        for color_str, count in reversed(color_counts.items()):
-            color = Color.from_tuple_str(color_str)
-            color_overdue = Color.from_tuple_str(color_str)
-            color_overdue.set_effect(ColorEffects.overdue)
-            overdue_count = min(color_counts_overdue.get(color_str), count)
-            color_array = [color] * (count - overdue_count) + [color_overdue] * overdue_count
-            leds += color_array
-
-        if not self._overflow:
-            leds += [Color.black] * (self._led_count - total_count)
-
-        self._leds = leds
+    @staticmethod
+    def cache_info() -> dict:
+        return _layout.cache_info()._asdict()
 
     @property
     def leds(self) -> List[Color]:
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import logging
+import tempfile
+from collections import OrderedDict
+from typing import List, Optional
+
+from .models.color import Color, ColorEffects
+
+
+class TicketSnapshot(object):
+
+    def __init__(self, jira_filter: str, saved_at: float, tickets: OrderedDict, leds: List[Color],
+                 overflow: bool) -> None:
+        self.jira_filter: str = jira_filter
+        self.saved_at: float = saved_at
+        self.tickets: OrderedDict = tickets
+        self.leds: List[Color] = leds
+        self.overflow: bool = overflow
+
+
+class TicketSnapshotStore(object):
+    """
+    Last known tickets and LED layout of one stripe on disk, so a restarted stripe can show
+    them before the first Jira round trip. The file is replaced atomically, a crash while
+    writing leaves the previous snapshot intact.
+    """
+
+    DEFAULT_DIRECTORY: str = 'snapshots'
+    # Unveränderte Snapshots nur selten neu schreiben (schont die SD-Karte)
+    REWRITE_INTERVAL: float = 5*60
+
+    def __init__(self, name: str, directory: Optional[str] = None) -> None:
+        self.logger = logging.getLogger(f'{__name__}.{name}')
+        self.name: str = name
+        self.directory: str = directory or os.environ.get('SNAPSHOT_DIR') or self.DEFAULT_DIRECTORY
+        self.path: str = os.path.join(self.directory, f'{name}.json')
+        self._last_content: Optional[str] = None
+        self._last_saved: float = 0
+
+    def load(self, jira_filter: str, max_age: float, now: Optional[float] = None) -> Optional[TicketSnapshot]:
+        """ The snapshot if it exists, belongs to jira_filter and is younger than max_age """
+        now = time.time() if now is None else now
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f, object_pairs_hook=OrderedDict)
+            snapshot = TicketSnapshot(
+                jira_filter=data['jira_filter'],
+                saved_at=data['saved_at'],
+                tickets=data['tickets'],
+                leds=[self._decode_led(led) for led in data['leds']],
+                overflow=data['overflow'],
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.logger.warning(f'Ignoring unreadable snapshot {self.path}: {e}')
+            return None
+
+        if snapshot.jira_filter != jira_filter:
+            self.logger.info(f'Ignoring snapshot {self.path}, the Jira filter has changed')
+            return None
+        if not now - max_age < snapshot.saved_at <= now:
+            self.logger.info(f'Ignoring snapshot {self.path}, it is outdated')
+            return None
+        self._last_content = self._content(snapshot)
+        return snapshot
+
+    def save(self, jira_filter: str, tickets: OrderedDict, leds: List[Color], overflow: bool,
+             now: Optional[float] = None) -> bool:
+        """ Write the snapshot atomically, returns False if it was unchanged and recently written """
+        now = time.time() if now is None else now
+        snapshot = TicketSnapshot(jira_filter, now, tickets, leds, overflow)
+        content = self._content(snapshot)
+        if content == self._last_content and now - self._last_saved < self.REWRITE_INTERVAL:
+            return False
+
+        data = json.dumps({'saved_at': now, **json.loads(content)}, separators=(',', ':'))
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{self.name}.', suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._last_content = content
+        self._last_saved = now
+        return True
+
+    @classmethod
+    def _content(cls, snapshot: TicketSnapshot) -> str:
+        # Alles ausser dem Zeitstempel, um unveränderte Snapshots zu erkennen
+        return json.dumps({
+            'jira_filter': snapshot.jira_filter,
+            'tickets': snapshot.tickets,
+            'leds': [cls._encode_led(led) for led in snapshot.leds],
+            'overflow': snapshot.overflow,
+        }, separators=(',', ':'))
+
+    @staticmethod
+    def _encode_led(color: Color) -> list:
+        return [*color.tuple, color.effect.name] if color.effect is not None else list(color.tuple)
+
+    @staticmethod
+    def _decode_led(led: list) -> Color:
+        color = Color.from_tuple(tuple(led[:3]))
+        return color.with_effect(ColorEffects[led[3]]) if len(led) > 3 else color
@@ -0,0 +1,116 @@
+import hmac
+import time
+import hashlib
+import logging
+from datetime import datetime
+from collections import OrderedDict
+from threading import Condition, Thread
+from typing import Callable, List, Optional, Tuple
+
+# (webhookEvent, issue) eines Jira Webhooks
+WebhookEvent = Tuple[str, dict]
+
+ISSUE_EVENTS: Tuple[str, ...] = ('jira:issue_created', 'jira:issue_updated', 'jira:issue_deleted')
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """ Check the X-Hub-Signature header ('sha256=<hex hmac of the body>') of a Jira webhook """
+    if not signature:
+        return False
+    algorithm, _, digest = signature.partition('=')
+    if algorithm not in ('sha1', 'sha256') or not digest:
+        return False
+    expected = hmac.new(secret.encode(), body, getattr(hashlib, algorithm)).hexdigest()
+    return hmac.compare_digest(expected, digest.lower())
+
+
+class WebhookQueue(object):
+    """
+    Bounded queue between the webhook endpoint and the stripes. Events are deduplicated by issue
+    key (the latest event of an issue wins) and handed to the handler in batches by a single
+    worker thread, so a burst of webhooks neither blocks the HTTP threads nor the render loop.
+    """
+
+    MAX_SIZE: int = 1000
+    BATCH_DELAY: float = 0.2  # kurz sammeln, damit ein Burst ein einziges Update auslöst
+    MAX_BATCH: int = 200
+
+    def __init__(self, handler: Callable[[List[WebhookEvent]], None], max_size: Optional[int] = None) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._handler: Callable[[List[WebhookEvent]], None] = handler
+        self.max_size: int = max_size or self.MAX_SIZE
+        self._condition: Condition = Condition()
+        self._pending: OrderedDict[str, WebhookEvent] = OrderedDict()
+        self._thread: Optional[Thread] = None
+        self._stopped: bool = False
+        self.received: int = 0
+        self.deduplicated: int = 0
+        self.rejected: int = 0
+        self.batches: int = 0
+        self.last_event: Optional[float] = None
+
+    def put(self, event: str, issue: dict) -> bool:
+        """ Queue the event of an issue, returns False if the queue is full """
+        key = issue.get('key') or issue.get('id')
+        with self._condition:
+            if key in self._pending:
+                # Ältere Events desselben Tickets sind überholt
+                del self._pending[key]
+                self.deduplicated += 1
+            elif len(self._pending) >= self.max_size:
+                self.rejected += 1
+                return False
+            self._pending[key] = (event, issue)
+            self.received += 1
+            self.last_event = time.time()
+            self._condition.notify()
+        return True
+
+    def take_batch(self, timeout: Optional[float] = None) -> List[WebhookEvent]:
+        """ Wait for events, collect for BATCH_DELAY and return up to MAX_BATCH of them """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._pending or self._stopped, timeout):
+                return []
+            deadline = time.monotonic() + self.BATCH_DELAY
+            while not self._stopped and len(self._pending) < self.MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = []
+            while self._pending and len(batch) < self.MAX_BATCH:
+                batch.append(self._pending.popitem(last=False)[1])
+            return batch
+
+    def start(self) -> 'WebhookQueue':
+        self._thread = Thread(target=self._run, name='webhook-worker', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        while not self._stopped:
+            batch = self.take_batch()
+            if not batch:
+                continue
+            self.batches += 1
+            try:
+                self._handler(batch)
+            except Exception as e:
+                self.logger.exception(f'Could not apply {len(batch)} webhook events: {e}')
+
+    def get_info_dict(self) -> dict:
+        with self._condition:
+            return {
+                'pending': len(self._pending),
+                'received': self.received,
+                'deduplicated': self.deduplicated,
+                'rejected': self.rejected,
+                'batches': self.batches,
+                'last_event': datetime.fromtimestamp(self.last_event).isoformat(timespec='seconds')
+                if self.last_event else None,
+            }
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Objekt-Allokationen pro Frame im Render-Pfad (NeoPixelController.update mit
+ConsolePixel) und pro TicketLedMapper.set_ticket, gezählt als neu erzeugte Color-Objekte.
+Die Ausgabe der ConsolePixel wird verworfen.
+
+PYTHONPATH=. python demo/bench_color_alloc.py
+"""
+
+import contextlib
+import random
+import sys
+import time
+from collections import OrderedDict
+
+from app.jira_ticket_fetcher import JiraTicketFetcher
+from app.models.color import Color
+from app.neopixel_controller import NeoPixelController
+from app.ticket_led_mapper import TicketLedMapper
+
+STRIPES = 3
+LED_COUNT = 40
+FRAMES = 500
+
+
+class NullOutput(object):
+
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+def ticket_states(variants: int) -> list:
+    rng = random.Random(1)
+    states = []
+    for _ in range(variants):
+        tickets = OrderedDict()
+        for status, values in JiraTicketFetcher.STATUS_MAP.items():
+            count = rng.randint(0, LED_COUNT // 2)
+            tickets[status] = dict(values, count=count, overdue=rng.randint(0, count))
+        states.append(tickets)
+    return states
+
+
+def count_colors(fn, calls: int) -> float:
+    """ Erzeugte Color-Objekte pro Aufruf, gezählt über die Aufrufe von Color.__init__ """
+    created = 0
+    init_code = Color.__init__.__code__
+
+    def profile(frame, event, arg):
+        nonlocal created
+        if event == 'call' and frame.f_code is init_code:
+            created += 1
+
+    sys.setprofile(profile)
+    try:
+        for i in range(calls):
+            fn(i)
+    finally:
+        sys.setprofile(None)
+    return created / calls
+
+
+def measure(fn, calls: int) -> tuple:
+    fn(0)
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    micros = (time.perf_counter() - start) / calls * 1e6
+    return count_colors(fn, calls), micros
+
+
+def main():
+    # Mehr Zählerstände als der Layout-Cache fasst: jeder set_ticket Aufruf rechnet neu
+    states = ticket_states(FRAMES)
+    report = sys.stdout
+    # Die ConsolePixel schreiben bei jedem Frame auf stdout
+    with contextlib.redirect_stdout(NullOutput()):
+        controllers = [NeoPixelController(led_count=LED_COUNT, gpio_pin=18, name=f'S{i}', offset=i / STRIPES,
+                                          init_animation=False) for i in range(STRIPES)]
+        mappers = [TicketLedMapper(LED_COUNT) for _ in range(STRIPES)]
+        for controller, mapper in zip(controllers, mappers):
+            mapper.set_ticket(states[0])
+            controller.set_leds(mapper.leds)
+            controller.set_overflow(True)
+
+        def frame(i):
+            for controller in controllers:
+                controller.update()
+
+        def set_ticket(i):
+            mappers[0].set_ticket(states[i % len(states)])
+
+        results = {'frame': measure(frame, FRAMES), 'set_ticket': measure(set_ticket, FRAMES)}
+        for controller in controllers:
+            controller.clear()
+        del controllers
+
+    print(f'{STRIPES} Stripes mit {LED_COUNT} LEDs, {FRAMES} Aufrufe', file=report)
+    print(f'{"path":<12} {"Color/call":>10} {"µs/call":>8}', file=report)
+    for name, (colors, micros) in results.items():
+        print(f'{name:<12} {colors:>10.1f} {micros:>8.1f}', file=report)
+
+
+if __name__ == '__main__':
+    main()
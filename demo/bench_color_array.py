@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Helligkeit, Addition und Subtraktion für ganze Stripes, einzeln pro Color-Objekt
+und als ColorArray (NumPy), sowie ein ganzer NeoPixelController-Frame mit pulsierenden LEDs.
+
+PYTHONPATH=. python demo/bench_color_array.py
+"""
+
+import contextlib
+import random
+import time
+
+from app.models.color import Color, ColorEffects
+from app.models.color_array import ColorArray
+from app.effects import OverduePulse
+from app.neopixel_controller import NeoPixelController
+
+LED_COUNTS = (40, 144, 1000, 10000)
+ROUNDS = 50
+
+
+class NullOutput(object):
+
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+def strip(n: int, seed: int) -> list:
+    rng = random.Random(seed)
+    # Wenige Grundfarben wie auf einem echten Stripe, die Hälfte überfällig
+    palette = [Color.red, Color.magenta, Color.blue, Color.green]
+    colors = sorted((rng.choice(palette) for _ in range(n)), key=lambda color: color.tuple)
+    return [color.with_effect(ColorEffects.overdue) if i % 2 else color for i, color in enumerate(colors)]
+
+
+def timed(fn) -> float:
+    fn(0)
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        fn(i)
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+
+def frame_time(n: int, vectorize: bool) -> float:
+    OverduePulse.VECTORIZE_MIN_LEDS = 1 if vectorize else n + 1
+    with contextlib.redirect_stdout(NullOutput()):
+        controller = NeoPixelController(led_count=n, gpio_pin=18, name='bench', init_animation=False,
+                                        frame_cycle=False)
+        controller.set_leds(strip(n, seed=1))
+        result = timed(lambda i: controller.update())
+        controller.clear()
+    return result
+
+
+def main():
+    print(f'µs pro Operation über den ganzen Stripe, Mittel aus {ROUNDS} Runden')
+    print(f'{"leds":>6} {"op":<11} {"Color":>10} {"ColorArray":>11} {"speedup":>8}')
+    for n in LED_COUNTS:
+        colors, others = strip(n, seed=1), strip(n, seed=2)
+        array, other = ColorArray.from_colors(colors), ColorArray.from_colors(others)
+        operations = {
+            'brightness': (lambda i: [c.adjust_brightness(128 + i) for c in colors],
+                           lambda i: array.adjust_brightness(128 + i).tuples()),
+            'add': (lambda i: [a + b for a, b in zip(colors, others)],
+                    lambda i: (array + other).tuples()),
+            'sub': (lambda i: [a - b for a, b in zip(colors, others)],
+                    lambda i: (array - other).tuples()),
+        }
+        for name, (per_object, vectorized) in operations.items():
+            before, after = timed(per_object), timed(vectorized)
+            print(f'{n:>6} {name:<11} {before:>10.1f} {after:>11.1f} {before / after:>7.1f}x')
+        before, after = frame_time(n, vectorize=False), frame_time(n, vectorize=True)
+        print(f'{n:>6} {"frame":<11} {before:>10.1f} {after:>11.1f} {before / after:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
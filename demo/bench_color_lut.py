@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Color.adjust_brightness mit der bisherigen Gleitkomma-Rechnung und mit den
+Helligkeitstabellen, einzeln und für einen Stripe mit pulsierenden LEDs, sowie die
+Gamma-Korrektur der Ausgabe mit und ohne Tabelle.
+
+PYTHONPATH=. python demo/bench_color_lut.py
+"""
+
+import random
+import time
+
+from app.models.color import Color, apply_lut, brightness_lut, gamma_lut
+
+LED_COUNTS = (40, 144, 1000)
+ROUNDS = 200
+GAMMA = 2.8
+
+
+def previous_adjust_brightness(color: Color, brightness: int) -> Color:
+    """ Die Rechnung vor der Umstellung, zum Vergleich """
+    if not (0 <= brightness <= 255):
+        raise ValueError(f'The brightness value must be between 0 and 255. Given value was {brightness}.')
+    factor = brightness / 255
+    return Color.from_tuple((int(factor * color.r), int(factor * color.g), int(factor * color.b)))
+
+
+def previous_gamma(rgb: tuple) -> tuple:
+    return tuple(int((c / 255) ** GAMMA * 255 + 0.5) for c in rgb)
+
+
+def timed(fn) -> float:
+    fn(0)
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        fn(i)
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+
+def main():
+    rng = random.Random(1)
+    lut = gamma_lut(GAMMA)
+    # Die Tabellen entstehen einmal pro Helligkeitsstufe, im Betrieb schon nach dem ersten Puls
+    for brightness in range(256):
+        brightness_lut(brightness)
+    print(f'µs pro Stripe (alle LEDs pulsierend), Mittel aus {ROUNDS} Runden')
+    print(f'{"leds":>6} {"op":<11} {"float":>10} {"LUT":>10} {"speedup":>8}')
+    for n in LED_COUNTS:
+        colors = [Color(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)) for _ in range(n)]
+        tuples = [color.tuple for color in colors]
+        operations = {
+            'brightness': (lambda i: [previous_adjust_brightness(c, i % 256) for c in colors],
+                           lambda i: [c.adjust_brightness(i % 256) for c in colors]),
+            'gamma': (lambda i: [previous_gamma(rgb) for rgb in tuples],
+                      lambda i: [apply_lut(rgb, lut) for rgb in tuples]),
+        }
+        for name, (before_fn, after_fn) in operations.items():
+            before, after = timed(before_fn), timed(after_fn)
+            print(f'{n:>6} {name:<11} {before:>10.1f} {after:>10.1f} {before / after:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
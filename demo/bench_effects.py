@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Kosten der Effekt-Ebenen pro Frame. Alle Effekte sind aktiv, die Layouts nutzen
+keinen, einen oder mehrere davon; Ebenen ohne Pixel dürfen nichts kosten. Die Frames werden
+ohne den vorberechneten Zyklus gerechnet, show() der ConsolePixel wird übersprungen.
+
+PYTHONPATH=. python demo/bench_effects.py
+"""
+
+import contextlib
+import gc
+import time
+
+from app.effects import EFFECTS
+from app.models.color import Color, ColorEffects
+from app.neopixel_controller import NeoPixelController
+
+LED_COUNTS = (144, 1000)
+FRAMES = 300
+FPS = 10
+
+
+class NullOutput(object):
+
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+def layout(n: int, effects: tuple, shift: int = 0) -> list:
+    # Vier Farben, die Effekte reihum auf jeder zweiten LED
+    palette = [Color.red, Color.magenta, Color.blue, Color.green]
+    colors = [palette[(i * len(palette) // n + shift) % len(palette)] for i in range(n)]
+    if not effects:
+        return colors
+    return [color.with_effect(effects[i // 2 % len(effects)]) if i % 2 else color for i, color in enumerate(colors)]
+
+
+SCENARIOS = {
+    'none': (),
+    'overdue': (ColorEffects.overdue,),
+    'mixed': (ColorEffects.overdue, ColorEffects.blink, ColorEffects.chase),
+}
+
+
+def measure(n: int, effects: tuple, fade: bool) -> tuple:
+    controller = NeoPixelController(led_count=n, gpio_pin=18, name='bench', init_animation=False,
+                                    frame_cycle=False, effects=list(EFFECTS))
+    controller._pixels.show = lambda: None
+    controller.set_leds(layout(n, effects))
+    controller.set_overflow(True)
+    controller.update()
+    if fade:
+        # Neues Layout, alle LEDs mit neuer Farbe blenden während der ganzen Messung ein
+        controller.effects.layers[-1].DURATION = FRAMES / FPS + 1
+        controller.set_leds(layout(n, effects, shift=1))
+        controller.update()
+    # Frames im Abstand des Render-Loops, mit einer simulierten Uhr
+    clock = time.monotonic
+    now = clock()
+    total = 0
+    for k in range(FRAMES):
+        time.monotonic = lambda: now + k / FPS
+        start = time.perf_counter()
+        controller.update()
+        total += time.perf_counter() - start
+    time.monotonic = clock
+    info = controller.effects.get_info_dict()
+    controller.clear()
+    return total / FRAMES * 1e6, info
+
+
+def main():
+    results = []
+    with contextlib.redirect_stdout(NullOutput()):
+        for n in LED_COUNTS:
+            for scenario, effects in SCENARIOS.items():
+                results.append((n, scenario, measure(n, effects, fade=False)))
+            results.append((n, 'mixed+fade', measure(n, SCENARIOS['mixed'], fade=True)))
+        gc.collect()
+    print(f'{FRAMES} Frames mit {FPS} FPS, alle Effekte aktiv; pro Ebene µs je Aufruf (Pixel)')
+    print(f'{"leds":>6} {"layout":<11} {"frame µs":>9} ' + ' '.join(f'{name:>15}' for name in EFFECTS))
+    for n, scenario, (frame, info) in results:
+        cells = []
+        for name in EFFECTS:
+            layer = info[name]
+            cells.append(f'{layer["avg_us"]:>8.1f} ({layer["pixels"]:>4})' if layer['calls'] else f'{"-":>15}')
+        print(f'{n:>6} {scenario:<11} {frame:>9.1f} ' + ' '.join(cells))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: End-to-End Poll-Zyklen der Stripes gegen den lokalen Jira-Ersatz.
+Misst pro Fetch-Strategie die Requests pro Zyklus, p50/p95 der Zyklusdauer und die übertragenen Bytes.
+
+PYTHONPATH=. python demo/bench_fetch.py --issues 2000 --latency 0.05 --error-rate 0.01
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import time
+
+from demo.jira_stub_server import JiraStubServer
+
+FILTERS = {
+    'APIM': 'project = APIM',
+    'AINT': 'project = AINT',
+    'URGENT': 'project = APIM AND labels = urgent',
+}
+STRATEGIES = ('count', 'count-search', 'snapshot', 'incremental', 'planned')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(int(round(len(values) * fraction)) - 1, 0)]
+
+
+def run_strategy(server: JiraStubServer, strategy: str, cycles: int) -> dict:
+    from app.fetch_engine import FetchEngine
+    from app.JTLS.JiraQueryPlanner import JiraQueryPlanner
+    from app.JTLS.JiraTicketLedStripe import JiraTicketLedStripe
+
+    fetch_mode = {'planned': 'snapshot', 'count-search': 'count'}.get(strategy, strategy)
+    # count zählt mit dem Count-Endpunkt (auto), count-search mit search und maxResults 0
+    os.environ['JIRA_COUNT_BACKEND'] = 'search' if strategy == 'count-search' else 'auto'
+    # Der erste Fetch passiert im Konstruktor und zählt nicht zum Benchmark
+    stripes = [JiraTicketLedStripe(name=name, jira_filter=jira_filter, gpio_pin=18, led_count=20, offset=0,
+                                   fetch_mode=fetch_mode)
+               for name, jira_filter in FILTERS.items()]
+    engine = FetchEngine.get_instance()
+    planner = JiraQueryPlanner(engine)
+
+    durations = []
+    failures = 0
+    before = dict(server.stats)
+    for _ in range(cycles):
+        start = time.perf_counter()
+        if strategy == 'planned':
+            results = [ok for ok, _ in planner.update_tickets(stripes).values()]
+        else:
+            results = engine.map_stripes(lambda stripe: stripe.update_tickets(), stripes)
+        durations.append(time.perf_counter() - start)
+        failures += results.count(False)
+
+    delta = {name: server.stats[name] - before[name] for name in before}
+    return {
+        'requests': delta['requests'] / cycles,
+        'p50': statistics.median(durations) * 1000,
+        'p95': percentile(durations, 0.95) * 1000,
+        'bytes': (delta['bytes_in'] + delta['bytes_out']) / cycles,
+        'failures': failures,
+        'throttled': delta['throttled'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fetch-Strategien gegen den lokalen Jira-Ersatz messen')
+    parser.add_argument('--cycles', type=int, default=20)
+    parser.add_argument('--issues', type=int, default=2000, help='Grösse des synthetischen Datensatzes')
+    parser.add_argument('--latency', type=float, default=0.02, help='Median der Antwortzeit in Sekunden')
+    parser.add_argument('--latency-sigma', type=float, default=0.0, help='Streuung (lognormal) der Antwortzeit')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Anteil der Requests mit 503')
+    parser.add_argument('--rate-limit', type=float, default=0, help='Rate-Limit des Servers (Requests/s)')
+    parser.add_argument('--strategies', nargs='+', default=STRATEGIES, choices=STRATEGIES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    server = JiraStubServer(latency=args.latency, latency_sigma=args.latency_sigma, issue_count=args.issues,
+                            error_rate=args.error_rate, rate_limit=args.rate_limit).start()
+    os.environ.update({
+        'OAUTHLIB_INSECURE_TRANSPORT': '1',
+        'ACCESS_TOKEN_URL': f'{server.url}/token',
+        'CLIENT_ID': 'bench',
+        'CLIENT_SECRET': 'secret',
+        'BASE_URL': server.url,
+    })
+    # Der Request-Governor soll nur bremsen, wenn JIRA_RATE_LIMIT explizit gesetzt ist
+    os.environ.setdefault('JIRA_RATE_LIMIT', '1000')
+    os.environ.setdefault('JIRA_BURST', '100')
+
+    print(f'{len(FILTERS)} Stripes, {args.issues} Tickets, {args.cycles} Zyklen, '
+          f'{args.latency * 1000:.0f}ms Antwortzeit, Fehlerrate {args.error_rate:.0%}')
+    print(f'{"strategy":<12} {"req/cycle":>9} {"p50 ms":>8} {"p95 ms":>8} {"KiB/cycle":>10} {"failures":>8} {"429":>5}')
+    for strategy in args.strategies:
+        result = run_strategy(server, strategy, args.cycles)
+        print(f'{strategy:<12} {result["requests"]:>9.1f} {result["p50"]:>8.1f} {result["p95"]:>8.1f} '
+              f'{result["bytes"] / 1024:>10.1f} {result["failures"]:>8} {result["throttled"]:>5}')
+
+    from app import count_backend
+    for stats in count_backend.get_info_dict():
+        for backend in stats.get('backends', [stats]):
+            if backend['requests']:
+                print(f'count backend {backend["backend"]:<12} {backend["requests"]:>6} requests '
+                      f'p50={backend["p50_ms"]}ms p95={backend["p95_ms"]}ms')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
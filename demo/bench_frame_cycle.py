@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: NeoPixelController.update mit pro Frame berechnetem Pulsieren und mit dem
+vorberechneten Zyklus (FrameCycle), dazu Aufbauzeit und Grösse des Zyklus pro Layout.
+show() der ConsolePixel wird dabei übersprungen.
+
+PYTHONPATH=. python demo/bench_frame_cycle.py
+"""
+
+import contextlib
+import gc
+import time
+
+from app.models.color import Color, ColorEffects
+from app.neopixel_controller import NeoPixelController
+
+LED_COUNTS = (40, 144, 1000)
+FRAMES = 300
+FPS = 10
+
+
+class NullOutput(object):
+
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+def layout(n: int) -> list:
+    # Vier Farben, jede zweite LED überfällig
+    palette = [Color.red, Color.magenta, Color.blue, Color.green]
+    colors = [palette[i * len(palette) // n] for i in range(n)]
+    return [color.with_effect(ColorEffects.overdue) if i % 2 else color for i, color in enumerate(colors)]
+
+
+def measure(n: int, frame_cycle: bool) -> tuple:
+    controller = NeoPixelController(led_count=n, gpio_pin=18, name='bench', init_animation=False,
+                                    frame_cycle=frame_cycle)
+    # Nur die Berechnung der Frames messen, nicht die Ausgabe der ConsolePixel
+    controller._pixels.show = lambda: None
+    controller.set_leds(layout(n))
+    controller.set_overflow(True)
+    start = time.perf_counter()
+    controller.update()
+    first = (time.perf_counter() - start) * 1e3
+    # Frames im Abstand des Render-Loops, mit einer simulierten Uhr
+    clock = time.monotonic
+    now = clock()
+    total = 0
+    for k in range(FRAMES):
+        time.monotonic = lambda: now + k / FPS
+        start = time.perf_counter()
+        controller.update()
+        total += time.perf_counter() - start
+    time.monotonic = clock
+    nbytes = controller._frame_cycle.nbytes if frame_cycle else 0
+    controller.clear()
+    return first, total / FRAMES * 1e6, nbytes
+
+
+def main():
+    results = []
+    with contextlib.redirect_stdout(NullOutput()):
+        for n in LED_COUNTS:
+            results.append((n, measure(n, frame_cycle=False), measure(n, frame_cycle=True)))
+        gc.collect()
+    print(f'{FRAMES} Frames mit {FPS} FPS, die Hälfte der LEDs überfällig')
+    print(f'{"leds":>6} {"computed µs":>12} {"cycle µs":>9} {"speedup":>8} {"build ms":>9} {"cycle KiB":>10}')
+    for n, (_, computed, _), (build, replayed, nbytes) in results:
+        print(f'{n:>6} {computed:>12.1f} {replayed:>9.1f} {computed / replayed:>7.1f}x '
+              f'{build:>9.1f} {nbytes / 1024:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
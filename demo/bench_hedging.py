@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Latenz der Count-Queries mit und ohne Hedging gegen den lokalen Jira-Ersatz
+mit lognormal verteilter Antwortzeit (langer Schwanz). Misst p50/p95/p99 pro Request und
+die zusätzliche Last (Requests am Server pro Query).
+
+PYTHONPATH=. python demo/bench_hedging.py --requests 2000 --latency 0.03 --latency-sigma 1.0
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.hedge_policy import HedgePolicy
+from app.jira_client import JiraClient
+from app.oauth_token_manager import OAuthTokenManager
+from demo.jira_stub_server import JiraStubServer
+
+CONCURRENCY = 4  # wie JIRA_MAX_CONCURRENCY
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run(server: JiraStubServer, token_manager: OAuthTokenManager, ratio: float, requests: int) -> dict:
+    policy = HedgePolicy(ratio=ratio)
+    client = JiraClient(server.url, hedging=policy)
+    url = f'{server.url}/search/approximate-count'
+
+    def query(_):
+        start = time.perf_counter()
+        client.post(url, json={'jql': 'project = APIM'}, token_manager=token_manager, hedge=True)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        # Aufwärmen: Verbindungen öffnen und genug Latenzen für die Hedge-Verzögerung sammeln
+        list(executor.map(query, range(HedgePolicy.MIN_SAMPLES * 2)))
+        before = server.stats['requests']
+        durations = [d * 1000 for d in executor.map(query, range(requests))]
+    # Verlorene Hedges noch zu Ende laufen lassen, bevor der Server gezählt wird
+    if client._executor is not None:
+        client._executor.shutdown(wait=True)
+    return {
+        'p50': statistics.median(durations),
+        'p95': percentile(durations, 0.95),
+        'p99': percentile(durations, 0.99),
+        'max': max(durations),
+        'load': (server.stats['requests'] - before) / requests,
+        'hedges': policy.hedges,
+        'wins': policy.wins,
+        'delay': policy.delay(url),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hedging gegen den lokalen Jira-Ersatz messen')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.03, help='Median der Antwortzeit in Sekunden')
+    parser.add_argument('--latency-sigma', type=float, default=1.0, help='Streuung (lognormal) der Antwortzeit')
+    parser.add_argument('--ratios', type=float, nargs='+', default=[0, 0.05, 0.1], help='JIRA_HEDGE_RATIO Werte')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
+    os.environ.setdefault('JIRA_RATE_LIMIT', '1000')
+    os.environ.setdefault('JIRA_BURST', '100')
+    server = JiraStubServer(latency=args.latency, latency_sigma=args.latency_sigma, connect_latency=0).start()
+    token_manager = OAuthTokenManager(f'{server.url}/token', 'bench', 'secret', None)
+    token_manager.get_token()
+
+    print(f'{args.requests} Count-Queries, {CONCURRENCY} parallel, Median {args.latency * 1000:.0f}ms, '
+          f'sigma {args.latency_sigma}')
+    print(f'{"ratio":>6} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"max ms":>8} {"load":>6} {"hedges":>7} '
+          f'{"wins":>5} {"delay ms":>9}')
+    for ratio in args.ratios:
+        result = run(server, token_manager, ratio, args.requests)
+        delay = f'{result["delay"] * 1000:.0f}' if ratio and result['delay'] else '-'
+        print(f'{ratio:>6.2f} {result["p50"]:>8.1f} {result["p95"]:>8.1f} {result["p99"]:>8.1f} '
+              f'{result["max"]:>8.1f} {result["load"]:>6.3f} {result["hedges"]:>7} {result["wins"]:>5} {delay:>9}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CPU-Last und Aufwachvorgänge pro Minute des Render-Loops im Modus fixed (jeder
+Frame) und idle (nur wenn sich die Ausgabe ändert), mit Stripes im Simulator (ConsolePixel,
+Ausgabe verworfen), ohne und mit überfälligen Tickets.
+
+PYTHONPATH=. python demo/bench_idle_render.py --seconds 10
+"""
+
+import argparse
+import contextlib
+import gc
+import time
+
+from app.models.color import Color, ColorEffects
+from app.neopixel_controller import NeoPixelController
+from app.render_loop import RenderLoop
+
+STRIPE_COUNTS = (1, 3)
+LED_COUNT = 40
+
+
+class NullOutput(object):
+
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+def leds(overdue: bool) -> list:
+    colors = [Color.red] * 10 + [Color.green] * 10 + [Color.blue] * 10 + [Color.black] * 10
+    if overdue:
+        colors[10:15] = [Color.green.with_effect(ColorEffects.overdue)] * 5
+    return colors
+
+
+def run(stripes: int, mode: str, overdue: bool, seconds: float) -> dict:
+    # Versetzte Phasen wie in config.json, die Stripes pulsieren nicht gleichzeitig
+    controllers = [NeoPixelController(led_count=LED_COUNT, gpio_pin=18, name=f'S{i}', offset=i / stripes,
+                                      init_animation=False) for i in range(stripes)]
+    for controller in controllers:
+        controller.set_leds(leds(overdue))
+
+    def render():
+        for controller in controllers:
+            controller.update()
+
+    def idle():
+        return min(controller.idle_time() for controller in controllers)
+
+    loop = RenderLoop(render, fps=10, idle=idle, mode=mode)
+    for controller in controllers:
+        controller.on_change = loop.wake
+    start, cpu = time.monotonic(), time.process_time()
+    loop.start()
+    time.sleep(seconds)
+    loop.stop()
+    elapsed, cpu = time.monotonic() - start, time.process_time() - cpu
+    for controller in controllers:
+        controller.clear()
+    return {
+        'cpu': cpu / elapsed * 100,
+        'wakeups': loop.wakeups / elapsed * 60,
+        'frames': loop.frames / elapsed * 60,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+    results = []
+    with contextlib.redirect_stdout(NullOutput()):
+        for stripes in STRIPE_COUNTS:
+            for overdue in (False, True):
+                for mode in ('fixed', 'idle'):
+                    results.append((stripes, mode, overdue, run(stripes, mode, overdue, args.seconds)))
+        gc.collect()
+    print(f'Stripes mit {LED_COUNT} LEDs, 10 FPS, je {args.seconds:g} s')
+    print(f'{"stripes":>7} {"mode":<6} {"overdue":<8} {"cpu %":>6} {"wakeups/min":>12} {"frames/min":>11}')
+    for stripes, mode, overdue, result in results:
+        print(f'{stripes:>7} {mode:<6} {"yes" if overdue else "no":<8} {result["cpu"]:>6.2f} '
+              f'{result["wakeups"]:>12.0f} {result["frames"]:>11.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Latenz pro Poll-Zyklus mit kalten (neue Session pro Zyklus)
+und warmen (gepoolte Keep-Alive Session) Verbindungen gegen den lokalen Jira-Stub
+"""
+
+import os
+import statistics
+import time
+
+from app.jira_client import JiraClient
+from app.oauth_token_manager import OAuthTokenManager
+from demo.jira_stub_server import JiraStubServer
+
+CYCLES = 20
+REQUESTS_PER_CYCLE = 8  # 2 Count-Queries für 4 Status
+
+os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
+
+
+def run_cycles(server: JiraStubServer, token_manager: OAuthTokenManager, warm: bool):
+    durations = []
+    connections = server.connections
+    client = JiraClient(server.url)
+    for _ in range(CYCLES):
+        if not warm:
+            client = JiraClient(server.url)
+        start = time.perf_counter()
+        for _ in range(REQUESTS_PER_CYCLE):
+            client.post(f'{server.url}/search', json={'jql': 'project = APIM', 'maxResults': 0},
+                        token_manager=token_manager)
+        durations.append(time.perf_counter() - start)
+    return durations, server.connections - connections
+
+
+def main():
+    server = JiraStubServer().start()
+    token_manager = OAuthTokenManager(f'{server.url}/token', 'bench', 'secret', None)
+    token_manager.get_token()
+
+    print(f'{CYCLES} Zyklen mit je {REQUESTS_PER_CYCLE} Requests, '
+          f'{server.connect_latency * 1000:.0f}ms Handshake, {server.latency * 1000:.0f}ms Antwortzeit')
+    for name, warm in (('cold', False), ('warm', True)):
+        durations, connections = run_cycles(server, token_manager, warm)
+        durations_ms = sorted(d * 1000 for d in durations)
+        print(f'{name}: p50={statistics.median(durations_ms):.1f}ms '
+              f'p95={durations_ms[int(len(durations_ms) * 0.95) - 1]:.1f}ms '
+              f'connections={connections}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: TicketLedMapper.set_ticket für Stripes von 40 bis 10000 LEDs.
+Vergleicht die bisherige Verteilung (ceil und Kürzen der grössten Farbe) mit der
+Largest-Remainder-Verteilung, jeweils mit neuen (cold) und unveränderten (warm) Zählerständen.
+
+PYTHONPATH=. python demo/bench_led_mapper.py
+"""
+
+import math
+import random
+import time
+from collections import OrderedDict
+
+from app.jira_ticket_fetcher import JiraTicketFetcher
+from app.models.color import Color, ColorEffects
+from app.ticket_led_mapper import TicketLedMapper
+
+LED_COUNTS = (40, 144, 1000, 10000)
+CALLS = 2000
+
+
+def previous_set_ticket(led_count: int, tickets: OrderedDict) -> list:
+    """ Die Verteilung vor der Umstellung, zum Vergleich """
+    color_counts = OrderedDict()
+    color_counts_overdue = OrderedDict()
+    for item in tickets.values():
+        color_counts[item.get('color')] = item.get('count')
+        color_counts_overdue[item.get('color')] = item.get('overdue')
+    total_count = sum(color_counts.values())
+    overflow = total_count > led_count
+    if overflow:
+        for color, count in color_counts.items():
+            color_counts[color] = math.ceil(count * led_count / total_count)
+        while sum(color_counts.values()) > led_count:
+            color_with_max_count = max(color_counts, key=lambda k: color_counts[k])
+            color_counts[color_with_max_count] -= 1
+    leds = []
+    for color_str, count in reversed(color_counts.items()):
+        color = Color.from_tuple_str(color_str)
+        color_overdue = color.with_effect(ColorEffects.overdue)
+        overdue_count = min(color_counts_overdue.get(color_str), count)
+        leds += [color] * (count - overdue_count) + [color_overdue] * overdue_count
+    if not overflow:
+        leds += [Color.black] * (led_count - total_count)
+    return leds
+
+
+def ticket_states(led_count: int, variants: int) -> list:
+    rng = random.Random(led_count)
+    states = []
+    for _ in range(variants):
+        tickets = OrderedDict()
+        for status, values in JiraTicketFetcher.STATUS_MAP.items():
+            count = rng.randint(0, led_count)
+            tickets[status] = dict(values, count=count, overdue=rng.randint(0, count))
+        states.append(tickets)
+    return states
+
+
+def measure(fn, states) -> float:
+    start = time.perf_counter()
+    for i in range(CALLS):
+        fn(states[i % len(states)])
+    return (time.perf_counter() - start) / CALLS * 1e6
+
+
+def main():
+    print(f'{CALLS} Aufrufe pro Messung, {len(JiraTicketFetcher.STATUS_MAP)} Status, µs pro Aufruf')
+    print(f'{"leds":>6} {"previous":>10} {"cold":>10} {"warm":>10}')
+    for led_count in LED_COUNTS:
+        mapper = TicketLedMapper(led_count)
+        # cold: jeder Aufruf hat neue Zählerstände (mehr Varianten als der Cache fasst)
+        cold_states = ticket_states(led_count, CALLS)
+        warm_states = cold_states[:1]
+        previous = measure(lambda tickets: previous_set_ticket(led_count, tickets), cold_states)
+        cold = measure(mapper.set_ticket, cold_states)
+        warm = measure(mapper.set_ticket, warm_states)
+        print(f'{led_count:>6} {previous:>10.1f} {cold:>10.1f} {warm:>10.1f}')
+    print(f'layout cache: {TicketLedMapper.cache_info()}')
+
+
+if __name__ == '__main__':
+    main()
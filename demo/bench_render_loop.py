@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Frame-Takt des bisherigen APScheduler-Jobs (interval 0.1 s) und des RenderLoop,
+ohne Last und während ein Hintergrund-Thread in Schüben CPU verbraucht (wie beim Parsen
+einer Jira-Antwort). Gemessen werden die Abstände der Frames und ihre Abweichung vom Raster.
+
+PYTHONPATH=. python demo/bench_render_loop.py --seconds 5
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from app.render_loop import RenderLoop
+
+FPS = 10
+
+
+def busy_worker(stop: threading.Event) -> None:
+    """ Abwechselnd 30 ms JSON parsen und 20 ms schlafen """
+    document = json.dumps({'issues': [{'key': f'APIM-{i}', 'fields': {'status': 'Open'}} for i in range(2000)]})
+    while not stop.is_set():
+        end = time.perf_counter() + 0.03
+        while time.perf_counter() < end:
+            json.loads(document)
+        time.sleep(0.02)
+
+
+def run_apscheduler(render, seconds: float) -> None:
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(render, 'interval', seconds=1 / FPS)
+    scheduler.start()
+    time.sleep(seconds)
+    scheduler.shutdown()
+
+
+def run_render_loop(render, seconds: float) -> None:
+    loop = RenderLoop(render, fps=FPS).start()
+    time.sleep(seconds)
+    loop.stop()
+
+
+def measure(runner, seconds: float, load: bool) -> dict:
+    starts = []
+
+    def render():
+        starts.append(time.monotonic())
+        # Ein Frame mit show() auf der Hardware dauert einige ms
+        time.sleep(0.003)
+
+    stop = threading.Event()
+    if load:
+        threading.Thread(target=busy_worker, args=(stop,), daemon=True).start()
+    cpu = time.process_time()
+    runner(render, seconds)
+    cpu = time.process_time() - cpu
+    stop.set()
+    period = 1 / FPS
+    intervals = [(b - a) * 1000 for a, b in zip(starts, starts[1:])]
+    # Abweichung vom Raster des ersten Frames, zeigt aufsummierte Drift
+    drift = [((start - starts[0]) % period) * 1000 for start in starts]
+    drift = [min(d, period * 1000 - d) for d in drift]
+    quantiles = statistics.quantiles(intervals, n=100)
+    return {
+        'frames': len(starts),
+        'p50': quantiles[49],
+        'p95': quantiles[94],
+        'max': max(intervals),
+        'grid_max': max(drift),
+        # ohne Last: CPU-Zeit der Frame-Steuerung pro Frame
+        'cpu': cpu / len(starts) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+    print(f'{FPS} FPS über {args.seconds:g} s, Frame-Abstände in ms, grid: grösste Abweichung vom Raster,\n'
+          f'cpu: CPU-Zeit pro Frame ohne Last')
+    print(f'{"loop":<12} {"load":<5} {"frames":>6} {"p50":>7} {"p95":>7} {"max":>7} {"grid":>7} {"cpu µs":>7}')
+    for load in (False, True):
+        for name, runner in (('apscheduler', run_apscheduler), ('render_loop', run_render_loop)):
+            result = measure(runner, args.seconds, load)
+            print(f'{name:<12} {"yes" if load else "no":<5} {result["frames"]:>6} {result["p50"]:>7.1f} '
+                  f'{result["p95"]:>7.1f} {result["max"]:>7.1f} {result["grid_max"]:>7.1f} '
+                  f'{result["cpu"] if not load else float("nan"):>7.0f}')
+
+
+if __name__ == '__main__':
+    main()
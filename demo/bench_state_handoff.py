@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Wartezeit der Setter (set_leds, set_error, set_overflow) während der Render-Loop
+Frames zeichnet, mit einem Lock über Setter und ganzem Frame inklusive show() (bisher) und mit
+der Übergabe eines unveränderlichen Zustands (LedState). show() wird mit einer festen Dauer
+simuliert, wie bei einem langen WS2812-Stripe.
+
+PYTHONPATH=. python demo/bench_state_handoff.py --seconds 3 --show-ms 20
+"""
+
+import argparse
+import contextlib
+import gc
+import statistics
+import threading
+import time
+
+from app.models.color import Color
+from app.neopixel_controller import NeoPixelController
+from app.render_loop import RenderLoop
+
+LED_COUNT = 144
+
+
+class NullOutput(object):
+
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+class LockedController(NeoPixelController):
+    """ Die bisherige Variante: ein Lock für die Setter und den ganzen Frame """
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def update(self) -> None:
+        with self._lock:
+            super().update()
+
+    def _publish(self, **changes) -> None:
+        with self._lock:
+            super()._publish(**changes)
+
+
+def run(controller_class, seconds: float, show_time: float) -> list:
+    controller = controller_class(led_count=LED_COUNT, gpio_pin=18, name='bench', init_animation=False)
+    controller._pixels.show = lambda: time.sleep(show_time)
+    layouts = [[color] * LED_COUNT for color in (Color.red, Color.green, Color.blue)]
+    loop = RenderLoop(controller.update, fps=10, mode='fixed').start()
+    latencies = []
+    end = time.monotonic() + seconds
+    i = 0
+    # Fetch-Thread: neue Layouts und Fehlerzustände im Millisekunden-Takt
+    while time.monotonic() < end:
+        i += 1
+        start = time.perf_counter()
+        controller.set_leds(layouts[i % 3])
+        controller.set_error(i % 2 == 0)
+        controller.set_overflow(i % 5 == 0)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.001)
+    loop.stop()
+    controller.clear()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--show-ms', type=float, default=20)
+    args = parser.parse_args()
+    results = {}
+    with contextlib.redirect_stdout(NullOutput()):
+        for name, controller_class in (('lock', LockedController), ('handoff', NeoPixelController)):
+            results[name] = run(controller_class, args.seconds, args.show_ms / 1000)
+        gc.collect()
+    print(f'{LED_COUNT} LEDs, 10 FPS, show() {args.show_ms:g} ms, {args.seconds:g} s, '
+          f'Dauer von drei Settern in ms')
+    print(f'{"state":<8} {"calls":>6} {"p50":>8} {"p99":>8} {"max":>8} {"blocked %":>10} {"blocked ms":>11}')
+    for name, latencies in results.items():
+        quantiles = statistics.quantiles(latencies, n=100)
+        # Anteil der Aufrufe, die auf einen Frame gewartet haben
+        waits = [latency for latency in latencies if latency > 0.001]
+        blocked = len(waits) / len(latencies) * 100
+        print(f'{name:<8} {len(latencies):>6} {quantiles[49] * 1e3:>8.3f} {quantiles[98] * 1e3:>8.3f} '
+              f'{max(latencies) * 1e3:>8.3f} {blocked:>10.1f} {sum(waits) * 1e3:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Speicherbedarf beim Parsen einer grossen Jira-Suchantwort.
+Vergleicht json.loads über den ganzen Body (response.text) mit dem Streaming-Parser,
+der den Body in Stücken liest und pro Issue einen (key, status, created) Record liefert.
+
+PYTHONPATH=. python demo/bench_stream_parser.py --issues 50000
+"""
+
+import argparse
+import io
+import json
+import time
+import tracemalloc
+
+from app.jira_stream_parser import issue_record, parse_search_page
+from demo.jira_stub_server import synthetic_issues
+
+CHUNK_SIZE = 16 * 1024  # wie JiraTicketFetcher.CHUNK_SIZE
+
+
+def search_response(count: int) -> bytes:
+    """ Antwort im Format von Jira Cloud, inklusive der Status-Details, die Jira immer mitliefert """
+    issues = [{
+        'expand': 'operations,versionedRepresentations,editmeta,changelog,renderedFields',
+        'id': issue['id'],
+        'self': f'https://example.atlassian.net/rest/api/3/issue/{issue["id"]}',
+        'key': issue['key'],
+        'fields': {
+            'status': {
+                'self': 'https://example.atlassian.net/rest/api/3/status/1',
+                'description': '',
+                'iconUrl': 'https://example.atlassian.net/images/icons/statuses/open.png',
+                'name': issue['fields']['status']['name'],
+                'id': '1',
+                'statusCategory': {'id': 2, 'key': 'new', 'colorName': 'blue-gray', 'name': 'To Do'},
+            },
+            'created': issue['fields']['created'],
+        },
+    } for issue in synthetic_issues(count)]
+    return json.dumps({'expand': 'schema,names', 'startAt': 0, 'maxResults': count, 'total': count,
+                       'issues': issues}).encode()
+
+
+def parse_document(body: bytes) -> list:
+    # Bisheriger Weg: ganzer Body als str, dann als dict
+    text = body.decode('utf-8')
+    return [issue_record(issue) for issue in json.JSONDecoder().decode(text)['issues']]
+
+
+def parse_stream(body: bytes) -> list:
+    stream = io.BytesIO(body)
+    return list(parse_search_page(iter(lambda: stream.read(CHUNK_SIZE), b'')))
+
+
+def measure(parse, body: bytes) -> dict:
+    start = time.perf_counter()
+    records = parse(body)
+    duration = time.perf_counter() - start
+    del records
+    tracemalloc.start()
+    records = parse(body)
+    # current: was nach dem Parsen bleibt (die Records), peak: Spitze während des Parsens
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'records': len(records), 'seconds': duration, 'kept': current, 'peak': peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Speicherbedarf des Parsens einer grossen Suchantwort')
+    parser.add_argument('--issues', type=int, default=50000)
+    args = parser.parse_args()
+
+    body = search_response(args.issues)
+    print(f'{args.issues} Issues, Body {len(body) / 2**20:.1f} MiB (nicht mitgezählt)')
+    print(f'{"parser":<10} {"records":>8} {"seconds":>8} {"kept MiB":>9} {"peak MiB":>9}')
+    for name, parse in (('document', parse_document), ('stream', parse_stream)):
+        result = measure(parse, body)
+        print(f'{name:<10} {result["records"]:>8} {result["seconds"]:>8.2f} {result["kept"] / 2**20:>9.1f} '
+              f'{result["peak"] / 2**20:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
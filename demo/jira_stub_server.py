@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Lokaler Jira-Ersatz für Benchmarks ohne echtes Jira
+Implementiert den OAuth Token-Endpunkt (client credentials) und den search-Endpunkt
+mit JQL-Filterung (app.jql) über einen synthetischen Ticket-Datensatz.
+Latenz, Fehlerrate, Rate-Limit (429 mit Retry-After) und Grösse des Datensatzes sind konfigurierbar.
+"""
+
+import argparse
+import json
+import random
+import socket
+import time
+import threading
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List
+
+from app.jql import JqlQuery, JqlError
+
+PROJECTS = ['APIM', 'AINT']
+STATUSES = ['Open', 'In Progress', 'Deferred', 'Checking', 'Done']
+COMPONENTS = ['Gateway', 'Portal', 'Backend']
+
+
+def jira_timestamp(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000+0000')
+
+
+def jira_reset_timestamp() -> str:
+    # Beginn des nächsten Rate-Limit-Fensters (ISO 8601 wie bei Jira Cloud)
+    return datetime.fromtimestamp(int(time.time()) + 1, timezone.utc).isoformat()
+
+
+def synthetic_issues(count: int, seed: int = 42, now: float = None) -> List[dict]:
+    """ Tickets verteilt über Projekte und Status, erstellt in den letzten 90 Tagen """
+    rng = random.Random(seed)
+    now = time.time() if now is None else now
+    issues = []
+    for i in range(count):
+        project = PROJECTS[i % len(PROJECTS)]
+        created = now - rng.uniform(0, 90 * 24 * 60 * 60)
+        issues.append({
+            'id': str(10000 + i),
+            'key': f'{project}-{i + 1}',
+            'fields': {
+                'summary': f'Synthetic ticket {i + 1}',
+                'project': {'key': project, 'name': f'{project} Project'},
+                'status': {'name': rng.choice(STATUSES)},
+                'components': [{'name': rng.choice(COMPONENTS)}],
+                'labels': rng.sample(['urgent', 'customer', 'internal'], rng.randint(0, 2)),
+                'created': jira_timestamp(created),
+                'updated': jira_timestamp(rng.uniform(created, now)),
+            }
+        })
+    return issues
+
+
+class JiraStubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1, damit Keep-Alive Verbindungen offen bleiben
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Simuliert die Round-Trips des TCP/TLS Handshakes einer neuen Verbindung
+        self.server.count('connections')
+        time.sleep(self.server.connect_latency)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}') if 'json' in self.headers.get('Content-Type', '') else {}
+        self.server.count('requests')
+        self.server.count('bytes_in', length)
+        time.sleep(self.server.sample_latency())
+
+        if self.path.endswith('/token'):
+            self._send_json({'access_token': 'stub-token', 'token_type': 'Bearer',
+                             'expires_in': self.server.token_lifetime})
+            return
+        if not self.server.admit():
+            self._send(429, b'{"errorMessages": ["Rate limit exceeded"]}',
+                       headers={'Retry-After': '1', 'X-RateLimit-Remaining': '0',
+                                'X-RateLimit-Reset': jira_reset_timestamp()})
+            return
+        if self.server.error_rate and self.server.rng.random() < self.server.error_rate:
+            self._send(503, b'<html><body>Service Unavailable</body></html>', 'text/html')
+            return
+        if self.path.endswith('/search'):
+            self._search(request)
+        elif self.path.endswith('/search/approximate-count') and self.server.approximate_count:
+            self._approximate_count(request)
+        else:
+            self._send(404, b'{"errorMessages": ["Not found"]}')
+
+    def _matches(self, request: dict):
+        try:
+            query = JqlQuery(request.get('jql', ''))
+        except JqlError as e:
+            self._send(400, json.dumps({'errorMessages': [str(e)]}).encode())
+            return None
+        now = time.time()
+        return [issue for issue in self.server.issues if query.matches(issue, now)]
+
+    def _approximate_count(self, request: dict):
+        matches = self._matches(request)
+        if matches is not None:
+            self._send_json({'count': len(matches)})
+
+    def _search(self, request: dict):
+        matches = self._matches(request)
+        if matches is None:
+            return
+        start_at = int(request.get('startAt', 0))
+        max_results = min(int(request.get('maxResults', 50)), 100)
+        fields = request.get('fields') or ['summary', 'status', 'created']
+        page = [{
+            'id': issue['id'],
+            'key': issue['key'],
+            'fields': {field: issue['fields'].get(field) for field in fields if field != 'key'},
+        } for issue in matches[start_at:start_at + max_results]]
+        self._send_json({'startAt': start_at, 'maxResults': max_results, 'total': len(matches), 'issues': page})
+
+    def _send_json(self, body: dict):
+        self._send(200, json.dumps(body).encode())
+
+    def _send(self, status: int, data: bytes, content_type: str = 'application/json', headers: dict = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.count('bytes_out', len(data))
+
+
+class JiraStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.005, connect_latency: float = 0.05,
+                 issue_count: int = 500, error_rate: float = 0.0, latency_sigma: float = 0.0,
+                 token_lifetime: int = 3600, seed: int = 42, rate_limit: float = 0,
+                 approximate_count: bool = True):
+        super().__init__(('127.0.0.1', port), JiraStubHandler)
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.connect_latency = connect_latency
+        self.error_rate = error_rate
+        self.token_lifetime = token_lifetime
+        self.rate_limit = rate_limit
+        self.approximate_count = approximate_count
+        self._window = (0, 0)
+        self.rng = random.Random(seed)
+        self.issues = synthetic_issues(issue_count, seed=seed)
+        self._stats_lock = threading.Lock()
+        self.stats = {'connections': 0, 'requests': 0, 'bytes_in': 0, 'bytes_out': 0, 'throttled': 0}
+
+    @property
+    def connections(self) -> int:
+        return self.stats['connections']
+
+    def count(self, name: str, value: int = 1):
+        with self._stats_lock:
+            self.stats[name] += value
+
+    def admit(self) -> bool:
+        # Höchstens rate_limit Requests pro Sekunde (festes Fenster), der Rest bekommt 429
+        if self.rate_limit <= 0:
+            return True
+        with self._stats_lock:
+            second = int(time.time())
+            window, count = self._window
+            count = count + 1 if window == second else 1
+            self._window = (second, count)
+            if count <= self.rate_limit:
+                return True
+            self.stats['throttled'] += 1
+            return False
+
+    def sample_latency(self) -> float:
+        # Mit latency_sigma > 0 lognormal verteilt (langer Schwanz), Median = latency
+        if self.latency_sigma <= 0:
+            return self.latency
+        with self._stats_lock:
+            return self.latency * self.rng.lognormvariate(0, self.latency_sigma)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def start(self) -> 'JiraStubServer':
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lokaler Jira-Ersatz für Benchmarks')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--issues', type=int, default=500, help='Grösse des synthetischen Datensatzes')
+    parser.add_argument('--latency', type=float, default=0.05, help='Median der Antwortzeit in Sekunden')
+    parser.add_argument('--latency-sigma', type=float, default=0.0, help='Streuung (lognormal) der Antwortzeit')
+    parser.add_argument('--connect-latency', type=float, default=0.05, help='Zeit für den Verbindungsaufbau')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Anteil der Requests mit 503')
+    parser.add_argument('--rate-limit', type=float, default=0, help='Requests pro Sekunde, darüber 429')
+    parser.add_argument('--no-approximate-count', action='store_true',
+                        help='ohne /search/approximate-count Endpunkt (wie Jira Data Center)')
+    args = parser.parse_args()
+
+    server = JiraStubServer(port=args.port, latency=args.latency, latency_sigma=args.latency_sigma,
+                            connect_latency=args.connect_latency, issue_count=args.issues,
+                            error_rate=args.error_rate, rate_limit=args.rate_limit,
+                            approximate_count=not args.no_approximate_count)
+    print(f'Jira Stand-in läuft auf {server.url} mit {args.issues} Tickets (Ctrl+C zum Beenden)')
+    print(f'BASE_URL={server.url}  ACCESS_TOKEN_URL={server.url}/token')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+import pytest
+
+
+class FakeClock(object):
+    """ Monotonic clock for tests: time only moves when a test sets now or sleep() is called """
+
+    def __init__(self, now: float = 0.0) -> None:
+        self.now = now
+        self.slept = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
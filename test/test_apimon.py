@@ -0,0 +1,76 @@
+import atexit
+import hashlib
+import hmac
+import importlib
+import json
+import sys
+import time
+
+import pytest
+
+from demo.jira_stub_server import JiraStubServer
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Builds the module level app of apimon against the Jira stand-in, in a directory with its own config
+    server = JiraStubServer(latency=0, connect_latency=0, issue_count=50).start()
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'config.json').write_text(json.dumps([
+        {'name': 'APIM', 'jira_filter': 'project = APIM', 'gpio_pin': 18, 'led_count': 10, 'offset': 0,
+         'fetch_mode': 'snapshot'},
+        {'name': 'AINT', 'jira_filter': 'project = AINT', 'gpio_pin': 19, 'led_count': 10, 'offset': 1},
+    ]))
+    (tmp_path / 'gitinfo.json').write_text(json.dumps({'version': '1.0', 'commit': 'abc123'}))
+    for name, value in {'OAUTHLIB_INSECURE_TRANSPORT': '1', 'ACCESS_TOKEN_URL': f'{server.url}/token',
+                        'CLIENT_ID': 'apimon-test', 'CLIENT_SECRET': 'secret', 'BASE_URL': server.url,
+                        'WEBHOOK_SECRET': 'webhook-secret'}.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delitem(sys.modules, 'apimon', raising=False)
+    app = importlib.import_module('apimon').app
+    yield app
+    # Do not shut Jira down under the running first fetch
+    wait_for(lambda: 'first_fetch' in app.test_client().get('/').get_json()['startup'])
+    cleanup = app.extensions['apimon']['cleanup']
+    cleanup()
+    atexit.unregister(cleanup)
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.02)
+
+
+def test_startup_reports_the_background_first_fetch(app):
+    # Test that the app is ready before the first fetch, which then shows up in the startup report and the tickets
+    client = app.test_client()
+    info = client.get('/').get_json()
+    assert {'config', 'git_info', 'stripes', 'scheduler', 'ready'} <= info['startup'].keys()
+    assert info['git_info']['commit'] == 'abc123'
+
+    wait_for(lambda: 'first_fetch' in client.get('/').get_json()['startup'])
+    info = client.get('/').get_json()
+    startup = info['startup']
+    assert startup['first_fetch']['finished_after_ms'] >= startup['ready']['finished_after_ms']
+    for stripe in info['led_stripes']:
+        (name, stripe_info), = stripe.items()
+        assert sum(ticket['count'] for ticket in stripe_info['tickets'].values()) > 0, name
+        assert stripe_info['polling']['failures'] == 0, name
+    assert info['query_planner']['requests_sent'] > 0
+    wait_for(lambda: client.get('/').get_json()['render_loop']['frames'] > 0)
+
+
+def test_webhook_is_wired_to_the_queue(app):
+    # Test that signed webhooks are queued and unsigned ones are rejected
+    client = app.test_client()
+    body = json.dumps({'webhookEvent': 'jira:issue_updated', 'issue': {'key': 'APIM-1'}}).encode()
+    signature = 'sha256=' + hmac.new(b'webhook-secret', body, hashlib.sha256).hexdigest()
+    assert client.post('/webhook/jira', data=body, content_type='application/json').status_code == 401
+    response = client.post('/webhook/jira', data=body, content_type='application/json',
+                           headers={'X-Hub-Signature': signature})
+    assert response.status_code == 202
+    assert client.get('/').get_json()['webhooks']['received'] == 1
@@ -1,4 +1,6 @@
-from app.models.color import Color
+import pytest
+
+from app.models.color import Color, ColorEffects, apply_lut, brightness_lut, gamma_lut
 
 
 def test_color_initialization():
@@ -89,3 +91,53 @@ def test_color_tuple_str():
     color = Color(10, 20, 30)
     assert color == Color.from_tuple_str(color.tuple_str)
 
+
+
+def test_color_is_immutable():
+    # Test that a color cannot be changed, shared instances stay valid
+    color = Color(10, 20, 30)
+    with pytest.raises(AttributeError):
+        color.r = 0
+    with pytest.raises(AttributeError):
+        color.effect = ColorEffects.overdue
+    assert not hasattr(color, '__dict__')
+
+
+def test_color_named_colors_are_shared():
+    # Test that named colors and parsed tuple strings return the same instance every time
+    assert Color.red is Color.red
+    assert Color.from_tuple_str('(1, 2, 3)') is Color.from_tuple_str('(1, 2, 3)')
+    assert Color.from_tuple((1, 2, 3)) is Color.from_tuple_str('(1,2,3)')
+    with pytest.raises(ValueError):
+        Color.from_tuple_str('red')
+
+
+def test_color_with_effect():
+    # Test that effects are separate shared variants and do not change the color value
+    overdue = Color.red.with_effect(ColorEffects.overdue)
+    assert overdue.effect == ColorEffects.overdue
+    assert Color.red.effect is None
+    assert overdue == Color.red
+    assert overdue is Color.red.with_effect(ColorEffects.overdue)
+    assert overdue.with_effect(None) is Color.red
+    assert str(overdue) == '(255, 0, 0) overdue'
+
+
+def test_brightness_lut_matches_float_formula():
+    # Test that the lookup tables give the values of the previous float calculation
+    for brightness in range(256):
+        lut = brightness_lut(brightness)
+        assert len(lut) == 256
+        assert all(lut[c] == int((brightness / 255) * c) for c in range(256))
+    assert brightness_lut(100) is brightness_lut(100)
+    assert Color(200, 100, 50).adjust_brightness(128).tuple == (100, 50, 25)
+
+
+def test_gamma_lut():
+    # Test the gamma table endpoints, monotony and the identity for gamma 1
+    lut = gamma_lut(2.8)
+    assert lut[0] == 0 and lut[255] == 255
+    assert all(a <= b for a, b in zip(lut, lut[1:]))
+    assert lut[128] < 128
+    assert gamma_lut(1.0) == bytes(range(256))
+    assert apply_lut((0, 128, 255), lut) == (0, lut[128], 255)
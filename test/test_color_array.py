@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from app.models.color import Color, ColorEffects, apply_lut, gamma_lut
+from app.models.color_array import ColorArray
+
+
+def random_colors(n: int, seed: int):
+    rng = random.Random(seed)
+    colors = [Color(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)) for _ in range(n)]
+    return [color.with_effect(ColorEffects.overdue) if i % 3 == 0 else color for i, color in enumerate(colors)]
+
+
+def test_roundtrip_with_effects():
+    # Test conversion from and to Color lists including the effects
+    colors = random_colors(50, seed=1)
+    array = ColorArray.from_colors(colors)
+    assert len(array) == 50 and array.rgb.shape == (50, 3) and array.rgb.dtype == np.uint8
+    assert array.to_colors() == colors
+    assert [color.effect for color in array.to_colors()] == [color.effect for color in colors]
+    assert array.tuples() == [color.tuple for color in colors]
+
+
+def test_brightness_matches_color():
+    # Test that every brightness level gives exactly the values of Color.adjust_brightness
+    colors = random_colors(100, seed=2)
+    array = ColorArray.from_colors(colors)
+    for brightness in range(256):
+        assert array.adjust_brightness(brightness).tuples() == [c.adjust_brightness(brightness).tuple for c in colors]
+    with pytest.raises(ValueError):
+        array.adjust_brightness(256)
+
+
+def test_saturating_add_and_sub():
+    # Test that add and sub clamp at 255 and 0 like Color
+    colors, others = random_colors(100, seed=3), random_colors(100, seed=4)
+    array, other = ColorArray.from_colors(colors), ColorArray.from_colors(others)
+    assert (array + other).tuples() == [(a + b).tuple for a, b in zip(colors, others)]
+    assert (array - other).tuples() == [(a - b).tuple for a, b in zip(colors, others)]
+
+
+def test_apply_effect_only_on_masked_pixels():
+    # Test that only the pixels with the effect are dimmed
+    colors = random_colors(30, seed=5)
+    result = ColorArray.from_colors(colors).apply_effect(ColorEffects.overdue, 100)
+    assert result.tuples() == [c.adjust_brightness(100).tuple if c.effect else c.tuple for c in colors]
+    assert result.mask(ColorEffects.overdue).tolist() == [c.effect is not None for c in colors]
+
+
+def test_apply_lut_matches_scalar():
+    # Test that a lookup table maps every pixel like apply_lut on the tuples
+    colors = random_colors(100, seed=5)
+    lut = gamma_lut(2.8)
+    result = ColorArray.from_colors(colors).apply_lut(lut)
+    assert result.tuples() == [apply_lut(color.tuple, lut) for color in colors]
+    assert result.effects.tolist() == ColorArray.from_colors(colors).effects.tolist()
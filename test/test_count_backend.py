@@ -0,0 +1,65 @@
+import pytest
+
+from app.count_backend import AutoCountBackend, SearchCountBackend, get_count_backend
+from app.exceptions import JiraResponseError
+
+BASE_URL = 'https://jira/rest/api/3'
+
+
+class FakeJira(object):
+
+    def __init__(self, count_status=None):
+        self.count_status = count_status
+        self.urls = []
+
+    def __call__(self, url, data):
+        self.urls.append(url)
+        if url.endswith('/approximate-count'):
+            if self.count_status:
+                raise JiraResponseError('error', self.count_status)
+            return {'count': 7}
+        return {'total': 7, 'issues': []}
+
+
+def test_search_backend():
+    # Test counting with search and maxResults 0
+    jira = FakeJira()
+    backend = SearchCountBackend(BASE_URL)
+    assert backend.count('project = APIM', jira) == 7
+    assert jira.urls == [f'{BASE_URL}/search']
+    assert backend.stats['requests'] == 1 and 'p50_ms' in backend.stats
+
+
+def test_auto_backend_uses_count_endpoint():
+    # Test that the dedicated endpoint is used when the server knows it
+    jira = FakeJira()
+    backend = AutoCountBackend(BASE_URL)
+    assert backend.count('project = APIM', jira) == 7
+    assert backend.count('project = APIM', jira) == 7
+    assert jira.urls == [f'{BASE_URL}/search/approximate-count'] * 2
+    assert backend.supported is True
+
+
+def test_auto_backend_falls_back_for_good():
+    # Test that a 404 switches to search once and the endpoint is not tried again
+    jira = FakeJira(count_status=404)
+    backend = AutoCountBackend(BASE_URL)
+    assert backend.count('project = APIM', jira) == 7
+    assert backend.count('project = APIM', jira) == 7
+    assert jira.urls == [f'{BASE_URL}/search/approximate-count', f'{BASE_URL}/search', f'{BASE_URL}/search']
+    assert backend.supported is False
+
+
+def test_auto_backend_does_not_hide_other_errors():
+    # Test that errors unrelated to the endpoint (e.g. invalid JQL) are raised
+    backend = AutoCountBackend(BASE_URL)
+    with pytest.raises(JiraResponseError):
+        backend.count('project = ', FakeJira(count_status=400))
+    assert backend.supported is None
+
+
+def test_backends_are_shared_per_instance():
+    # Test the registry and the validation of the backend name
+    assert get_count_backend(BASE_URL, 'search') is get_count_backend(BASE_URL, 'search')
+    with pytest.raises(ValueError):
+        get_count_backend(BASE_URL, 'unknown')
@@ -0,0 +1,37 @@
+import time
+
+from app.deadline_scheduler import DeadlineScheduler
+
+
+def test_pop_due_in_deadline_order():
+    # Test that stripes are returned once their deadline (plus grace) has passed, earliest first
+    scheduler = DeadlineScheduler(callback=lambda name: None)
+    scheduler.schedule('APIM', 200)
+    scheduler.schedule('AINT', 100)
+    assert scheduler.next_deadline() == 100
+    assert scheduler.pop_due(now=100) == []
+    assert scheduler.pop_due(now=300) == ['AINT', 'APIM']
+    assert scheduler.next_deadline() is None
+
+
+def test_rescheduling_supersedes_old_deadline():
+    # Test that only the latest deadline of a stripe counts and None removes it
+    scheduler = DeadlineScheduler(callback=lambda name: None)
+    scheduler.schedule('AINT', 100)
+    scheduler.schedule('AINT', 500)
+    assert scheduler.pop_due(now=200) == []
+    assert scheduler.next_deadline() == 500
+    scheduler.schedule('AINT', None)
+    assert scheduler.pop_due(now=1000) == []
+
+
+def test_callback_fires_at_deadline():
+    # Test that the worker thread wakes up for a deadline added while it sleeps
+    fired = []
+    scheduler = DeadlineScheduler(callback=lambda name: fired.append((name, time.time()))).start()
+    deadline = time.time() + 0.1
+    scheduler.schedule('AINT', deadline)
+    time.sleep(0.5)
+    scheduler.stop()
+    assert [name for name, _ in fired] == ['AINT']
+    assert deadline <= fired[0][1] < deadline + 0.3
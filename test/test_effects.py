@@ -0,0 +1,93 @@
+import pytest
+
+from app.effects import DEFAULT_EFFECTS, EFFECTS, EffectEngine, OverduePulse
+from app.models.color import Color, ColorEffects
+from app.status import STATUS
+
+
+def make_engine(clock, names, leds, status=STATUS.WORKING, overflow=False):
+    engine = EffectEngine(names, 2.0, clock=clock)
+    engine.prepare(leds, status, overflow)
+    return engine
+
+
+def test_registry():
+    # Test that every effect is registered by name and fade_in is opt-in
+    assert list(EFFECTS) == ['overdue', 'blink', 'chase', 'status', 'overflow', 'fade_in']
+    assert 'fade_in' not in DEFAULT_EFFECTS
+    with pytest.raises(ValueError):
+        EffectEngine(['overdue', 'sparkle'], 2.0)
+
+
+def test_layers_select_their_pixels(clock):
+    # Test that every layer only selects the pixels carrying its effect
+    leds = [Color.red, Color.green.with_effect(ColorEffects.overdue), Color.blue.with_effect(ColorEffects.blink),
+            Color.blue.with_effect(ColorEffects.chase), Color.blue.with_effect(ColorEffects.chase), Color.white]
+    engine = make_engine(clock, DEFAULT_EFFECTS, leds, overflow=True)
+    assert {layer.name: layer.indices for layer in engine.layers} == {
+        'overdue': [1], 'blink': [2], 'chase': [3, 4], 'status': [0], 'overflow': [5]}
+    assert engine.indices == [0, 1, 2, 3, 4, 5]
+
+
+def test_inactive_effects_cost_nothing(clock):
+    # Test that layers without pixels are never rendered
+    engine = make_engine(clock, DEFAULT_EFFECTS, [Color.red] * 10)
+    for k in range(10):
+        engine.frame(k * 0.1)
+    info = engine.get_info_dict()
+    assert info['status']['calls'] == 10
+    assert all(info[name]['calls'] == 0 and info[name]['avg_us'] is None for name in ('overdue', 'blink', 'chase'))
+
+
+def test_overflow_adds_to_overdue_pixel(clock):
+    # Test that later layers get the values of the layers below
+    leds = [Color.black] + [Color.red.with_effect(ColorEffects.overdue)] * 3
+    engine = make_engine(clock, ['overdue', 'overflow'], leds, overflow=True)
+    # cycle_time 0.5: overdue pixels at 192, overflow pulse at full brightness
+    values = dict(engine.frame(0.5))
+    assert values[1] == Color.red.adjust_brightness(192).tuple
+    assert values[3] == (255, 255, 255)
+    engine = make_engine(clock, ['overdue', 'overflow'], leds, overflow=True)
+    values = dict(engine.frame(1.5))
+    assert values[3] == Color.red.adjust_brightness(192).tuple
+
+
+def test_overdue_vectorized_matches_lut(monkeypatch, clock):
+    # Test that the NumPy path computes the same values as the lookup table
+    leds = [Color.black] + [Color(10 * i, 255 - i, 3 * i).with_effect(ColorEffects.overdue) for i in range(20)]
+    frames = []
+    for minimum in (1, 100):
+        monkeypatch.setattr(OverduePulse, 'VECTORIZE_MIN_LEDS', minimum)
+        engine = make_engine(clock, ['overdue'], leds)
+        frames.append([engine.frame(k * 0.07) for k in range(30)])
+    assert frames[0] == frames[1]
+
+
+def test_blink_and_chase(clock):
+    # Test blink halves and the running chase pixel
+    leds = [Color.red.with_effect(ColorEffects.blink)] + [Color.green.with_effect(ColorEffects.chase)] * 4
+    engine = make_engine(clock, ['blink', 'chase'], leds)
+    dimmed = Color.green.adjust_brightness(64).tuple
+    assert dict(engine.frame(0.2)) == {0: Color.red.tuple, 1: Color.green.tuple, 2: dimmed, 3: dimmed, 4: dimmed}
+    assert dict(engine.frame(0.7)) == {0: (0, 0, 0), 1: dimmed, 2: Color.green.tuple, 3: dimmed, 4: dimmed}
+    assert round(engine.idle_time(0.2, 0), 6) == 0.299
+
+
+def test_fade_in_runs_once_per_layout(clock):
+    # Test that changed pixels fade in after a new layout and the engine is transient meanwhile
+    engine = make_engine(clock, ['fade_in'], [Color.red] * 3)
+    assert engine.layers[0].indices == []
+    leds = [Color.red, Color.blue, Color.black]
+    clock.now = 10
+    engine.prepare(leds, STATUS.WORKING, False)
+    assert engine.layers[0].indices == [1]
+    clock.now = 10.5
+    assert engine.transient(engine.since())
+    assert engine.frame(0, engine.since()) == [(1, Color.blue.adjust_brightness(127).tuple)]
+    assert engine.idle_time(0, engine.since()) == 0
+    # A status change without a new layout does not restart the fade
+    engine.prepare(leds, STATUS.ERROR, False)
+    clock.now = 11
+    assert not engine.transient(engine.since())
+    assert engine.frame(0, engine.since()) == [(1, Color.blue.tuple)]
+    assert engine.layers[0].calls == 1
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pytest
+
+from app.fetch_engine import FetchEngine
+
+
+@pytest.fixture
+def engine():
+    engine = FetchEngine(max_concurrency=3)
+    yield engine
+    engine.shutdown()
+
+
+def test_pool_size_from_environment(monkeypatch):
+    # Test that JIRA_MAX_CONCURRENCY sets the query pool size unless it is passed explicitly
+    monkeypatch.setenv('JIRA_MAX_CONCURRENCY', '7')
+    assert FetchEngine().max_concurrency == 7
+    assert FetchEngine(max_concurrency=2).max_concurrency == 2
+    monkeypatch.delenv('JIRA_MAX_CONCURRENCY')
+    assert FetchEngine().max_concurrency == FetchEngine.MAX_CONCURRENCY
+
+
+def test_results_keep_the_order_of_items(engine):
+    # Test that results are returned in input order even if later items finish first
+    def slow_first(item):
+        time.sleep(0.05 if item == 0 else 0)
+        return item * 10
+
+    assert engine.map_queries(slow_first, range(6)) == [0, 10, 20, 30, 40, 50]
+
+
+def test_queries_never_exceed_the_pool_size(engine):
+    # Test that no more than max_concurrency queries run at the same time, also from several stripes
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def query(_):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+
+    engine.map_stripes(lambda stripe: engine.map_queries(query, range(5)), range(4))
+    assert running[1] == 3
+
+
+def test_first_error_is_raised(engine):
+    # Test that an exception of one query is raised to the caller
+    def query(item):
+        if item == 2:
+            raise ValueError('bad page')
+        return item
+
+    with pytest.raises(ValueError):
+        engine.map_queries(query, range(5))
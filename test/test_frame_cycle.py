@@ -0,0 +1,37 @@
+import math
+
+from app.frame_cycle import FrameCycle
+
+
+def square(cycle_time):
+    # Pixel 3 is on for the first half second, pixel 5 stays constant
+    on = 255 if cycle_time < 0.5 else 0
+    return [(3, (on, on, 0)), (5, (1, 2, 3))]
+
+
+def test_build_and_index():
+    # Test sampling, packing as bytes and the frame lookup from the cycle time
+    cycle = FrameCycle.build(period=2.0, rate=10, render=square)
+    assert len(cycle.frames) == 20 and cycle.indices == [3, 5]
+    assert cycle.frames[0] == bytes([255, 255, 0, 1, 2, 3])
+    assert cycle.nbytes == 20 * 6
+    assert cycle.index(0.05) == 0 and cycle.index(1.95) == 19
+    # The phase offset of a stripe runs past the end of the cycle
+    assert cycle.index(2.15) == 1
+
+
+def test_changes_between_frames():
+    # Test that only pixels differing from the previous frame are returned
+    cycle = FrameCycle.build(period=2.0, rate=10, render=square)
+    assert list(cycle.changes(0, None)) == [(3, (255, 255, 0)), (5, (1, 2, 3))]
+    assert list(cycle.changes(1, 0)) == []
+    assert list(cycle.changes(5, 4)) == [(3, (0, 0, 0))]
+
+
+def test_idle_time_until_next_change():
+    # Test the time until the replayed output changes, wrapping around the cycle
+    cycle = FrameCycle.build(period=2.0, rate=10, render=square)
+    assert math.isclose(cycle.idle_time(0.0), 0.499)
+    assert math.isclose(cycle.idle_time(1.0), 0.999)
+    static = FrameCycle.build(period=2.0, rate=10, render=lambda t: [(0, (1, 1, 1))])
+    assert static.idle_time(0.3) == math.inf
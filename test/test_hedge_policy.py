@@ -0,0 +1,55 @@
+from app.hedge_policy import HedgePolicy
+
+URL = 'https://jira/rest/api/3/search'
+
+
+def test_no_delay_without_enough_samples():
+    # Test that requests are not hedged before the latency of the URL is known
+    policy = HedgePolicy(ratio=0.1)
+    for _ in range(HedgePolicy.MIN_SAMPLES - 1):
+        policy.record_latency(URL, 0.05)
+    assert policy.delay(URL) is None
+    policy.record_latency(URL, 0.05)
+    assert policy.delay(URL) == 0.05
+
+
+def test_delay_follows_p95():
+    # Test that the hedge delay is the p95 of the recent latencies of the URL
+    policy = HedgePolicy(ratio=0.1)
+    for i in range(100):
+        policy.record_latency(URL, (i + 1) / 1000)
+    assert policy.delay(URL) == 0.096
+    assert policy.delay('https://jira/other') is None
+
+
+def test_budget_caps_hedge_ratio():
+    # Test that at most ratio hedges per request are allowed, with a limited burst
+    policy = HedgePolicy(ratio=0.1)
+    hedges = 0
+    for _ in range(1000):
+        policy.request()
+        hedges += policy.try_hedge()
+    assert hedges == 100
+    for _ in range(1000):
+        policy.request()
+    assert sum(policy.try_hedge() for _ in range(20)) == HedgePolicy.MAX_BUDGET
+
+
+def test_refund_returns_hedge():
+    # Test that an unsent hedge does not count against the budget
+    policy = HedgePolicy(ratio=0.5)
+    policy.request()
+    policy.request()
+    assert policy.try_hedge()
+    assert not policy.try_hedge()
+    policy.refund()
+    assert policy.try_hedge()
+    assert policy.hedges == 1
+
+
+def test_disabled_without_ratio():
+    # Test that hedging is off by default
+    policy = HedgePolicy(ratio=0)
+    policy.request()
+    assert not policy.enabled
+    assert not policy.try_hedge()
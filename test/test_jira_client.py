@@ -0,0 +1,131 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import pytest
+
+from app.exceptions import JiraResponseError, JiraTimeout
+from app.hedge_policy import HedgePolicy
+from app.jira_client import JiraClient
+
+
+class FakeTokenManager(object):
+
+    def __init__(self) -> None:
+        self.tokens = 0
+        self.invalidated = 0
+
+    def get_token(self) -> dict:
+        self.tokens += 1
+        return {'access_token': f'token-{self.tokens}'}
+
+    def invalidate(self) -> None:
+        self.invalidated += 1
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        server.requests.append((self.headers.get('Authorization'), self.client_address[1]))
+        delay, status = server.script.pop(0) if server.script else (0, 200)
+        time.sleep(delay)
+        if status is None:
+            # Drop the connection without an answer, like a stale keep-alive socket
+            self.close_connection = True
+            return
+        body = json.dumps({'total': 1}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    # Answers with the (delay, status) pairs of server.script (status None drops the connection), afterwards with 200
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.script = []
+    Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(server, read_timeout=5.0):
+    return JiraClient(f'http://127.0.0.1:{server.server_port}', timeout=(1, read_timeout),
+                      hedging=HedgePolicy(ratio=0))
+
+
+def test_read_timeout_is_not_retried(server):
+    # Test that a request running into the read timeout is sent once and counted once by the breaker
+    server.script = [(0.6, 200)]
+    client = make_client(server, read_timeout=0.3)
+    start = time.monotonic()
+    with pytest.raises(JiraTimeout):
+        client.post(f'{client.host}/search', {}, FakeTokenManager())
+    assert time.monotonic() - start < 0.6
+    assert len(server.requests) == 1
+    assert client.reconnects == 0
+    assert client.governor.stats['consecutive_failures'] == 1
+
+
+def test_only_count_requests_are_hedged(server):
+    # Test that a slow count is hedged while a slow streamed search is sent once
+    policy = HedgePolicy(ratio=1)
+    client = JiraClient(f'http://127.0.0.1:{server.server_port}', timeout=(1, 5), hedging=policy)
+    url = f'{client.host}/search'
+    for _ in range(policy.MIN_SAMPLES):
+        policy.record_latency(url, 0.01)
+    server.script = [(0.3, 200)]
+    client.post(url, {}, FakeTokenManager(), hedge=True).close()
+    assert len(server.requests) == 2 and policy.hedges == 1
+    server.script = [(0.3, 200), (0.3, 200)]
+    client.post(url, {}, FakeTokenManager(), stream=True, hedge=True).close()
+    client.post(url, {}, FakeTokenManager()).close()
+    assert len(server.requests) == 4 and policy.hedges == 1
+
+
+def test_connections_are_reused(server):
+    # Test that consecutive requests share one keep-alive connection
+    client = make_client(server)
+    for _ in range(3):
+        client.post(f'{client.host}/search', {}, FakeTokenManager()).close()
+    assert len({port for _, port in server.requests}) == 1
+    assert client.requests == 3 and client.reconnects == 0
+
+
+def test_dropped_connection_reconnects_once(server):
+    # Test that a connection closed by the server is replaced and the request sent again
+    client = make_client(server)
+    server.script = [(0, None)]
+    assert client.post(f'{client.host}/search', {}, FakeTokenManager()).json() == {'total': 1}
+    assert len(server.requests) == 2 and client.reconnects == 1
+
+
+def test_unauthorized_fetches_a_new_token(server):
+    # Test that a 401 invalidates the token and the request is repeated with a new one
+    client = make_client(server)
+    tokens = FakeTokenManager()
+    server.script = [(0, 401)]
+    client.post(f'{client.host}/search', {}, tokens).close()
+    assert tokens.invalidated == 1
+    assert [authorization for authorization, _ in server.requests] == ['Bearer token-1', 'Bearer token-2']
+
+
+def test_error_status_raises(server):
+    # Test that a server error is not returned as a search result
+    client = make_client(server)
+    server.script = [(0, 503)]
+    with pytest.raises(JiraResponseError) as error:
+        client.post(f'{client.host}/search', {}, FakeTokenManager())
+    assert error.value.status_code == 503
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from app.jira_stream_parser import SearchPageParser, issue_record, parse_search_page
+
+PAGE = {
+    'expand': 'schema,names',
+    'startAt': 0,
+    'maxResults': 100,
+    'total': 2,
+    'issues': [
+        {'key': 'APIM-1', 'fields': {'status': {'name': 'Open'}, 'created': '2024-01-15T10:00:00.000+0000',
+                                     'summary': 'Umlaute äöü, emoji 😀 and "quotes" ]}'}},
+        {'key': 'APIM-2', 'fields': {'status': {'name': 'Checking'}, 'created': '2024-01-16T10:00:00.000+0000',
+                                     'labels': None}},
+    ],
+    'isLast': True,
+    'nextPageToken': None,
+}
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 3, 64, 100000])
+def test_records_from_any_chunking(size):
+    # Test that records and top-level members are independent of where the chunks split the body
+    body = json.dumps(PAGE, ensure_ascii=False, indent=2).encode()
+    page = {}
+    records = list(parse_search_page(chunked(body, size), page))
+    assert records == [issue_record(issue) for issue in PAGE['issues']]
+    assert records[0][:2] == ('APIM-1', 'Open')
+    assert page == {key: value for key, value in PAGE.items() if key != 'issues'}
+
+
+def test_issues_are_yielded_while_reading():
+    # Test that an issue is available as soon as it is complete, before the rest of the body arrives
+    body = json.dumps(PAGE).encode()
+    second = body.index(b'{"key": "APIM-2"')
+    parser = SearchPageParser()
+    assert [issue['key'] for issue in parser.feed(body[:second])] == ['APIM-1']
+    assert [issue['key'] for issue in parser.feed(body[second:])] == ['APIM-2']
+    assert list(parser.close()) == []
+    assert parser.issue_count == 2
+
+
+def test_number_at_chunk_end_is_not_cut():
+    # Test that a number split by a chunk boundary is read completely
+    page = {}
+    assert list(parse_search_page([b'{"total": 12', b'34, "issues": []}'], page)) == []
+    assert page == {'total': 1234}
+
+
+@pytest.mark.parametrize('body', [b'', b'[]', b'{"issues": [1]}', b'{"issues": [{"key": "A-1"},', b'{"total": 1',
+                                  b'{"total": 1} trailing', b'<html>Service Unavailable</html>'])
+def test_invalid_body_raises(body):
+    # Test that truncated or invalid responses raise ValueError instead of returning partial data
+    with pytest.raises(ValueError):
+        list(parse_search_page([body], transform=lambda issue: issue))
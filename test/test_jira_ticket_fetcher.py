@@ -0,0 +1,168 @@
+import json
+import time
+
+import pytest
+from requests.exceptions import ConnectionError
+
+from app.jira_ticket_fetcher import JiraTicketFetcher
+
+
+class FakeResponse(object):
+
+    def __init__(self, body: dict) -> None:
+        self.text = json.dumps(body)
+
+    def iter_content(self, chunk_size):
+        data = self.text.encode()
+        return (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeJira(object):
+    """ Answers searches from a list of issues, paginated by startAt/total or by nextPageToken """
+
+    def __init__(self, tokens: bool = False) -> None:
+        self.issues = {}
+        self.updated = set()
+        self.tokens = tokens
+        self.requests = []
+        self.down = False
+        # Called after the answer of the next search is computed, before it is returned
+        self.before_answer = None
+
+    def add(self, key, status, hours_ago):
+        created = time.strftime('%Y-%m-%dT%H:%M:%S.000+0000', time.gmtime(time.time() - hours_ago * 3600))
+        self.issues[key] = {'key': key, 'fields': {'status': {'name': status}, 'created': created}}
+
+    def post(self, url, json, token_manager, stream=False, hedge=False):
+        if self.down:
+            raise ConnectionError('Jira is down')
+        self.requests.append(json)
+        response = self.answer(json)
+        if self.before_answer:
+            self.before_answer, before_answer = None, self.before_answer
+            before_answer()
+        return response
+
+    def answer(self, json):
+        issues = list(self.issues.values())
+        if 'updated >=' in json['jql']:
+            issues = [issue for issue in issues if issue['key'] in self.updated]
+        size = json['maxResults']
+        if self.tokens:
+            start = int(json.get('nextPageToken') or 0)
+            page = {'issues': issues[start:start + size], 'isLast': start + size >= len(issues)}
+            if not page['isLast']:
+                page['nextPageToken'] = str(start + size)
+            return FakeResponse(page)
+        start = json['startAt']
+        return FakeResponse({'startAt': start, 'maxResults': size, 'total': len(issues),
+                             'issues': issues[start:start + size]})
+
+
+def make_fetcher(monkeypatch, mode, jira):
+    monkeypatch.setenv('BASE_URL', 'https://jira.example/rest/api/2')
+    fetcher = JiraTicketFetcher(name='test', jira_filter='project = APIM', fetch_mode=mode, fetch_on_init=False)
+    fetcher._client = jira
+    fetcher.PAGE_SIZE = 2
+    return fetcher
+
+
+def counts(fetcher):
+    return {status: (ticket['count'], ticket['overdue']) for status, ticket in fetcher.tickets.items()}
+
+
+@pytest.mark.parametrize('tokens', [False, True], ids=['start_at', 'next_page_token'])
+def test_snapshot_counts_all_pages_locally(monkeypatch, tokens):
+    # Test that snapshot mode reads every page of one search and counts and ages the tickets locally
+    jira = FakeJira(tokens=tokens)
+    for key, status, hours_ago in [('A-1', 'Open', 4), ('A-2', 'Open', 1), ('A-3', 'Open', 5),
+                                   ('A-4', 'In Progress', 1), ('A-5', 'In Progress', 200)]:
+        jira.add(key, status, hours_ago)
+    fetcher = make_fetcher(monkeypatch, 'snapshot', jira)
+    fetcher.update_tickets()
+    assert counts(fetcher) == {'Open': (3, 2), 'In Progress': (2, 1), 'Deferred': (0, 0), 'Checking': (0, 0)}
+    assert len(jira.requests) == fetcher.requests_sent == 3
+    assert all('status in (' in request['jql'] for request in jira.requests)
+    assert fetcher.next_overdue_deadline() is not None
+
+
+def test_incremental_fetches_only_updated_tickets(monkeypatch):
+    # Test the full load, then a search for recently updated tickets applied to the index
+    jira = FakeJira()
+    jira.add('A-1', 'Open', 1)
+    jira.add('A-2', 'Open', 1)
+    fetcher = make_fetcher(monkeypatch, 'incremental', jira)
+    fetcher.update_tickets()
+    assert counts(fetcher)['Open'] == (2, 0)
+    jira.add('A-2', 'Checking', 1)
+    jira.add('A-3', 'Deferred', 1)
+    jira.updated = {'A-2', 'A-3'}
+    jira.requests.clear()
+    fetcher.update_tickets()
+    assert [request['jql'] for request in jira.requests] == ['project = APIM AND updated >= -2m']
+    assert counts(fetcher) == {'Open': (1, 0), 'In Progress': (0, 0), 'Deferred': (1, 0), 'Checking': (1, 0)}
+
+
+def test_failed_fetch_keeps_valid_tickets(monkeypatch):
+    # Test that a connection error is raised and the last tickets stay until they expire
+    jira = FakeJira()
+    jira.add('A-1', 'Open', 1)
+    fetcher = make_fetcher(monkeypatch, 'snapshot', jira)
+    fetcher.update_tickets()
+    jira.down = True
+    with pytest.raises(ConnectionError):
+        fetcher.update_tickets()
+    assert counts(fetcher)['Open'] == (1, 0)
+    fetcher._last_update -= fetcher.TIMEOUT
+    with pytest.raises(ConnectionError):
+        fetcher.update_tickets()
+    assert not fetcher.tickets
+
+
+def test_webhook_events_of_other_issues_do_not_refresh(monkeypatch):
+    # Test that only events concerning the filter extend how long the tickets stay valid
+    jira = FakeJira()
+    jira.add('A-1', 'Open', 1)
+    fetcher = make_fetcher(monkeypatch, 'snapshot', jira)
+    fetcher.update_tickets()
+    fetcher._last_update -= 100
+    last_update = fetcher._last_update
+    other = {'key': 'B-1', 'fields': {'project': {'key': 'AINT'}, 'status': {'name': 'Open'},
+                                      'created': jira.issues['A-1']['fields']['created']}}
+    assert fetcher.apply_events([('jira:issue_updated', other)]) == (0, False)
+    assert fetcher._last_update == last_update
+    issue = dict(jira.issues['A-1'], fields=dict(jira.issues['A-1']['fields'], project={'key': 'APIM'}))
+    assert fetcher.apply_events([('jira:issue_updated', issue)]) == (1, False)
+    assert fetcher._last_update > last_update
+
+
+@pytest.mark.parametrize('mode', ['snapshot', 'incremental'])
+def test_poll_does_not_overwrite_newer_webhook_events(monkeypatch, mode):
+    # Test that webhook events applied while a poll is running win over the older poll result
+    jira = FakeJira()
+    jira.add('A-1', 'Open', 1)
+    jira.add('A-2', 'Open', 1)
+    fetcher = make_fetcher(monkeypatch, mode, jira)
+    fetcher.update_tickets()
+
+    def webhook():
+        issue = jira.issues['A-1']
+        moved = dict(issue, fields=dict(issue['fields'], project={'key': 'APIM'}, status={'name': 'Checking'}))
+        fetcher.apply_events([('jira:issue_updated', moved), ('jira:issue_deleted', {'key': 'A-2'})])
+
+    jira.updated = {'A-1', 'A-2'}
+    jira.before_answer = webhook
+    fetcher.update_tickets()
+    assert counts(fetcher)['Open'] == (0, 0) and counts(fetcher)['Checking'] == (1, 0)
+    # The next poll started after the events sees the current state again
+    del jira.issues['A-2']
+    jira.updated = {'A-1'}
+    fetcher.update_tickets()
+    assert counts(fetcher)['Open'] == (1, 0) and counts(fetcher)['Checking'] == (0, 0)
+    assert not fetcher._webhook_changes
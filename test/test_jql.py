@@ -0,0 +1,83 @@
+import pytest
+
+from app.jql import JqlQuery, JqlError
+
+NOW = 1_700_000_000.0
+
+
+def issue(key='APIM-1', project='APIM', status='Open', labels=None, components=None, created=None):
+    return {
+        'key': key,
+        'fields': {
+            'project': {'key': project, 'name': f'{project} Project'},
+            'status': {'name': status},
+            'labels': labels or [],
+            'components': [{'name': name} for name in components or []],
+            'created': created or '2023-11-14T22:13:20.000+0000',
+        }
+    }
+
+
+def test_equals_and_in():
+    # Test = and IN against object fields, case insensitive
+    query = JqlQuery('project = apim AND status in ("Open", "In Progress")')
+    assert query.matches(issue(), NOW)
+    assert not query.matches(issue(status='Done'), NOW)
+    assert not query.matches(issue(project='AINT'), NOW)
+    assert query.fields == {'project', 'status'}
+
+
+def test_or_not_and_parentheses():
+    # Test operator precedence and negation
+    query = JqlQuery('project = AINT OR (project = APIM AND NOT labels = ignore)')
+    assert query.matches(issue(), NOW)
+    assert not query.matches(issue(labels=['ignore']), NOW)
+    assert query.matches(issue(project='AINT', labels=['ignore']), NOW)
+
+
+def test_not_equals_excludes_empty():
+    # Test that != and NOT IN do not match empty fields, like in Jira
+    assert not JqlQuery('component != Gateway').matches(issue(), NOW)
+    assert JqlQuery('component != Gateway').matches(issue(components=['Portal']), NOW)
+    assert JqlQuery('component is EMPTY').matches(issue(), NOW)
+    assert JqlQuery('component not in (Gateway, Portal)').matches(issue(components=['Other']), NOW)
+
+
+def test_unresolved_is_empty_resolution():
+    # Test that resolution = Unresolved matches issues without resolution, like in Jira
+    resolved = issue()
+    resolved['fields']['resolution'] = {'name': 'Fixed'}
+    unresolved = issue()
+    unresolved['fields']['resolution'] = None
+    assert JqlQuery('project = APIM AND resolution = Unresolved').matches(unresolved, NOW)
+    assert not JqlQuery('resolution = Unresolved').matches(resolved, NOW)
+    assert JqlQuery('resolution in (Unresolved, Fixed)').matches(resolved, NOW)
+    assert JqlQuery('resolution != Unresolved').matches(resolved, NOW)
+    assert not JqlQuery('resolution != Unresolved').matches(unresolved, NOW)
+
+
+def test_relative_dates():
+    # Test created <= -3h against a ticket created exactly 3h before NOW
+    created = '2023-11-14T19:13:20.000+0000'
+    assert JqlQuery('created <= -3h').matches(issue(created=created), NOW)
+    assert not JqlQuery('created <= -4h').matches(issue(created=created), NOW)
+    assert JqlQuery('created > -1w').matches(issue(created=created), NOW)
+
+
+def test_order_by_is_stripped_from_condition():
+    # Test that ORDER BY is not part of the condition used for combined queries
+    query = JqlQuery('project = APIM ORDER BY created DESC')
+    assert query.condition == 'project = APIM'
+
+
+@pytest.mark.parametrize('jql', [
+    'summary ~ "error"',
+    'assignee = currentUser()',
+    'status WAS Open',
+    'created = -1d',
+    'project = APIM AND',
+])
+def test_unsupported_jql(jql):
+    # Test that JQL outside of the supported subset is rejected
+    with pytest.raises(JqlError):
+        JqlQuery(jql)
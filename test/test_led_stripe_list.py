@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.JTLS.JiraTicketLedStripeList import JiraTicketLedStripeList
+from app.poll_scheduler import AdaptivePollScheduler
+
+
+class FakeStripe(object):
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.ticket_fetcher = SimpleNamespace(next_overdue_deadline=lambda: None)
+
+    def ticket_counts(self):
+        return {}
+
+
+class FailingPlanner(object):
+
+    def update_tickets(self, stripes):
+        raise KeyError('fields')
+
+
+def make_list(names, planner):
+    # Build the list without config.json and without background threads
+    stripes = JiraTicketLedStripeList.__new__(JiraTicketLedStripeList)
+    stripes.extend(FakeStripe(name) for name in names)
+    stripes.query_planner = planner
+    stripes.poll_scheduler = AdaptivePollScheduler(names, now=0)
+    stripes.deadline_scheduler = SimpleNamespace(schedule=lambda name, deadline: None)
+    return stripes
+
+
+def test_unexpected_errors_release_claimed_stripes():
+    # Test that stripes claimed for an update are released and backed off when the update raises
+    stripes = make_list(['a', 'b'], FailingPlanner())
+    with pytest.raises(KeyError):
+        stripes.update_tickets()
+    for name in ('a', 'b'):
+        info = stripes.poll_scheduler.get_info_dict(name)
+        assert not info['running'] and info['failures'] == 1
+    assert stripes.poll_scheduler.claim(['a', 'b']) == ['a', 'b']
+
+
+def test_webhooks_only_slow_down_stripes_that_consume_events():
+    # Test that only stripes whose filter matched an event switch to the reconcile interval
+    stripes = make_list(['a', 'b'], FailingPlanner())
+    for stripe, consumed in zip(stripes, (1, 0)):
+        stripe.ticket_fetcher.can_apply_events = True
+        stripe.apply_webhook_events = lambda events, consumed=consumed: consumed
+    stripes.apply_webhook_events([('jira:issue_updated', {'key': 'ABC-1'})])
+    assert stripes.poll_scheduler.get_info_dict('a')['webhook']
+    assert not stripes.poll_scheduler.get_info_dict('b')['webhook']
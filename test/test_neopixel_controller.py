@@ -0,0 +1,152 @@
+import threading
+import time
+
+import pytest
+
+from app import neopixel_controller
+from app.models.color import Color, ColorEffects
+from app.neopixel_controller import NeoPixelController
+from app.status import STATUS
+
+
+@pytest.fixture(params=[False, True], ids=['computed', 'frame_cycle'])
+def controller(request, capsys):
+    controller = NeoPixelController(led_count=10, gpio_pin=18, name='test', offset=0.3, init_animation=False,
+                                    frame_cycle=request.param)
+    yield controller
+    controller.on_change = None
+
+
+def render_at(controller, monkeypatch, t):
+    monkeypatch.setattr(neopixel_controller.time, 'monotonic', lambda: t)
+    controller.update()
+    return [controller._pixels[i] for i in range(controller._pixels.n)]
+
+
+@pytest.mark.parametrize('overdue', [False, True])
+def test_idle_time_has_no_output_change(controller, monkeypatch, overdue):
+    # Test that the output does not change within the reported idle time, sampled over two periods
+    leds = [Color.red] * 5 + [Color.blue.with_effect(ColorEffects.overdue) if overdue else Color.blue] * 5
+    controller.set_leds(leds)
+    controller.set_overflow(True)
+    idle_samples = 0
+    for k in range(400):
+        t = 1000 + k * 0.01
+        pixels = render_at(controller, monkeypatch, t)
+        idle = controller.idle_time()
+        if idle > 0:
+            idle_samples += 1
+            assert render_at(controller, monkeypatch, t + idle) == pixels
+    # Without overdue LEDs the status LED is dark half of the time
+    assert idle_samples > (20 if overdue else 150)
+
+
+def test_state_changes_notify(controller):
+    # Test that only actual state changes call on_change
+    calls = []
+    controller.on_change = lambda: calls.append(1)
+    controller.set_error(False)
+    controller.set_error(True)
+    controller.set_overflow(True)
+    controller.set_leds([Color.red] * 10)
+    assert len(calls) == 3
+    assert controller.idle_time() == 0
+
+
+def test_frame_cycle_replays_computed_frames(monkeypatch, capsys):
+    # Test that the replayed frames equal the computed ones at the sample times
+    leds = [Color.red] * 3 + [Color.green.with_effect(ColorEffects.overdue)] * 4 + [Color.blue] * 3
+    controllers = [NeoPixelController(led_count=10, gpio_pin=18, name='test', offset=0.3, init_animation=False,
+                                      frame_cycle=frame_cycle) for frame_cycle in (False, True)]
+    for controller in controllers:
+        controller.set_leds(leds)
+        controller.set_overflow(True)
+    sample = NeoPixelController.PULSING_PERIOD / (NeoPixelController.PULSING_PERIOD * NeoPixelController.FRAME_CYCLE_RATE)
+    for k in range(0, 200, 7):
+        # Sample time of the cycle, without the offset of the stripe
+        t = 1000 + k * sample - 0.3 + 1e-6
+        computed, replayed = (render_at(controller, monkeypatch, t) for controller in controllers)
+        assert replayed == computed
+
+
+def test_setters_publish_versions(controller):
+    # Test that every actual change publishes a new immutable state
+    state = controller._state
+    controller.set_error(False)
+    assert controller._state is state
+    controller.set_overflow(True)
+    controller.set_leds([Color.red] * 10)
+    assert controller.version == state.version + 2
+    assert controller.overflow and controller.leds == [Color.red] * 10
+    with pytest.raises(AttributeError):
+        controller._state.error = True
+    assert state.overflow is False
+
+
+def test_setters_do_not_wait_for_show(controller):
+    # Test that a writer is not blocked while the render thread is inside show()
+    in_show, release = threading.Event(), threading.Event()
+
+    def slow_show():
+        in_show.set()
+        release.wait(2)
+
+    controller.set_leds([Color.red] * 10)
+    controller._pixels.show = slow_show
+    renderer = threading.Thread(target=controller.update)
+    renderer.start()
+    assert in_show.wait(2)
+    start = time.perf_counter()
+    controller.set_error(True)
+    controller.set_leds([Color.blue] * 10)
+    assert time.perf_counter() - start < 0.1
+    assert controller.leds == [Color.blue] * 10
+    release.set()
+    renderer.join()
+    # The next frame picks up the new state
+    controller._pixels.show = lambda: None
+    controller.update()
+    assert controller.status == STATUS.ERROR
+    assert controller._pixels[5] == Color.blue.tuple
+
+
+@pytest.mark.parametrize('frame_cycle', [False, True], ids=['computed', 'frame_cycle'])
+def test_fade_in_hands_over_to_the_cycle(monkeypatch, capsys, frame_cycle):
+    # Test that a one-off effect is computed every frame and the stripe then shows the layout again
+    controller = NeoPixelController(led_count=10, gpio_pin=18, name='test', init_animation=False,
+                                    frame_cycle=frame_cycle, effects=['overdue', 'status', 'fade_in'])
+    monkeypatch.setattr(controller.effects, '_clock', lambda: neopixel_controller.time.monotonic())
+    render_at(controller, monkeypatch, 1000)
+    controller.set_leds([Color.red] * 5 + [Color.blue] * 5)
+    render_at(controller, monkeypatch, 1000.1)
+    controller.set_leds([Color.red] * 5 + [Color.green] * 5)
+    # The fade starts with the first frame of the new layout
+    assert render_at(controller, monkeypatch, 1000.6)[7] == (0, 0, 0)
+    assert render_at(controller, monkeypatch, 1001.1)[7] == Color.green.adjust_brightness(127).tuple
+    assert controller.idle_time() == 0
+    assert render_at(controller, monkeypatch, 1001.7)[7] == Color.green.tuple
+    assert render_at(controller, monkeypatch, 1001.8)[7] == Color.green.tuple
+    assert controller.idle_time() > 0
+
+
+def test_overdue_variant_of_same_color_pulses(controller, monkeypatch):
+    # Test that a LED turning overdue without changing its RGB value starts pulsing
+    controller.set_leds([Color.red] * 10)
+    render_at(controller, monkeypatch, 1000)
+    controller.set_leds([Color.red] * 2 + [Color.red.with_effect(ColorEffects.overdue)] + [Color.red] * 7)
+    values = {render_at(controller, monkeypatch, 1000 + k * 0.1)[2] for k in range(20)}
+    assert len(values) > 1
+
+
+def test_publish_sets_several_values_in_one_version(controller):
+    # Test that publish() swaps one state holding all values and notifies once
+    calls = []
+    controller.on_change = lambda: calls.append(1)
+    controller.set_error(True)
+    version = controller.version
+    controller.publish(leds=[Color.green] * 10, overflow=True, error=False)
+    assert controller.version == version + 1 and len(calls) == 2
+    state = controller._state
+    assert state.leds == [Color.green] * 10 and state.overflow and not state.error and not state.init
+    controller.publish(overflow=True, error=False)
+    assert controller.version == version + 1
@@ -0,0 +1,138 @@
+from threading import Event, Thread
+
+import pytest
+from requests.exceptions import ConnectionError, ReadTimeout
+
+from app import oauth_token_manager
+from app.oauth_token_manager import OAuthTokenManager
+
+
+class FakeTokenServer(object):
+
+    def __init__(self) -> None:
+        self.fetches = 0
+        self.fail = False
+        self.expires_in = 600
+        self.timeouts = []
+        # With release set, every token request hangs until the test sets the event
+        self.release = None
+        self.started = Event()
+
+    def fetch_token(self, session, token_url, auth, scope, timeout=None):
+        self.timeouts.append(timeout)
+        self.started.set()
+        if self.release is not None:
+            self.release.wait(5)
+        if self.fail:
+            raise self.fail
+        self.fetches += 1
+        return {'access_token': f'token-{self.fetches}', 'expires_in': self.expires_in}
+
+
+@pytest.fixture
+def token_server(monkeypatch):
+    server = FakeTokenServer()
+    monkeypatch.setattr(oauth_token_manager.OAuth2Session, 'fetch_token',
+                        lambda session, token_url, auth, scope, timeout=None:
+                        server.fetch_token(session, token_url, auth, scope, timeout))
+    return server
+
+
+@pytest.fixture
+def manager(token_server, monkeypatch, clock):
+    monkeypatch.setattr(oauth_token_manager.time, 'time', clock)
+    manager = OAuthTokenManager('https://auth.example/token', 'client', 'secret', 'read', timeout=(2, 7))
+    # Record the background refreshes instead of starting timers
+    manager.scheduled = []
+    monkeypatch.setattr(manager, '_schedule_refresh', manager.scheduled.append)
+    return manager
+
+
+def test_token_is_cached_until_shortly_before_expiry(manager, token_server, clock):
+    # Test that the token is reused until EXPIRY_MARGIN seconds before it expires
+    assert manager.get_token()['access_token'] == 'token-1'
+    clock.now += 600 - manager.EXPIRY_MARGIN - 1
+    assert manager.get_token()['access_token'] == 'token-1'
+    clock.now += 1
+    assert manager.get_token()['access_token'] == 'token-2'
+    assert (manager.hits, manager.misses) == (1, 2)
+    assert manager.scheduled == [600, 600]
+
+
+def test_short_lived_token_is_cached(manager, token_server, clock):
+    # Test that a token living shorter than EXPIRY_MARGIN is still reused for half of its lifetime
+    token_server.expires_in = 20
+    manager.get_token()
+    clock.now += 9
+    assert manager.get_token()['access_token'] == 'token-1'
+    clock.now += 1
+    assert manager.get_token()['access_token'] == 'token-2'
+    assert manager.scheduled == [20, 20]
+
+
+def test_invalidate_forces_a_new_token(manager, token_server):
+    # Test that a token dropped after a 401 is fetched again on the next call
+    manager.get_token()
+    manager.invalidate()
+    assert manager.get_token()['access_token'] == 'token-2'
+    assert token_server.fetches == 2
+
+
+def test_background_refresh(manager, token_server, clock):
+    # Test that a refresh replaces the token and a failed refresh keeps the old one
+    manager.get_token()
+    manager._refresh()
+    assert manager.get_token()['access_token'] == 'token-2'
+    token_server.fail = ConnectionError('token endpoint down')
+    manager._refresh()
+    assert manager.get_token()['access_token'] == 'token-2'
+    assert manager.refreshes == 2
+    clock.now += 600
+    with pytest.raises(ConnectionError):
+        manager.get_token()
+
+
+def test_token_request_has_a_timeout(manager, token_server):
+    # Test that the token endpoint is asked with the client timeout and a read timeout counts as connection error
+    manager.get_token()
+    assert token_server.timeouts == [(2, 7)]
+    token_server.fail = ReadTimeout('token endpoint hangs')
+    manager.invalidate()
+    with pytest.raises(ConnectionError):
+        manager.get_token()
+
+
+def test_concurrent_callers_share_one_token_request(manager, token_server):
+    # Test that callers without a token wait for the running request instead of sending their own
+    token_server.release = Event()
+    tokens = []
+    threads = [Thread(target=lambda: tokens.append(manager.get_token()['access_token'])) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    token_server.started.wait(5)
+    token_server.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert tokens == ['token-1'] * 3
+    assert token_server.fetches == 1
+
+
+def test_refresh_does_not_block_a_valid_token(manager, token_server):
+    # Test that a hanging background refresh does not hold up callers while the token is still valid
+    manager.get_token()
+    token_server.release = Event()
+    token_server.started.clear()
+    refresh = Thread(target=manager._refresh)
+    refresh.start()
+    token_server.started.wait(5)
+    assert manager.get_token()['access_token'] == 'token-1'
+    token_server.release.set()
+    refresh.join(5)
+    assert manager.get_token()['access_token'] == 'token-2'
+
+
+def test_instances_are_shared_per_client():
+    # Test that all stripes of one OAuth client share one manager
+    first = OAuthTokenManager.get_instance('https://auth.example/token', 'shared', 'secret', 'read')
+    assert OAuthTokenManager.get_instance('https://auth.example/token', 'shared', 'other', 'read') is first
+    assert OAuthTokenManager.get_instance('https://auth.example/token', 'other', 'secret', 'read') is not first
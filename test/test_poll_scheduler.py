@@ -0,0 +1,80 @@
+import pytest
+
+from app.poll_scheduler import AdaptivePollScheduler
+
+
+@pytest.fixture
+def scheduler():
+    # rng 0.5: the first run lies in the middle of the first interval and there is no jitter
+    return AdaptivePollScheduler(['AINT', 'APIM'], now=0, rng=lambda: 0.5)
+
+
+def test_initial_runs_are_spread(scheduler):
+    # Test that the first run lies within the first interval
+    assert scheduler.next_run('AINT') == AdaptivePollScheduler.DEFAULT_INTERVAL / 2
+    assert scheduler.due(now=0) == []
+    assert scheduler.due(now=30) == ['AINT', 'APIM']
+
+
+def test_running_stripes_are_coalesced(scheduler):
+    # Test that a stripe still running is not due again
+    assert scheduler.due(now=30) == ['AINT', 'APIM']
+    assert scheduler.due(now=1000) == []
+    scheduler.record('AINT', ok=True, changed=False, latency=0.1, now=1000)
+    assert scheduler.due(now=5000) == ['AINT']
+
+
+def test_interval_adapts_to_change_rate(scheduler):
+    # Test that the interval shrinks on changes and grows while stable, within the limits
+    scheduler.due(now=30)
+    scheduler.record('AINT', ok=True, changed=True, latency=0.1, now=30)
+    assert scheduler.interval('AINT') == AdaptivePollScheduler.MIN_INTERVAL
+    for _ in range(20):
+        scheduler.record('APIM', ok=True, changed=False, latency=0.1, now=30)
+    assert scheduler.interval('APIM') == AdaptivePollScheduler.MAX_INTERVAL
+
+
+def test_errors_back_off_exponentially(scheduler):
+    # Test exponential backoff on connection errors, capped at MAX_BACKOFF
+    interval = scheduler.interval('AINT')
+    scheduler.record('AINT', ok=False, changed=False, latency=5, now=0)
+    assert scheduler.next_run('AINT') == interval * 2
+    scheduler.record('AINT', ok=False, changed=False, latency=5, now=0)
+    assert scheduler.next_run('AINT') == interval * 4
+    for _ in range(10):
+        scheduler.record('AINT', ok=False, changed=False, latency=5, now=0)
+    assert scheduler.next_run('AINT') == AdaptivePollScheduler.MAX_BACKOFF
+    scheduler.record('AINT', ok=True, changed=False, latency=0.1, now=0)
+    assert scheduler.get_info_dict('AINT')['failures'] == 0
+
+
+def test_claim_skips_running_stripes():
+    # Test that claim marks stripes regardless of their schedule, but never a running stripe twice
+    scheduler = AdaptivePollScheduler(['A', 'B'], now=0, rng=lambda: 0.5)
+    assert scheduler.claim(['A', 'B']) == ['A', 'B']
+    assert scheduler.due(now=1000) == []
+    scheduler.record('A', ok=True, changed=False, latency=0.1, now=1000)
+    assert scheduler.claim(['A', 'B']) == ['A']
+
+
+def test_webhooks_switch_to_reconcile_interval(scheduler):
+    # Test that stripes fed by webhooks are only reconciled, until the webhooks stop
+    scheduler.webhook_applied('AINT', now=10)
+    assert scheduler.next_run('AINT') == 10 + AdaptivePollScheduler.RECONCILE_INTERVAL
+    scheduler.record('AINT', ok=True, changed=True, latency=0.1, now=20)
+    assert scheduler.next_run('AINT') == 20 + AdaptivePollScheduler.RECONCILE_INTERVAL
+    assert scheduler.get_info_dict('AINT')['webhook'] is False  # the info uses the real time
+    later = 10 + AdaptivePollScheduler.WEBHOOK_TIMEOUT
+    scheduler.record('AINT', ok=True, changed=False, latency=0.1, now=later)
+    assert scheduler.next_run('AINT') == later + scheduler.interval('AINT')
+
+
+def test_trigger_polls_soon_but_spaced(scheduler):
+    # Test that a trigger moves the next run forward, at most to TRIGGER_SPACING after the last run
+    scheduler.record('AINT', ok=True, changed=False, latency=0.1, now=100)
+    scheduler.trigger('AINT', now=102)
+    assert scheduler.next_run('AINT') == 100 + AdaptivePollScheduler.TRIGGER_SPACING
+    scheduler.trigger('AINT', now=200)
+    assert scheduler.next_run('AINT') == 100 + AdaptivePollScheduler.TRIGGER_SPACING
+    scheduler.trigger('APIM', now=15)
+    assert scheduler.next_run('APIM') == 15
@@ -0,0 +1,152 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from requests.exceptions import ConnectionError
+
+from app.JTLS.JiraQueryPlanner import JiraQueryPlanner
+from app.fetch_engine import FetchEngine
+from app.jira_ticket_fetcher import JiraTicketFetcher
+from app.jql import JqlQuery
+
+
+class FakeResponse(object):
+
+    def __init__(self, body: dict) -> None:
+        self.text = json.dumps(body)
+
+    def iter_content(self, chunk_size):
+        data = self.text.encode()
+        return (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeJira(object):
+    """ Evaluates the JQL of every search and count against a list of issues """
+
+    def __init__(self) -> None:
+        self.issues = []
+        self.searches = []
+        self.counts = []
+        self.error = None
+
+    def add(self, key, project, status, hours_ago=1):
+        created = time.strftime('%Y-%m-%dT%H:%M:%S.000+0000', time.gmtime(time.time() - hours_ago * 3600))
+        self.issues.append({'key': key, 'fields': {'project': {'key': project}, 'status': {'name': status},
+                                                   'created': created}})
+
+    def post(self, url, json, token_manager, stream=False, hedge=False):
+        if self.error:
+            raise self.error
+        issues = [issue for issue in self.issues if JqlQuery(json['jql']).matches(issue)]
+        if not stream:
+            self.counts.append(json['jql'])
+            return FakeResponse({'total': len(issues), 'count': len(issues)})
+        self.searches.append(json)
+        start, size = json['startAt'], json['maxResults']
+        return FakeResponse({'startAt': start, 'maxResults': size, 'total': len(issues),
+                             'issues': issues[start:start + size]})
+
+
+class FakeStripe(object):
+    """ Updates like JiraTicketLedStripe and records the resulting state instead of lighting LEDs """
+
+    def __init__(self, name, jira_filter, mode, jira) -> None:
+        self.name = name
+        self.jira_filter = jira_filter
+        self.ticket_fetcher = JiraTicketFetcher(name=name, jira_filter=jira_filter, fetch_mode=mode,
+                                                fetch_on_init=False)
+        self.ticket_fetcher._client = jira
+        self.state = None
+
+    def update_tickets(self, fetch=None):
+        try:
+            (fetch or self.ticket_fetcher.update_tickets)()
+        except ConnectionError:
+            self.state = 'connection_error'
+        except Exception:
+            self.state = 'error'
+        else:
+            self.state = 'ok'
+            return True
+        return False
+
+    def counts(self):
+        return {status: ticket['count'] for status, ticket in self.ticket_fetcher.tickets.items() if ticket['count']}
+
+
+@pytest.fixture
+def jira(monkeypatch):
+    monkeypatch.setenv('BASE_URL', 'https://jira.example/rest/api/2')
+    jira = FakeJira()
+    for key, project, status in [('A-1', 'APIM', 'Open'), ('A-2', 'APIM', 'Checking'), ('B-1', 'AINT', 'Open'),
+                                 ('C-1', 'OTHER', 'Open')]:
+        jira.add(key, project, status)
+    return jira
+
+
+@pytest.fixture
+def planner():
+    engine = FetchEngine(max_concurrency=2)
+    yield JiraQueryPlanner(fetch_engine=engine)
+    engine.shutdown()
+
+
+def stripe(name, mode, jira_filter='project = ABC'):
+    return SimpleNamespace(name=name, jira_filter=jira_filter, ticket_fetcher=SimpleNamespace(fetch_mode=mode))
+
+
+def test_plan():
+    # Test that snapshot stripes are combined, count stripes with identical filters share a unit and the rest is alone
+    stripes = [stripe('a', 'count'), stripe('b', 'count', ' project = ABC '), stripe('c', 'snapshot'),
+               stripe('d', 'snapshot', 'project = XYZ'), stripe('e', 'incremental'), stripe('f', 'count', 'project = X'),
+               stripe('g', 'snapshot', 'summary ~ "error"')]
+    units = JiraQueryPlanner(fetch_engine=None).plan(stripes)
+    assert [[s.name for s in unit] for unit in units] == [['e'], ['a', 'b'], ['f'], ['g'], ['c', 'd']]
+
+
+def test_combined_search_is_split_by_filter(jira, planner):
+    # Test that one OR-combined search feeds every snapshot stripe with the issues matching its own filter
+    stripes = [FakeStripe('a', 'project = APIM', 'snapshot', jira), FakeStripe('b', 'project = AINT', 'snapshot', jira),
+               FakeStripe('c', 'project = APIM AND status = Checking', 'snapshot', jira)]
+    planner.update_tickets(stripes)
+    assert [search['jql'] for search in jira.searches] == [
+        '((project = APIM) OR (project = AINT) OR (project = APIM AND status = Checking)) AND '
+        'status in ("Open", "In Progress", "Deferred", "Checking")']
+    assert [s.counts() for s in stripes] == [{'Open': 1, 'Checking': 1}, {'Open': 1}, {'Checking': 1}]
+    # Alone every stripe would have needed one search
+    assert (planner.last_requests_sent, planner.last_requests_saved) == (1, 2)
+
+
+def test_identical_count_filters_are_queried_once(jira, planner):
+    # Test that count stripes with the same filter share the count queries of the first stripe
+    stripes = [FakeStripe('a', 'project = APIM', 'count', jira), FakeStripe('b', 'project = APIM', 'count', jira)]
+    planner.update_tickets(stripes)
+    # Four status counts and one overdue count for each status with tickets
+    assert len(jira.counts) == planner.last_requests_sent == 6
+    assert planner.last_requests_saved == 6
+    assert stripes[0].counts() == stripes[1].counts() == {'Open': 1, 'Checking': 1}
+    assert stripes[1].ticket_fetcher.tickets is not stripes[0].ticket_fetcher.tickets
+    jira.error = ConnectionError('Jira is down')
+    planner.update_tickets(stripes)
+    assert [s.state for s in stripes] == ['connection_error', 'connection_error']
+    assert planner.last_requests_saved == 0
+
+
+@pytest.mark.parametrize('error', [KeyError('fields'), ConnectionError('Jira is down')], ids=['key_error', 'connection'])
+def test_failed_combined_search_fails_every_stripe_of_the_unit(jira, planner, error):
+    # Test that any error of a combined search reaches all its stripes and leaves the other units alone
+    stripes = [FakeStripe('a', 'project = APIM', 'snapshot', jira), FakeStripe('b', 'project = AINT', 'snapshot', jira),
+               FakeStripe('c', 'project = OTHER', 'count', jira)]
+    planner.update_tickets(stripes)
+    jira.error = error
+    stripes[2].ticket_fetcher._client = FakeJira()
+    results = planner.update_tickets(stripes)
+    assert {name: ok for name, (ok, _) in results.items()} == {'a': False, 'b': False, 'c': True}
+    assert [s.state for s in stripes] == ['connection_error', 'connection_error', 'ok']
@@ -0,0 +1,95 @@
+import time
+
+from app.render_loop import Histogram, RenderLoop
+
+
+def make_loop(clock, durations):
+    # Every render() advances the clock by the next duration
+    durations = iter(durations)
+    starts = []
+
+    def render():
+        starts.append(clock.now)
+        clock.now += next(durations)
+
+    loop = RenderLoop(render, fps=10, clock=clock)
+    return loop, starts
+
+
+def test_deadlines_stay_on_grid(clock):
+    # Test that late wake-ups and render time do not shift the following deadlines
+    loop, starts = make_loop(clock, [0.03] * 3)
+    assert round(loop.tick(), 6) == 0.07
+    clock.now = 0.12
+    assert round(loop.tick(), 6) == 0.05
+    clock.now = 0.15
+    assert round(loop.tick(), 6) == 0.05
+    clock.now = 0.2
+    loop.tick()
+    assert starts == [0, 0.12, 0.2]
+    assert loop.frames == 3 and loop.dropped == 0 and loop.overruns == 0
+
+
+def test_overrun_drops_missed_frames(clock):
+    # Test that a frame longer than the period skips the deadlines it missed
+    loop, starts = make_loop(clock, [0.25, 0.01])
+    assert round(loop.tick(), 6) == 0.05
+    assert loop.overruns == 1 and loop.dropped == 2
+    clock.now = 0.31
+    loop.tick()
+    assert starts == [0, 0.31]
+    assert loop.frames == 2
+
+
+def test_render_errors_keep_the_loop_running(clock):
+    # Test that an exception in render() is counted and the next frame is still scheduled
+    def render():
+        raise RuntimeError('show failed')
+
+    loop = RenderLoop(render, fps=10, clock=clock)
+    assert loop.tick() == 0.1
+    assert loop.errors == 1 and loop.frames == 1
+
+
+def test_histogram_percentiles():
+    # Test bucket counts and the percentile as upper bucket bound
+    histogram = Histogram()
+    assert histogram.percentile(0.5) is None
+    for ms in [0.5] * 90 + [15] * 9 + [3000]:
+        histogram.record(ms / 1000)
+    assert histogram.percentile(0.5) == 1
+    assert histogram.percentile(0.95) == 20
+    assert histogram.percentile(1) == 3000
+    assert histogram.get_info_dict()['buckets'] == {'<=1': 90, '<=20': 9, '>1000': 1}
+
+
+def test_thread_renders_at_fps():
+    # Test the background thread with the real clock
+    frames = []
+    loop = RenderLoop(lambda: frames.append(time.monotonic()), fps=50).start()
+    time.sleep(0.3)
+    loop.stop()
+    assert 12 <= len(frames) <= 17
+    assert loop.tick() is None
+
+
+def test_idle_mode_skips_unchanged_frames(clock):
+    # Test that frames inside the idle time are skipped and wake() brings the next one forward
+    starts = []
+    loop = RenderLoop(lambda: starts.append(clock.now), fps=10, clock=clock, idle=lambda: 0.35, mode='idle')
+    assert round(loop.tick(), 6) == 0.4
+    assert loop.idle_skipped == 3
+    clock.now = 0.15
+    loop.wake()
+    assert round(loop.tick(), 6) == 0.05
+    clock.now = 0.2
+    loop.tick()
+    assert starts == [0, 0.2]
+    assert loop.dropped == 0
+
+
+def test_fixed_mode_ignores_idle(clock):
+    # Test that the fixed mode renders every frame
+    loop = RenderLoop(lambda: None, fps=10, clock=clock, idle=lambda: 0.35, mode='fixed')
+    assert loop.tick() == 0.1
+    assert loop.idle_skipped == 0
@@ -0,0 +1,91 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from app.exceptions import HostUnavailable
+from app.request_governor import CircuitBreaker, RequestGovernor, TokenBucket
+
+
+@pytest.fixture
+def governor(clock):
+    return RequestGovernor('https://jira', rate=2, burst=2, clock=clock, sleep=clock.sleep)
+
+
+def test_token_bucket_spaces_requests_after_burst(clock):
+    # Test that the burst passes immediately and further requests wait 1/rate
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+    clock.now += 10
+    assert bucket.reserve() == 0
+
+
+def test_circuit_breaker_half_open_probe(clock):
+    # Test open after the threshold, a single probe after the reset timeout, closed after a success
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    clock.now += 30
+    assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+
+def test_retry_after_pauses_and_halves_rate(governor, clock):
+    # Test that a 429 pauses the host for Retry-After seconds and halves the rate
+    governor.acquire()
+    governor.record_response(429, {'Retry-After': '5'})
+    assert governor.stats['rate'] == 1
+    assert governor.stats['paused_for'] == 5
+    governor.acquire()
+    assert clock.slept == [5]
+    governor.record_response(200, {})
+    assert governor.stats['rate'] == 1.1
+
+
+def test_long_waits_fail_fast(governor):
+    # Test that a pause longer than MAX_WAIT raises instead of blocking the fetch threads
+    governor.record_response(429, {'Retry-After': str(RequestGovernor.MAX_WAIT + 10)})
+    with pytest.raises(HostUnavailable):
+        governor.acquire()
+    assert governor.stats['rejected'] == 1
+
+
+def test_exhausted_rate_limit_header_pauses(governor, clock):
+    # Test that X-RateLimit-Remaining: 0 pauses until X-RateLimit-Reset without a 429
+    governor.record_response(200, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': 'invalid'})
+    assert governor.stats['paused_for'] == 0
+    assert governor.stats['rate_limit_remaining'] == 0
+    reset = datetime.fromtimestamp(time.time() + 20, timezone.utc).isoformat()
+    governor.record_response(200, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': reset})
+    assert 19 <= governor.stats['paused_for'] <= 20
+
+
+def test_open_circuit_rejects_requests(governor):
+    # Test that server errors open the circuit and requests fail without being sent
+    for _ in range(RequestGovernor.FAILURE_THRESHOLD):
+        governor.record_response(502, {})
+    with pytest.raises(HostUnavailable):
+        governor.acquire()
+    assert governor.stats['circuit'] == CircuitBreaker.OPEN
+
+
+def test_try_acquire_never_waits(governor, clock):
+    # Test that optional requests only pass if a slot is free right now and the host is healthy
+    assert governor.try_acquire()
+    assert governor.try_acquire()
+    assert not governor.try_acquire()
+    assert clock.slept == []
+    clock.now += 0.5
+    assert governor.try_acquire()
+    clock.now += 10
+    for _ in range(RequestGovernor.FAILURE_THRESHOLD):
+        governor.record_failure()
+    assert not governor.try_acquire()
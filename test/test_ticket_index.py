@@ -0,0 +1,73 @@
+import pytest
+
+from app.ticket_index import TicketIndex
+
+STATUSES = ['Open', 'In Progress']
+
+
+@pytest.fixture
+def index():
+    index = TicketIndex(STATUSES)
+    index.replace([('A-1', 'Open', 100.0), ('A-2', 'Open', 200.0), ('A-3', 'In Progress', 50.0)])
+    return index
+
+
+def test_replace_counts(index):
+    # Test counts and overdue counts after a full load
+    assert len(index) == 3
+    assert index.count('Open') == 2
+    assert index.count('In Progress') == 1
+    assert index.overdue('Open', 150.0) == 1
+    assert index.overdue('Open', 200.0) == 2
+
+
+def test_replace_returns_removed(index):
+    # Test that a full reconcile reports tickets that disappeared
+    assert index.replace([('A-1', 'Open', 100.0)]) == 2
+    assert index.count('Open') == 1
+    assert index.count('In Progress') == 0
+
+
+def test_upsert_status_move(index):
+    # Test moving a ticket to another status
+    assert index.upsert('A-2', 'in progress', 200.0) is True
+    assert index.count('Open') == 1
+    assert index.count('In Progress') == 2
+    assert index.overdue('In Progress', 100.0) == 1
+
+
+def test_upsert_unchanged(index):
+    # Test that an unchanged ticket does not count as change
+    assert index.upsert('A-1', 'Open', 100.0) is False
+
+
+def test_upsert_untracked_status_removes(index):
+    # Test that a ticket moved to an untracked status leaves the index
+    assert index.upsert('A-1', 'Done', 100.0) is True
+    assert 'A-1' not in index
+    assert index.count('Open') == 1
+    assert index.upsert('A-9', 'Done', 100.0) is False
+
+
+def test_replace_aborted_keeps_index(index):
+    # Test that a failing full load keeps the previous state
+    def records():
+        yield 'A-4', 'Open', 10.0
+        raise ConnectionError
+    with pytest.raises(ConnectionError):
+        index.replace(records())
+    assert len(index) == 3
+
+
+def test_next_deadline():
+    # Test that the next deadline is the oldest ticket per status that is not yet overdue
+    index = TicketIndex(['Open', 'Deferred'])
+    assert index.next_deadline({'Open': 100, 'Deferred': 1000}, now=0) is None
+    index.upsert('A-1', 'Open', 10)
+    index.upsert('A-2', 'Open', 50)
+    index.upsert('A-3', 'Deferred', 20)
+    timeouts = {'Open': 100, 'Deferred': 1000}
+    assert index.next_deadline(timeouts, now=0) == 110
+    assert index.next_deadline(timeouts, now=110) == 150
+    assert index.next_deadline(timeouts, now=150) == 1020
+    assert index.next_deadline(timeouts, now=1020) is None
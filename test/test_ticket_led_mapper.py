@@ -1,9 +1,9 @@
 from collections import OrderedDict
 import pytest
 
-from app.models.color import Color
+from app.models.color import Color, ColorEffects
 
-from app.ticket_led_mapper import TicketLedMapper
+from app.ticket_led_mapper import TicketLedMapper, apportion
 
 LED_COUNT = 10
 
@@ -104,7 +104,52 @@ def test_set_ticket_with_min_colors_with_order(default_mapper):
                            ('In Progress', {'color': Color.green.tuple_str, 'count': 1, 'overdue': 0}),
                            ('Deferred', {'color': Color.blue.tuple_str, 'count': 100, 'overdue': 0})])
     default_mapper.set_ticket(tickets)
-    expected_leds = [Color.blue] * 4 + [Color.green] * 1 + [Color.red] * 5
+    # Quotas 6.6 / 0.03 / 3.3: green gets its minimum LED from red, which is above its quota
+    expected_leds = [Color.blue] * 3 + [Color.green] * 1 + [Color.red] * 6
     assert len(default_mapper.leds) == LED_COUNT
     assert default_mapper.leds == expected_leds
     assert default_mapper.overflow is True
+
+
+def test_set_ticket_overdue_within_color(default_mapper):
+    # Test that overdue tickets are shown at the end of their color
+    tickets = OrderedDict([('Open', {'color': Color.red.tuple_str, 'count': 3, 'overdue': 2})])
+    default_mapper.set_ticket(tickets)
+    assert default_mapper.leds[:3] == [Color.red] * 3
+    assert [led.effect for led in default_mapper.leds[:3]] == [None, ColorEffects.overdue, ColorEffects.overdue]
+
+
+def test_set_ticket_layout_is_memoized(default_mapper):
+    # Test that unchanged counts reuse the cached layout
+    tickets = OrderedDict([('Open', {'color': Color.red.tuple_str, 'count': 123, 'overdue': 4}),
+                           ('Deferred', {'color': Color.blue.tuple_str, 'count': 77, 'overdue': 0})])
+    default_mapper.set_ticket(tickets)
+    hits = TicketLedMapper.cache_info()['hits']
+    leds = default_mapper.leds
+    default_mapper.set_ticket(tickets)
+    assert TicketLedMapper.cache_info()['hits'] == hits + 1
+    assert default_mapper.leds is leds
+
+
+@pytest.mark.parametrize('counts, seats', [([200, 1, 100], 40), ([7, 13, 29, 51], 10), ([1] * 7, 5),
+                                           ([999, 1000, 1001], 10000), ([3, 0, 5, 0, 8], 7)])
+def test_apportion_is_proportional(counts, seats):
+    # Test the quota rule: every count gets the integer part of its quota or one more, the sum is exact
+    result = apportion(counts, seats)
+    assert sum(result) == seats
+    for count, leds in zip(counts, result):
+        quota = count * seats / sum(counts)
+        assert int(quota) <= leds <= int(quota) + 1
+
+
+def test_apportion_ties_go_to_later_entries():
+    # Test deterministic tie breaking on equal remainders
+    assert apportion([5, 5, 5], 10) == [3, 3, 4]
+    assert apportion([1, 1, 1, 1], 2) == [0, 0, 1, 1]
+
+
+def test_apportion_minimum_one_led():
+    # Test that small counts stay visible and the LED comes from the most over-represented entry
+    assert apportion([200, 1, 100], 10) == [6, 1, 3]
+    assert apportion([1000, 1, 1, 1], 4) == [1, 1, 1, 1]
+    assert apportion([0, 0], 3) == [0, 0]
@@ -0,0 +1,64 @@
+import os
+from collections import OrderedDict
+
+import pytest
+
+from app.models.color import Color, ColorEffects
+from app.ticket_snapshot import TicketSnapshotStore
+
+NOW = 1_700_000_000.0
+FILTER = 'project = APIM'
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TicketSnapshotStore('APIM', directory=str(tmp_path))
+
+
+def tickets():
+    return OrderedDict([('Open', {'color': '(255, 0, 0)', 'timeout': '3h', 'count': 2, 'overdue': 1}),
+                        ('Deferred', {'color': '(0, 0, 255)', 'timeout': '4w', 'count': 1, 'overdue': 0})])
+
+
+def leds():
+    return [Color.blue.with_effect(ColorEffects.chase), Color.red, Color.red.with_effect(ColorEffects.overdue),
+            Color.black.with_effect(ColorEffects.blink)]
+
+
+def test_save_and_load_roundtrip(store):
+    # Test that tickets, LEDs including their effects and the overflow survive saving and loading
+    assert store.save(FILTER, tickets(), leds(), overflow=True, now=NOW)
+    snapshot = TicketSnapshotStore('APIM', directory=store.directory).load(FILTER, max_age=3600, now=NOW + 10)
+    assert snapshot.tickets == tickets()
+    assert list(snapshot.tickets) == ['Open', 'Deferred']
+    assert snapshot.leds == leds()
+    assert [led.effect for led in snapshot.leds] == [ColorEffects.chase, None, ColorEffects.overdue, ColorEffects.blink]
+    assert snapshot.overflow is True
+    assert snapshot.saved_at == NOW
+
+
+def test_load_missing_outdated_or_other_filter(store):
+    # Test that missing, outdated and other filters' snapshots are ignored
+    assert store.load(FILTER, max_age=3600, now=NOW) is None
+    store.save(FILTER, tickets(), leds(), overflow=False, now=NOW)
+    assert store.load(FILTER, max_age=3600, now=NOW + 3600) is None
+    assert store.load('project = AINT', max_age=3600, now=NOW) is None
+    assert store.load(FILTER, max_age=3600, now=NOW + 3599) is not None
+
+
+def test_load_corrupt_file(store):
+    # Test that a corrupt snapshot does not prevent the start
+    os.makedirs(store.directory, exist_ok=True)
+    with open(store.path, 'w') as f:
+        f.write('{"saved_at": 17')
+    assert store.load(FILTER, max_age=3600, now=NOW) is None
+
+
+def test_unchanged_snapshot_is_rewritten_rarely(store):
+    # Test that unchanged content is only rewritten after REWRITE_INTERVAL and no temp files are left
+    assert store.save(FILTER, tickets(), leds(), overflow=False, now=NOW)
+    assert not store.save(FILTER, tickets(), leds(), overflow=False, now=NOW + 10)
+    assert store.save(FILTER, tickets(), leds()[:3], overflow=False, now=NOW + 20)
+    assert store.save(FILTER, tickets(), leds()[:3], overflow=False, now=NOW + 20 + store.REWRITE_INTERVAL)
+    assert os.listdir(store.directory) == ['APIM.json']
+
@@ -0,0 +1,54 @@
+import hmac
+import hashlib
+
+from app.webhook_queue import WebhookQueue, verify_signature
+
+
+def issue(key, status='Open'):
+    return {'key': key, 'fields': {'status': {'name': status}}}
+
+
+def test_events_are_deduplicated_by_issue_key():
+    # Test that only the latest event per issue is kept, in the order of the latest events
+    queue = WebhookQueue(handler=lambda batch: None)
+    queue.BATCH_DELAY = 0
+    queue.put('jira:issue_created', issue('APIM-1'))
+    queue.put('jira:issue_created', issue('APIM-2'))
+    queue.put('jira:issue_updated', issue('APIM-1', 'Done'))
+    batch = queue.take_batch(timeout=0)
+    assert [(event, i['key']) for event, i in batch] == [('jira:issue_created', 'APIM-2'),
+                                                         ('jira:issue_updated', 'APIM-1')]
+    assert queue.get_info_dict()['deduplicated'] == 1
+
+
+def test_queue_is_bounded():
+    # Test that new issues are rejected when full, while updates of queued issues are accepted
+    queue = WebhookQueue(handler=lambda batch: None, max_size=2)
+    assert queue.put('jira:issue_created', issue('APIM-1'))
+    assert queue.put('jira:issue_created', issue('APIM-2'))
+    assert not queue.put('jira:issue_created', issue('APIM-3'))
+    assert queue.put('jira:issue_deleted', issue('APIM-1'))
+    assert queue.get_info_dict()['rejected'] == 1
+
+
+def test_batches_are_limited():
+    # Test that a burst is split into batches of at most MAX_BATCH events
+    queue = WebhookQueue(handler=lambda batch: None)
+    queue.BATCH_DELAY = 0
+    queue.MAX_BATCH = 3
+    for i in range(5):
+        queue.put('jira:issue_updated', issue(f'APIM-{i}'))
+    assert len(queue.take_batch(timeout=0)) == 3
+    assert len(queue.take_batch(timeout=0)) == 2
+    assert queue.take_batch(timeout=0) == []
+
+
+def test_verify_signature():
+    # Test the HMAC check of the X-Hub-Signature header
+    body = b'{"webhookEvent": "jira:issue_updated"}'
+    digest = hmac.new(b'secret', body, hashlib.sha256).hexdigest()
+    assert verify_signature('secret', body, f'sha256={digest}')
+    assert not verify_signature('other', body, f'sha256={digest}')
+    assert not verify_signature('secret', body + b' ', f'sha256={digest}')
+    assert not verify_signature('secret', body, None)
+    assert not verify_signature('secret', body, digest)